@@ -26,6 +26,7 @@ from .stage2 import Stage2Processor
 from .stage3 import Stage3
 from .stage4 import Stage4Processor
 from .config import Config
+from .scan_index import ScanIndex
 
 logger = logging.getLogger(__name__)
 
@@ -67,10 +68,9 @@ def parse_arguments() -> argparse.Namespace:
     
     parser.add_argument(
         "-if", "--input-folder",
-        required=True,
         type=str,
         metavar="PATH",
-        help="Input directory to process (required)"
+        help="Input directory to process (required unless running a cache maintenance option)"
     )
     
     parser.add_argument(
@@ -132,6 +132,42 @@ def parse_arguments() -> argparse.Namespace:
         help="Cache directory for duplicate detection database (default: from config or .file_organizer_cache in current directory)"
     )
 
+    parser.add_argument(
+        "--hash-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of files to hash concurrently in duplicate detection (default: from config or 4)"
+    )
+
+    parser.add_argument(
+        "--scan-threads",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of directories to list concurrently when scanning (default: from config or 1)"
+    )
+
+    parser.add_argument(
+        "--rename-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of directories whose Stage 1 file renames run concurrently (default: from config or 1)"
+    )
+
+    parser.add_argument(
+        "--cache-tuning",
+        action="store_true",
+        help="Print the effective SQLite settings of the cache database and exit"
+    )
+
+    parser.add_argument(
+        "--cache-gc",
+        action="store_true",
+        help="Remove cache entries of files that no longer exist, VACUUM/ANALYZE the cache database and exit"
+    )
+
     parser.add_argument(
         "--verify-files",
         action="store_true",
@@ -227,7 +263,14 @@ def validate_arguments(args: argparse.Namespace) -> Optional[str]:
     Returns:
         Error message if invalid, None if valid
     """
+    # Cache maintenance options don't touch the input folder
+    if args.cache_tuning or args.cache_gc:
+        return None
+
     # Validate input folder
+    if not args.input_folder:
+        return "the following arguments are required: -if/--input-folder"
+
     input_path = Path(args.input_folder)
     if not input_path.exists():
         return f"Input directory does not exist: {args.input_folder}"
@@ -316,6 +359,108 @@ def check_cache_database(cache_dir: Optional[Path]) -> bool:
         return False
 
 
+def _format_mb(size_bytes: int) -> str:
+    """Format a byte count as MB for the cache reports."""
+    return f"{size_bytes / (1024 * 1024):,.1f} MB"
+
+
+def print_cache_tuning_report(config: Config, cache_dir_override: Optional[str] = None) -> int:
+    """
+    Print the effective SQLite settings of the hash cache database.
+
+    Args:
+        config: Loaded configuration (cache directory and tuning values)
+        cache_dir_override: --cache-dir value, if given
+
+    Returns:
+        Exit code (0 for success)
+    """
+    from .hash_cache import HashCache
+
+    cache_dir = config.get_cache_dir(cli_override=cache_dir_override)
+    if cache_dir is None:
+        cache_dir = Path.cwd() / '.file_organizer_cache'
+
+    if not (cache_dir / 'hashes.db').exists():
+        print(f"No cache database found at {cache_dir / 'hashes.db'}")
+        return 0
+
+    with HashCache(
+        cache_dir,
+        cache_size_mb=config.get_cache_size_mb(),
+        mmap_size_mb=config.get_cache_mmap_mb()
+    ) as cache:
+        report = cache.get_tuning_report()
+
+    configured_mmap = report['configured_mmap_size_mb']
+    mmap_source = "auto: database size + headroom" if configured_mmap is None else f"configured {configured_mmap} MB"
+
+    print("=== Cache Database Tuning ===")
+    print(f"Database:      {report['db_path']}")
+    print(f"SQLite:        {report['sqlite_version']}")
+    print(f"Size:          {_format_mb(report['db_size_bytes'])} "
+          f"({report['page_count']:,} pages x {report['page_size']:,} bytes)")
+    print(f"journal_mode:  {report['journal_mode']}")
+    print(f"synchronous:   {report['synchronous']}")
+    print(f"temp_store:    {report['temp_store']}")
+    print(f"cache_size:    {_format_mb(report['cache_size_bytes'])} "
+          f"(configured {report['configured_cache_size_mb']} MB)")
+    print(f"mmap_size:     {_format_mb(report['mmap_size_bytes'])} ({mmap_source})")
+
+    if report['mmap_size_bytes'] and report['mmap_size_bytes'] < report['db_size_bytes']:
+        print("WARNING: mmap_size is smaller than the database; raise cache_mmap_mb or use 'auto'.")
+
+    return 0
+
+
+def run_cache_gc(config: Config, cache_dir_override: Optional[str] = None) -> int:
+    """
+    Prune stale entries from the hash cache and compact the database.
+
+    Args:
+        config: Loaded configuration (cache directory and tuning values)
+        cache_dir_override: --cache-dir value, if given
+
+    Returns:
+        Exit code (0 for success)
+    """
+    from .hash_cache import HashCache
+
+    cache_dir = config.get_cache_dir(cli_override=cache_dir_override)
+    if cache_dir is None:
+        cache_dir = Path.cwd() / '.file_organizer_cache'
+
+    if not (cache_dir / 'hashes.db').exists():
+        print(f"No cache database found at {cache_dir / 'hashes.db'}")
+        return 0
+
+    with HashCache(
+        cache_dir,
+        cache_size_mb=config.get_cache_size_mb(),
+        mmap_size_mb=config.get_cache_mmap_mb()
+    ) as cache:
+        size_before = cache.get_tuning_report()['db_size_bytes']
+
+        print("=== Cache Garbage Collection ===")
+        print(f"Database:      {cache.db_path}")
+        print("Checking cached files...", flush=True)
+        gc_stats = cache.collect_garbage()
+
+        print("Running ANALYZE and VACUUM...", flush=True)
+        cache.optimize()
+        size_after = cache.get_tuning_report()['db_size_bytes']
+
+    print(f"Entries:       {gc_stats['entries_checked']:,} checked, "
+          f"{gc_stats['entries_removed']:,} removed")
+    unreachable = gc_stats['unreachable_roots']
+    print(f"Roots skipped: {len(unreachable):,} (folder missing, empty or not mounted - entries kept)")
+    for root_path in unreachable:
+        print(f"  - {root_path}")
+    print(f"Size:          {_format_mb(size_before)} -> {_format_mb(size_after)}")
+
+    return 0
+
+
 def main() -> int:
     """
     Main CLI entry point.
@@ -331,6 +476,12 @@ def main() -> int:
     if error:
         print(f"ERROR: {error}", file=sys.stderr)
         return 2
+
+    # Cache maintenance options run instead of the stages
+    if args.cache_tuning:
+        return print_cache_tuning_report(Config(), args.cache_dir)
+    if args.cache_gc:
+        return run_cache_gc(Config(), args.cache_dir)
     
     # Display header
     print("=" * 70)
@@ -357,14 +508,21 @@ def main() -> int:
         # Determine which stages to run
         run_all = args.stage is None
 
+        # One filesystem scan shared by all stages (updated as stages modify the tree)
+        scan_threads = config.get_scan_threads(cli_override=args.scan_threads)
+        scan_index = ScanIndex(scan_threads=scan_threads)
+
         # Stage 1: Filename Detoxification
         if run_all or args.stage == "1":
             print("Starting Stage 1: Filename Detoxification...")
             verbose = config.get_verbose(cli_override=args.verbose if args.verbose else None)
+            rename_workers = config.get_rename_workers(cli_override=args.rename_workers)
             stage1 = Stage1Processor(
                 input_dir=Path(args.input_folder),
                 dry_run=not args.execute,
-                verbose=verbose
+                verbose=verbose,
+                scan_index=scan_index,
+                rename_workers=rename_workers
             )
             stage1.process()
 
@@ -381,7 +539,8 @@ def main() -> int:
                 dry_run=not args.execute,
                 flatten_threshold=flatten_threshold,
                 config=config,
-                verbose=verbose
+                verbose=verbose,
+                scan_index=scan_index
             )
             stage2.process()
 
@@ -401,6 +560,12 @@ def main() -> int:
 
             min_file_size = config.get_min_file_size(cli_override=args.min_file_size)
             cache_dir = config.get_cache_dir(cli_override=args.cache_dir)
+            hash_workers = config.get_hash_workers(cli_override=args.hash_workers)
+            hash_executor = config.get_hash_executor()
+            sample_hashing = config.get_sample_hashing()
+            hash_order = config.get_hash_order()
+            cache_size_mb = config.get_cache_size_mb()
+            cache_mmap_mb = config.get_cache_mmap_mb()
             verbose = config.get_verbose(cli_override=args.verbose if args.verbose else None)
             log_timing("  Configuration loaded")
 
@@ -421,7 +586,15 @@ def main() -> int:
                 min_file_size=min_file_size,
                 dry_run=not args.execute,
                 verbose=verbose,
-                verify_files=args.verify_files
+                verify_files=args.verify_files,
+                hash_workers=hash_workers,
+                hash_executor=hash_executor,
+                sample_hashing=sample_hashing,
+                hash_order=hash_order,
+                cache_size_mb=cache_size_mb,
+                cache_mmap_mb=cache_mmap_mb,
+                scan_threads=scan_threads,
+                scan_index=scan_index
             ) as stage3:
                 log_timing("  Cache initialized, starting duplicate detection...")
                 results = stage3.run_stage3a()
@@ -457,6 +630,12 @@ def main() -> int:
 
             min_file_size = config.get_min_file_size(cli_override=args.min_file_size)
             cache_dir = config.get_cache_dir(cli_override=args.cache_dir)
+            hash_workers = config.get_hash_workers(cli_override=args.hash_workers)
+            hash_executor = config.get_hash_executor()
+            sample_hashing = config.get_sample_hashing()
+            hash_order = config.get_hash_order()
+            cache_size_mb = config.get_cache_size_mb()
+            cache_mmap_mb = config.get_cache_mmap_mb()
             verbose = config.get_verbose(cli_override=args.verbose if args.verbose else None)
             log_timing("  Configuration loaded")
 
@@ -477,7 +656,15 @@ def main() -> int:
                 min_file_size=min_file_size,
                 dry_run=not args.execute,
                 verbose=verbose,
-                verify_files=args.verify_files
+                verify_files=args.verify_files,
+                hash_workers=hash_workers,
+                hash_executor=hash_executor,
+                sample_hashing=sample_hashing,
+                hash_order=hash_order,
+                cache_size_mb=cache_size_mb,
+                cache_mmap_mb=cache_mmap_mb,
+                scan_threads=scan_threads,
+                scan_index=scan_index
             ) as stage3:
                 log_timing("  Cache initialized, starting cross-folder detection...")
                 results = stage3.run_stage3b()
@@ -501,12 +688,17 @@ def main() -> int:
                 print("💡 Output folder detected - running Stage 4 to relocate files")
 
             verbose = config.get_verbose(cli_override=args.verbose if args.verbose else None)
+            cache_dir = config.get_cache_dir(cli_override=args.cache_dir)
+            if cache_dir is None:
+                cache_dir = Path.cwd() / '.file_organizer_cache'
             stage4 = Stage4Processor(
                 input_folder=Path(args.input_folder),
                 output_folder=Path(args.output_folder),
                 preserve_input=args.preserve_input,
                 dry_run=not args.execute,
-                verbose=verbose
+                verbose=verbose,
+                scan_index=scan_index,
+                cache_dir=cache_dir
             )
 
             results = stage4.process()
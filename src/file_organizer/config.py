@@ -30,9 +30,17 @@ class Config:
         'progress_update_interval': 'auto',
         'max_errors_logged': 1000,
         'scan_progress_interval': 10000,
+        'scan_threads': 1,
+        'rename_workers': 1,
         'duplicate_detection': {
             'skip_images': True,
-            'min_file_size': 10240  # 10KB
+            'min_file_size': 10240,  # 10KB
+            'hash_workers': 4,
+            'hash_executor': 'thread',
+            'sample_hashing': True,
+            'hash_order': 'physical',
+            'cache_size_mb': 64,
+            'cache_mmap_mb': 'auto'
         },
         'verbose': True
     }
@@ -241,6 +249,66 @@ class Config:
             print(f"WARNING: Invalid scan_progress_interval value '{value}': {e}. Using default (10,000).")
             return 10000
 
+    def get_scan_threads(self, cli_override: Optional[int] = None) -> int:
+        """
+        Get number of directories listed concurrently while scanning.
+
+        Returns:
+            Valid thread count between 1 and 64 (inclusive), default: 1
+        """
+        value = self.get('scan_threads', cli_override)
+
+        if value is None:
+            return 1
+
+        try:
+            threads = int(value)
+
+            # Validate range
+            if threads < 1:
+                print(f"WARNING: scan_threads must be >= 1, got {threads}. Using 1.")
+                return 1
+
+            if threads > 64:
+                print(f"WARNING: scan_threads very high ({threads}), capping at 64.")
+                return 64
+
+            return threads
+
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: Invalid scan_threads value '{value}': {e}. Using default (1).")
+            return 1
+
+    def get_rename_workers(self, cli_override: Optional[int] = None) -> int:
+        """
+        Get number of directories whose Stage 1 file renames run concurrently.
+
+        Returns:
+            Valid worker count between 1 and 64 (inclusive), default: 1
+        """
+        value = self.get('rename_workers', cli_override)
+
+        if value is None:
+            return 1
+
+        try:
+            workers = int(value)
+
+            # Validate range
+            if workers < 1:
+                print(f"WARNING: rename_workers must be >= 1, got {workers}. Using 1.")
+                return 1
+
+            if workers > 64:
+                print(f"WARNING: rename_workers very high ({workers}), capping at 64.")
+                return 64
+
+            return workers
+
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: Invalid rename_workers value '{value}': {e}. Using default (1).")
+            return 1
+
     def get_skip_images(self, cli_override: Optional[bool] = None) -> bool:
         """
         Get whether to skip image files in duplicate detection.
@@ -330,6 +398,195 @@ class Config:
             print(f"WARNING: Invalid min_file_size value '{value}': {e}. Using default (10240).")
             return 10240
 
+    def get_hash_workers(self, cli_override: Optional[int] = None) -> int:
+        """
+        Get number of concurrent hash workers for duplicate detection.
+
+        Returns:
+            Valid worker count between 1 and 64 (inclusive), default: 4
+        """
+        # CLI override takes precedence
+        if cli_override is not None:
+            value = cli_override
+        # Try to get from nested duplicate_detection config
+        elif 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'hash_workers' in dup_config:
+                value = dup_config['hash_workers']
+            else:
+                value = None
+        else:
+            value = None
+
+        # Fall back to defaults
+        if value is None:
+            return self.DEFAULTS['duplicate_detection']['hash_workers']
+
+        try:
+            workers = int(value)
+
+            # Validate range
+            if workers < 1:
+                print(f"WARNING: hash_workers must be >= 1, got {workers}. Using 1.")
+                return 1
+
+            if workers > 64:
+                print(f"WARNING: hash_workers very high ({workers}), capping at 64.")
+                return 64
+
+            return workers
+
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: Invalid hash_workers value '{value}': {e}. Using default (4).")
+            return 4
+
+    def get_hash_executor(self) -> str:
+        """
+        Get hash worker pool type for duplicate detection.
+
+        Returns:
+            Either 'thread' or 'process' (default: 'thread')
+        """
+        value = None
+        if 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'hash_executor' in dup_config:
+                value = dup_config['hash_executor']
+
+        if value is None:
+            return self.DEFAULTS['duplicate_detection']['hash_executor']
+
+        executor = str(value).lower().strip()
+
+        if executor in ('thread', 'threads'):
+            return 'thread'
+        elif executor in ('process', 'processes'):
+            return 'process'
+        else:
+            print(f"WARNING: Invalid hash_executor '{value}', must be 'thread' or 'process'. Using 'thread'.")
+            return 'thread'
+
+    def get_sample_hashing(self) -> bool:
+        """
+        Get whether to compare head/middle/tail sample hashes before full hashes.
+
+        Returns:
+            Boolean value (default: True - sample large files first)
+        """
+        value = None
+        if 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'sample_hashing' in dup_config:
+                value = dup_config['sample_hashing']
+
+        if value is None:
+            return self.DEFAULTS['duplicate_detection']['sample_hashing']
+
+        if isinstance(value, bool):
+            return value
+
+        if isinstance(value, str):
+            value_lower = value.lower().strip()
+            if value_lower in ('true', 'yes', '1', 'on', 'enabled'):
+                return True
+            elif value_lower in ('false', 'no', '0', 'off', 'disabled'):
+                return False
+
+        print(f"WARNING: Invalid sample_hashing value '{value}'. Using default (True).")
+        return True
+
+    def get_hash_order(self) -> str:
+        """
+        Get the read order for hashing files on one device.
+
+        Returns:
+            'physical' (disk extent order via FIEMAP, inode fallback),
+            'inode' or 'none' (default: 'physical')
+        """
+        value = None
+        if 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'hash_order' in dup_config:
+                value = dup_config['hash_order']
+
+        if value is None:
+            return self.DEFAULTS['duplicate_detection']['hash_order']
+
+        order = str(value).lower().strip()
+
+        if order in ('physical', 'inode', 'none'):
+            return order
+        else:
+            print(f"WARNING: Invalid hash_order '{value}', must be 'physical', 'inode' or 'none'. Using 'physical'.")
+            return 'physical'
+
+    def get_cache_size_mb(self) -> int:
+        """
+        Get SQLite page cache size for the hash cache database.
+
+        Returns:
+            Valid size in MB between 2 and 4096 (inclusive), default: 64
+        """
+        value = None
+        if 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'cache_size_mb' in dup_config:
+                value = dup_config['cache_size_mb']
+
+        if value is None:
+            return self.DEFAULTS['duplicate_detection']['cache_size_mb']
+
+        try:
+            size_mb = int(value)
+
+            if size_mb < 2:
+                print(f"WARNING: cache_size_mb must be >= 2, got {size_mb}. Using 2.")
+                return 2
+
+            if size_mb > 4096:
+                print(f"WARNING: cache_size_mb very high ({size_mb}), capping at 4096.")
+                return 4096
+
+            return size_mb
+
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: Invalid cache_size_mb value '{value}': {e}. Using default (64).")
+            return 64
+
+    def get_cache_mmap_mb(self) -> Optional[int]:
+        """
+        Get memory-mapped I/O size for the hash cache database.
+
+        Returns:
+            Size in MB between 0 (disabled) and 4096, or None for 'auto'
+            (scaled to the database size on every open, the default)
+        """
+        value = None
+        if 'duplicate_detection' in self.config_data:
+            dup_config = self.config_data['duplicate_detection']
+            if isinstance(dup_config, dict) and 'cache_mmap_mb' in dup_config:
+                value = dup_config['cache_mmap_mb']
+
+        if value is None or str(value).lower().strip() == 'auto':
+            return None
+
+        try:
+            mmap_mb = int(value)
+
+            if mmap_mb < 0:
+                print(f"WARNING: cache_mmap_mb must be >= 0, got {mmap_mb}. Using 0 (disabled).")
+                return 0
+
+            if mmap_mb > 4096:
+                print(f"WARNING: cache_mmap_mb very high ({mmap_mb}), capping at 4096.")
+                return 4096
+
+            return mmap_mb
+
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: Invalid cache_mmap_mb value '{value}': {e}. Using 'auto'.")
+            return None
+
     def get_cache_dir(self, cli_override: Optional[str] = None) -> Optional[Path]:
         """
         Get cache directory for duplicate detection database.
@@ -437,6 +694,29 @@ default_mode: dry-run
 # Alternatives:
 # default_mode: execute     # WARNING: Will make actual changes without confirmation
 
+# ============================================================================
+# SCANNING
+# ============================================================================
+
+# Number of directories listed concurrently when scanning folders
+# Raise on network storage (NFS/SMB/NAS), where each directory listing
+# and stat is a slow round-trip
+scan_threads: 1
+# Alternatives:
+# scan_threads: 8           # NAS / network mounts
+# scan_threads: 16          # High-latency remote storage
+
+# ============================================================================
+# STAGE 1: FILENAME DETOXIFICATION
+# ============================================================================
+
+# Number of directories whose file renames run concurrently (--execute only)
+# Each rename is several metadata round-trips (rename, chmod, chown) on
+# network storage; renames in different directories are independent
+rename_workers: 1
+# Alternatives:
+# rename_workers: 8         # NAS / network mounts
+
 # ============================================================================
 # STAGE 2: FOLDER STRUCTURE OPTIMIZATION
 # ============================================================================
@@ -470,6 +750,30 @@ duplicate_detection:
   # min_file_size: 1024     # 1 KB minimum
   # min_file_size: 51200    # 50 KB minimum
 
+  # Number of files hashed concurrently (xxhash releases the GIL)
+  hash_workers: 4
+  # Alternatives:
+  # hash_workers: 1         # Sequential hashing
+  # hash_workers: 16        # Fast NVMe / RAID arrays
+
+  # Hash worker pool type: 'thread' (default) or 'process'
+  hash_executor: thread
+
+  # Hash a head/middle/tail sample of large files (>= 8 MB) first; only
+  # files whose samples match get a full hash
+  sample_hashing: true
+
+  # Order files are read in while hashing. Jobs are grouped per device and
+  # devices are hashed in parallel; within a device:
+  #   physical - disk extent order (Linux FIEMAP), inode order where unsupported
+  #   inode    - inode number order (no extra syscalls)
+  #   none     - scan order
+  hash_order: physical
+
+  # SQLite tuning for the hash cache (applied every time the cache is opened)
+  cache_size_mb: 64         # Page cache size
+  cache_mmap_mb: auto       # Memory-mapped I/O: auto (database size), 0 (off), or MB
+
   # Cache directory for duplicate detection database (optional)
   # If not specified, uses .file_organizer_cache in current working directory
   # Uncomment and set to use a custom cache location:
@@ -5,19 +5,27 @@ Implements:
 - xxHash-based file hashing (ultra-fast, non-cryptographic)
 - Metadata-first strategy (only hash files in size collision groups)
 - File filtering (skip images, small files < 10KB)
+- Single-stat scandir scanning (extension filter before any syscall)
+- Parallel hashing (bounded worker pool, single cache writer)
+- Progressive hashing (head/middle/tail sample first, full hash only on sample collision)
+- Hard link collapsing (one hash per inode; links reported, never counted as duplicates)
 - Progress reporting
 - Cache integration
 """
 
 import os
-import xxhash
 from pathlib import Path
-from typing import List, Dict, Set, Optional, Tuple
+from typing import Any, List, Dict, Set, Optional, Tuple, Iterator, Iterable, NamedTuple
 from dataclasses import dataclass
 import time
 
-from .hash_cache import HashCache, CachedFile
+from .hash_cache import HashCache, CachedFile, CacheWriter, HASH_TYPE_FULL, HASH_TYPE_SAMPLED
+from .hash_engine import HashEngine, hash_file, SAMPLE_MIN_FILE_SIZE
+from .hash_scheduler import ORDER_PHYSICAL
 from .progress_bar import ProgressBar
+from .scan_index import ScanIndex
+from .scanner import FileScanner
+from .parallel_walker import DEFAULT_SCAN_THREADS
 
 
 # File extensions to skip
@@ -30,12 +38,54 @@ IMAGE_EXTENSIONS = {
 MIN_FILE_SIZE = 10 * 1024  # 10KB
 
 
-@dataclass
 class FileMetadata:
-    """Lightweight metadata for a file."""
+    """Lightweight metadata for a file (slotted, one per scanned file)."""
+
+    __slots__ = ('path', 'size', 'mtime', 'dev', 'ino', 'mtime_ns', 'ctime_ns')
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        mtime: float,
+        dev: int = 0,
+        ino: int = 0,
+        mtime_ns: int = 0,
+        ctime_ns: int = 0
+    ):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.dev = dev  # st_dev
+        self.ino = ino  # st_ino (0 if unknown)
+        self.mtime_ns = mtime_ns  # st_mtime_ns (0 if unknown)
+        self.ctime_ns = ctime_ns  # st_ctime_ns (0 if unknown)
+
+    def __repr__(self) -> str:
+        return f"FileMetadata({self.path!r}, size={self.size}, ino={self.ino})"
+
+    @property
+    def inode_key(self) -> Optional[Tuple[int, int]]:
+        """(st_dev, st_ino) identifying the file's inode, or None if unknown."""
+        if not self.ino:
+            return None
+        return (self.dev, self.ino)
+
+    def is_cached_by(self, cached: Optional[CachedFile]) -> bool:
+        """Whether a cache entry is still valid for this file (see CachedFile.matches)."""
+        return cached is not None and cached.matches(
+            self.size, self.mtime, self.mtime_ns, self.ino, self.ctime_ns
+        )
+
+
+class _HashJob(NamedTuple):
+    """A file queued on the hash engine, with its cache folder label."""
     path: str
     size: int
-    mtime: float
+    dev: int
+    ino: int
+    meta: FileMetadata
+    folder: str
 
 
 @dataclass
@@ -44,6 +94,35 @@ class DuplicateGroup:
     hash: str
     files: List[str]
     size: int  # Size of each file in the group
+    inodes: Optional[Dict[str, Tuple[int, int]]] = None  # (st_dev, st_ino) by path, if known
+
+    def reclaimable_bytes(self, keep: str, delete: Iterable[str]) -> int:
+        """
+        Bytes freed by deleting some paths of this group and keeping another.
+
+        Deleting a hard link frees nothing while another link to its inode
+        remains, so each distinct inode other than the kept one counts once.
+        """
+        delete = list(delete)
+        if not self.inodes:
+            return self.size * len(delete)
+
+        kept_inode = self.inodes.get(keep)
+        freed = {self.inodes.get(path, path) for path in delete}
+        freed.discard(kept_inode)
+        return self.size * len(freed)
+
+
+@dataclass
+class HardLinkGroup:
+    """Paths that are hard links to one inode (one file on disk, not duplicates)."""
+    dev: int
+    ino: int
+    files: List[str]
+    size: int
+    mtime: float
+    mtime_ns: int = 0
+    ctime_ns: int = 0
 
 
 class DuplicateDetector:
@@ -51,10 +130,11 @@ class DuplicateDetector:
     Detects duplicate files using metadata-first optimization.
 
     Process:
-    1. Scan directory and collect metadata (path, size, mtime)
-    2. Group files by size (different sizes can't be duplicates)
-    3. Only hash files in size collision groups (2+ files same size)
-    4. Group by hash to find duplicates
+    1. Scan directory and collect metadata (path, size, mtime, inode)
+    2. Collapse hard links to one file per inode
+    3. Group files by size (different sizes can't be duplicates)
+    4. Only hash files in size collision groups (2+ files same size)
+    5. Group by hash to find duplicates
 
     This approach is 10x faster than hashing all files.
     """
@@ -65,7 +145,14 @@ class DuplicateDetector:
         skip_images: bool = True,
         min_file_size: int = MIN_FILE_SIZE,
         progress_callback: Optional[callable] = None,
-        verbose: bool = True
+        verbose: bool = True,
+        hash_workers: int = 1,
+        hash_executor: str = 'thread',
+        sample_hashing: bool = True,
+        sample_min_size: int = SAMPLE_MIN_FILE_SIZE,
+        hash_order: str = ORDER_PHYSICAL,
+        scan_threads: int = DEFAULT_SCAN_THREADS,
+        scan_index: Optional[ScanIndex] = None
     ):
         """
         Initialize duplicate detector.
@@ -76,12 +163,24 @@ class DuplicateDetector:
             min_file_size: Minimum file size to process in bytes (default 10KB)
             progress_callback: Optional callback for progress updates
             verbose: Show progress bars (default True)
+            hash_workers: Number of concurrent hash workers (default 1)
+            hash_executor: Worker pool type, 'thread' or 'process' (default 'thread')
+            sample_hashing: Compare sample hashes before full hashes (default True)
+            sample_min_size: Only sample size groups of files at least this large (default 8MB)
+            hash_order: Read order within a device: 'physical', 'inode' or 'none'
+            scan_threads: Directories listed concurrently by the filesystem scan (default 1)
+            scan_index: Shared filesystem index (scan it instead of walking the directory)
         """
         self.cache = cache
         self.skip_images = skip_images
         self.min_file_size = min_file_size
         self.progress_callback = progress_callback
         self.verbose = verbose
+        self.engine = HashEngine(workers=hash_workers, executor=hash_executor, order=hash_order)
+        self.sample_hashing = sample_hashing
+        self.sample_min_size = sample_min_size
+        self.scan_threads = scan_threads
+        self.scan_index = scan_index
 
         # Statistics
         self.stats = {
@@ -91,11 +190,21 @@ class DuplicateDetector:
             'unique_sizes': 0,
             'size_collisions': 0,
             'files_hashed': 0,
+            'samples_hashed': 0,
+            'sample_unique': 0,
+            'bytes_hashed': 0,
             'cache_hits': 0,
             'duplicates_found': 0,
-            'bytes_saved': 0
+            'bytes_saved': 0,
+            'hardlink_groups': 0,
+            'hardlinks': 0,
+            'cache_pruned': 0,
+            'cache_moved': 0
         }
 
+        # Hard link groups found by the last detect_duplicates() call
+        self.hardlink_groups: List[HardLinkGroup] = []
+
     def should_skip_file(self, file_path: Path) -> Tuple[bool, Optional[str]]:
         """
         Determine if a file should be skipped.
@@ -132,40 +241,75 @@ class DuplicateDetector:
             List of FileMetadata objects for files to process
         """
         files = []
-        scanned = 0
 
         if self.progress_callback:
             self.progress_callback('scan', 0, 0, "Scanning files...")
 
-        for root, dirs, filenames in os.walk(directory):
-            for filename in filenames:
-                file_path = Path(root) / filename
-                scanned += 1
-
-                # Progress update every 10,000 files
-                if scanned % 10000 == 0 and self.progress_callback:
-                    self.progress_callback('scan', scanned, 0, f"Scanned {scanned:,} files...")
-
-                # Check if should skip
-                skip, reason = self.should_skip_file(file_path)
-                if skip:
-                    if reason == 'image':
-                        self.stats['skipped_images'] += 1
-                    elif reason == 'too_small':
-                        self.stats['skipped_small'] += 1
-                    continue
+        if self.scan_index is not None:
+            return self._scan_index(directory)
 
-                # Collect metadata
-                try:
-                    stat = file_path.stat()
-                    files.append(FileMetadata(
-                        path=str(file_path.absolute()),
-                        size=stat.st_size,
-                        mtime=stat.st_mtime
-                    ))
-                except (OSError, FileNotFoundError):
-                    # Skip files with permission errors
-                    continue
+        # One stat per candidate file; images are filtered by name first
+        scanner = FileScanner(
+            skip_extensions=IMAGE_EXTENSIONS if self.skip_images else (),
+            min_size=self.min_file_size,
+            threads=self.scan_threads
+        )
+        for record in scanner.scan(directory):
+            files.append(FileMetadata(
+                path=record.path, size=record.size, mtime=record.mtime,
+                dev=record.dev, ino=record.ino,
+                mtime_ns=record.mtime_ns, ctime_ns=record.ctime_ns
+            ))
+
+            # Progress update every 10,000 files
+            if len(files) % 10000 == 0 and self.progress_callback:
+                self.progress_callback('scan', scanner.stats['files_seen'], 0,
+                                       f"Scanned {scanner.stats['files_seen']:,} files...")
+
+        scanned = scanner.stats['files_seen']
+        self.stats['skipped_images'] += scanner.stats['skipped_extension']
+        self.stats['skipped_small'] += scanner.stats['skipped_small']
+
+        self.stats['total_files'] = len(files)
+
+        if self.progress_callback:
+            self.progress_callback(
+                'scan', scanned, len(files),
+                f"Scan complete: {len(files):,} files to process"
+            )
+
+        return files
+
+    def _scan_index(self, directory: Path) -> List[FileMetadata]:
+        """
+        Collect file metadata from the shared scan index (no stat calls).
+
+        Same filtering as the filesystem scan in scan_directory().
+        """
+        files = []
+        scanned = 0
+        root = Path(directory).absolute()
+
+        for file_path, entry in self.scan_index.iter_files(root):
+            scanned += 1
+
+            # Progress update every 10,000 files
+            if scanned % 10000 == 0 and self.progress_callback:
+                self.progress_callback('scan', scanned, 0, f"Scanned {scanned:,} files...")
+
+            if self.skip_images and os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS:
+                self.stats['skipped_images'] += 1
+                continue
+
+            if entry.size < self.min_file_size:
+                self.stats['skipped_small'] += 1
+                continue
+
+            files.append(FileMetadata(
+                path=file_path, size=entry.size, mtime=entry.mtime,
+                dev=entry.dev, ino=entry.ino,
+                mtime_ns=entry.mtime_ns, ctime_ns=entry.ctime_ns
+            ))
 
         self.stats['total_files'] = len(files)
 
@@ -197,6 +341,144 @@ class DuplicateDetector:
 
         return size_groups
 
+    def prune_stale_entries(self, directory: Path, folder: str, files: List[FileMetadata]) -> int:
+        """
+        Remove cache entries under a directory that the scan no longer sees.
+
+        Only entries the scan would have reported (not skipped by the image
+        or size filters) are considered, so changing the filters never
+        discards hashes of files that still exist.
+
+        Args:
+            directory: Directory that was just scanned
+            folder: Folder label ('input' or 'output')
+            files: Files found by the scan
+
+        Returns:
+            Number of entries removed
+        """
+        seen = {file_meta.path for file_meta in files}
+        stale = [
+            path
+            for path, size in self.cache.load_columns(folder, directory).iter_paths()
+            if path not in seen and self._is_scan_candidate(path, size)
+        ]
+
+        removed = self.cache.remove_from_cache(stale, folder)
+        self.stats['cache_pruned'] += removed
+        return removed
+
+    def _is_scan_candidate(self, file_path: str, size: int) -> bool:
+        """Whether the scan filters would report a file of this name and size."""
+        if size < self.min_file_size:
+            return False
+        if self.skip_images and os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS:
+            return False
+        return True
+
+    def resolve_moved_files(self, files: Iterable[FileMetadata], folder: str) -> Dict[str, CachedFile]:
+        """
+        Find cached hashes of files that were moved or renamed since they were cached.
+
+        A rename keeps the inode, size and st_mtime_ns, so a hashed entry
+        with the same (size, st_mtime_ns, st_dev, st_ino) under another
+        path describes the same data. All files are matched in one bulk
+        query. Entries at a file's own path are never used (there, only
+        the full validation key including st_ctime_ns counts).
+
+        Args:
+            files: Scanned files without a valid cache entry at their path
+            folder: Folder label ('input' or 'output')
+
+        Returns:
+            Dictionary mapping file_path -> CachedFile describing the file at
+            its new path (hash taken over from the old entry)
+        """
+        by_identity: Dict[Tuple[int, int, int, int], List[FileMetadata]] = {}
+        for file_meta in files:
+            if file_meta.ino and file_meta.mtime_ns:
+                identity = (file_meta.size, file_meta.mtime_ns, file_meta.dev, file_meta.ino)
+                by_identity.setdefault(identity, []).append(file_meta)
+
+        if not by_identity:
+            return {}
+
+        found: Dict[str, Tuple[FileMetadata, CachedFile]] = {}
+        for identity, cached in self.cache.iter_files_by_identity(by_identity):
+            for file_meta in by_identity[identity]:
+                if cached.file_path == file_meta.path:
+                    continue
+                # Prefer a full hash over a sample hash
+                current = found.get(file_meta.path)
+                if current is None or (cached.full_hash and not current[1].full_hash):
+                    found[file_meta.path] = (file_meta, cached)
+
+        moved = {
+            path: CachedFile(
+                file_path=path,
+                folder=folder,
+                file_hash=cached.file_hash,
+                hash_type=cached.hash_type,
+                sample_size=cached.sample_size,
+                file_size=file_meta.size,
+                file_mtime=file_meta.mtime,
+                video_duration=cached.video_duration,
+                video_codec=cached.video_codec,
+                video_resolution=cached.video_resolution,
+                last_checked=cached.last_checked,
+                file_dev=file_meta.dev,
+                file_ino=file_meta.ino,
+                file_mtime_ns=file_meta.mtime_ns,
+                file_ctime_ns=file_meta.ctime_ns or None
+            )
+            for path, (file_meta, cached) in found.items()
+        }
+        self.stats['cache_moved'] += len(moved)
+        return moved
+
+    def collapse_hardlinks(self, files: List[FileMetadata]) -> List[FileMetadata]:
+        """
+        Keep one file per inode; record the other links as hard link groups.
+
+        Hard links share their data, so hashing more than one link reads
+        the same bytes again, and "deleting" one as a duplicate frees
+        nothing. The first link in scan order represents the inode.
+
+        Args:
+            files: Scanned files
+
+        Returns:
+            Files with at most one path per inode (scan order kept)
+        """
+        by_inode: Dict[Tuple[int, int], List[FileMetadata]] = {}
+        representatives = []
+
+        for file_meta in files:
+            key = file_meta.inode_key
+            if key is None:
+                representatives.append(file_meta)
+                continue
+
+            links = by_inode.get(key)
+            if links is None:
+                by_inode[key] = [file_meta]
+                representatives.append(file_meta)
+            else:
+                links.append(file_meta)
+
+        self.hardlink_groups = [
+            HardLinkGroup(dev=links[0].dev, ino=links[0].ino,
+                          files=[f.path for f in links], size=links[0].size,
+                          mtime=links[0].mtime, mtime_ns=links[0].mtime_ns,
+                          ctime_ns=links[0].ctime_ns)
+            for links in by_inode.values()
+            if len(links) >= 2
+        ]
+        self.stats['hardlink_groups'] += len(self.hardlink_groups)
+        self.stats['hardlinks'] += sum(len(g.files) - 1 for g in self.hardlink_groups)
+
+        return representatives
+
     def compute_file_hash(self, file_path: str) -> str:
         """
         Compute xxHash of a file.
@@ -205,28 +487,15 @@ class DuplicateDetector:
             file_path: Path to file
 
         Returns:
-            xxHash hex digest
+            xxHash hex digest (empty string on error)
         """
-        hasher = xxhash.xxh64()
-
-        try:
-            with open(file_path, 'rb') as f:
-                # Read in 64KB chunks for efficiency
-                while True:
-                    chunk = f.read(65536)
-                    if not chunk:
-                        break
-                    hasher.update(chunk)
-
-            return hasher.hexdigest()
-        except (OSError, FileNotFoundError) as e:
-            # Return empty string on error (will be skipped)
-            return ""
+        return hash_file(file_path)
 
     def hash_file_with_cache(
         self,
         file_meta: FileMetadata,
-        folder: str
+        folder: str,
+        writer: Optional[CacheWriter] = None
     ) -> Optional[str]:
         """
         Hash a file, using cache if available.
@@ -234,6 +503,7 @@ class DuplicateDetector:
         Args:
             file_meta: File metadata
             folder: Folder label ('input' or 'output')
+            writer: Optional write-behind writer (default: write and commit immediately)
 
         Returns:
             File hash or None if error
@@ -241,30 +511,192 @@ class DuplicateDetector:
         # Check cache first
         cached = self.cache.get_from_cache(file_meta.path, folder)
 
-        if cached and cached.file_size == file_meta.size and cached.file_mtime == file_meta.mtime and cached.file_hash:
-            # Cache hit - file unchanged and has hash
+        if file_meta.is_cached_by(cached) and cached.full_hash:
+            # Cache hit - file unchanged and has full hash
             self.stats['cache_hits'] += 1
-            return cached.file_hash
+            return cached.full_hash
 
-        # Cache miss or no hash - compute hash
+        # Cache miss or no full hash - compute hash
         file_hash = self.compute_file_hash(file_meta.path)
 
         if not file_hash:
             return None  # Error computing hash
 
-        # Save to cache
-        self.cache.save_to_cache(
+        # Save to cache (buffered when a writer is supplied)
+        save = writer.add if writer else self.cache.save_to_cache
+        save(
             file_path=file_meta.path,
             folder=folder,
             file_size=file_meta.size,
             file_mtime=file_meta.mtime,
+            file_mtime_ns=file_meta.mtime_ns or None,
+            file_ctime_ns=file_meta.ctime_ns or None,
             file_hash=file_hash,
-            hash_type='full'
+            hash_type=HASH_TYPE_FULL,
+            file_dev=file_meta.dev,
+            file_ino=file_meta.ino
         )
 
         self.stats['files_hashed'] += 1
+        self.stats['bytes_hashed'] += file_meta.size
         return file_hash
 
+    def hash_size_groups(
+        self,
+        size_groups: Iterable[List[Tuple[FileMetadata, str]]],
+        cached_by_key: Dict[Tuple[str, str], CachedFile]
+    ) -> Iterator[Tuple[FileMetadata, str, Optional[str]]]:
+        """
+        Hash size collision groups progressively, reusing cached hashes.
+
+        Tier 1 (groups of files >= sample_min_size): hash a head/middle/tail
+        sample of each file. A file whose sample matches no other file in
+        its group cannot have a duplicate there, so it is never read in full;
+        its sample hash is cached with hash_type='sampled'.
+
+        Tier 2: full hash of every remaining file, cached with hash_type='full'.
+
+        Both tiers run on the worker pool; results are written behind to the
+        cache from this (the calling) thread in batched transactions, so
+        SQLite only ever sees a single writer. Pending writes are flushed
+        when the iterator is exhausted or closed.
+
+        Args:
+            size_groups: Groups of (file_meta, folder) pairs sharing one file size
+            cached_by_key: Cached entries keyed by (file_path, folder)
+
+        Yields:
+            Tuples of (file_meta, folder, full_hash); full_hash is None when the
+            file was ruled out by its sample hash or could not be read
+        """
+        with self.cache.writer() as writer:
+            yield from self._hash_size_groups(size_groups, cached_by_key, writer)
+
+    def _hash_size_groups(
+        self,
+        size_groups: Iterable[List[Tuple[FileMetadata, str]]],
+        cached_by_key: Dict[Tuple[str, str], CachedFile],
+        writer: CacheWriter
+    ) -> Iterator[Tuple[FileMetadata, str, Optional[str]]]:
+        """Two-tier hashing pipeline behind hash_size_groups() (writes go to writer)."""
+        sample_size = self.engine.sample_size
+        full_jobs = []
+        sample_jobs = []
+        sampled_groups = []
+
+        def cached_entry(file_meta: FileMetadata, folder: str) -> Optional[CachedFile]:
+            cached = cached_by_key.get((file_meta.path, folder))
+            if file_meta.is_cached_by(cached):
+                return cached
+            return None
+
+        def cached_full_hash(file_meta: FileMetadata, folder: str) -> Optional[str]:
+            cached = cached_entry(file_meta, folder)
+            return cached.full_hash if cached else None
+
+        for group in size_groups:
+            group = list(group)
+            all_cached = all(cached_full_hash(file_meta, folder) for file_meta, folder in group)
+
+            if (
+                self.sample_hashing and not all_cached
+                and group[0][0].size >= max(self.sample_min_size, sample_size)
+            ):
+                sampled_groups.append(group)
+            else:
+                full_jobs.extend(_HashJob(m.path, m.size, m.dev, m.ino, m, f) for m, f in group)
+
+        # Tier 1: sample hashes (reuse cached samples taken with the same sample size)
+        samples = {}
+        for group_idx, group in enumerate(sampled_groups):
+            for file_meta, folder in group:
+                cached = cached_entry(file_meta, folder)
+                if cached and cached.hash_type == HASH_TYPE_SAMPLED and cached.sample_size == sample_size:
+                    self.stats['cache_hits'] += 1
+                    samples[(file_meta.path, folder)] = cached.file_hash
+                else:
+                    sample_jobs.append(_HashJob(
+                        file_meta.path, file_meta.size, file_meta.dev, file_meta.ino, file_meta, folder
+                    ))
+
+        for job, sample_hash in self.engine.hash_files(sample_jobs, sampled=True):
+            samples[(job.path, job.folder)] = sample_hash
+            if sample_hash:
+                self.stats['samples_hashed'] += 1
+                self.stats['bytes_hashed'] += min(job.size, sample_size)
+
+        for group in sampled_groups:
+            by_sample = {}
+            for file_meta, folder in group:
+                sample_hash = samples.get((file_meta.path, folder))
+                if not sample_hash:
+                    yield file_meta, folder, None  # Error reading sample
+                    continue
+                by_sample.setdefault(sample_hash, []).append((file_meta, folder))
+
+            for sample_hash, members in by_sample.items():
+                if len(members) >= 2:
+                    full_jobs.extend(_HashJob(m.path, m.size, m.dev, m.ino, m, f) for m, f in members)
+                    continue
+
+                # Unique sample - no duplicate possible in this group
+                file_meta, folder = members[0]
+                full_hash = cached_full_hash(file_meta, folder)
+                if full_hash:
+                    yield file_meta, folder, full_hash
+                    continue
+
+                self.stats['sample_unique'] += 1
+                cached = cached_entry(file_meta, folder)
+                if not (cached and cached.file_hash == sample_hash):
+                    writer.add(
+                        file_path=file_meta.path,
+                        folder=folder,
+                        file_size=file_meta.size,
+                        file_mtime=file_meta.mtime,
+                        file_mtime_ns=file_meta.mtime_ns or None,
+                        file_ctime_ns=file_meta.ctime_ns or None,
+                        file_hash=sample_hash,
+                        hash_type=HASH_TYPE_SAMPLED,
+                        sample_size=sample_size,
+                        file_dev=file_meta.dev,
+                        file_ino=file_meta.ino
+                    )
+                yield file_meta, folder, None
+
+        # Tier 2: full hashes (cache hits first, misses on the worker pool)
+        misses = []
+        for job in full_jobs:
+            full_hash = cached_full_hash(job.meta, job.folder)
+            if full_hash:
+                # Cache hit - file unchanged and has full hash
+                self.stats['cache_hits'] += 1
+                yield job.meta, job.folder, full_hash
+            else:
+                misses.append(job)
+
+        for job, file_hash in self.engine.hash_files(misses):
+            if not file_hash:
+                yield job.meta, job.folder, None  # Error computing hash
+                continue
+
+            writer.add(
+                file_path=job.path,
+                folder=job.folder,
+                file_size=job.size,
+                file_mtime=job.meta.mtime,
+                file_mtime_ns=job.meta.mtime_ns or None,
+                file_ctime_ns=job.meta.ctime_ns or None,
+                file_hash=file_hash,
+                hash_type=HASH_TYPE_FULL,
+                file_dev=job.meta.dev,
+                file_ino=job.meta.ino
+            )
+
+            self.stats['files_hashed'] += 1
+            self.stats['bytes_hashed'] += job.size
+            yield job.meta, job.folder, file_hash
+
     def detect_duplicates(
         self,
         directory: Path,
@@ -274,10 +706,11 @@ class DuplicateDetector:
         Detect duplicate files in a directory using metadata-first optimization.
 
         Process:
-        1. Scan directory and collect metadata
-        2. Group files by size
-        3. Only hash files in size collision groups (2+ files same size)
-        4. Group by hash to find duplicates
+        1. Scan directory and collect metadata (moved files keep their cached hash)
+        2. Collapse hard links (one file per inode; see self.hardlink_groups)
+        3. Group files by size
+        4. Only hash files in size collision groups (2+ files same size)
+        5. Group by hash to find duplicates
 
         Args:
             directory: Directory to scan
@@ -293,16 +726,21 @@ class DuplicateDetector:
         files = self.scan_directory(directory, folder)
 
         if not files:
+            # Drop cache entries of files under this directory that are gone
+            self.prune_stale_entries(directory, folder, files)
             return []
 
         # Cache all scanned files (even without hashes) for Stage 3B
         # This ensures the cache is complete for cross-folder deduplication
         # Use batch operations for performance (much faster than loading all files!)
 
-        # Step 1: Batch query only the files we scanned (not all cached files)
+        # Step 1: Stream cache entries of only the files we scanned (not all cached files)
         # This is MUCH faster when cache has 100k+ entries but we only scanned 1k-10k files
-        scanned_paths = [file_meta.path for file_meta in files]
-        cached_by_path = self.cache.get_files_by_paths(scanned_paths, folder)
+        unresolved = {file_meta.path: file_meta for file_meta in files}
+        scanned_paths = list(unresolved)
+
+        # Only entries with a reusable hash are kept for the hashing phase
+        cached_by_path = {}
 
         # Step 3: Identify files that need cache updates
         batch_entries = []
@@ -319,33 +757,83 @@ class DuplicateDetector:
         updated_count = 0
         skipped_count = 0
 
-        for idx, file_meta in enumerate(files, 1):
-            cached = cached_by_path.get(file_meta.path)
-
-            if not cached or cached.file_size != file_meta.size or cached.file_mtime != file_meta.mtime:
-                # Not in cache or file changed - add to batch
-                batch_entries.append({
-                    'file_path': file_meta.path,
-                    'folder': folder,
-                    'file_size': file_meta.size,
-                    'file_mtime': file_meta.mtime,
-                    'file_hash': None,  # No hash yet - will be computed if needed
-                    'hash_type': None
-                })
+        def new_entry(file_meta: FileMetadata, cached: Optional[CachedFile] = None) -> Dict[str, Any]:
+            entry = {
+                'file_path': file_meta.path,
+                'folder': folder,
+                'file_size': file_meta.size,
+                'file_mtime': file_meta.mtime,
+                'file_mtime_ns': file_meta.mtime_ns or None,
+                'file_ctime_ns': file_meta.ctime_ns or None,
+                'file_hash': None,  # No hash yet - will be computed if needed
+                'hash_type': None,
+                'file_dev': file_meta.dev,
+                'file_ino': file_meta.ino
+            }
+            if cached is not None:
+                # Same content - keep the hash and video metadata
+                entry.update(
+                    file_hash=cached.file_hash,
+                    hash_type=cached.hash_type,
+                    sample_size=cached.sample_size,
+                    video_duration=cached.video_duration,
+                    video_codec=cached.video_codec,
+                    video_resolution=cached.video_resolution
+                )
+            return entry
+
+        for idx, (path, cached) in enumerate(self.cache.iter_files_by_paths(scanned_paths, folder), 1):
+            file_meta = unresolved[path]
+
+            if not file_meta.is_cached_by(cached):
+                # File changed (or replaced by another inode) - resolved below
+                continue
+            del unresolved[path]
+
+            if cached.file_hash:
+                cached_by_path[path] = cached
+
+            recorded = (cached.file_dev, cached.file_ino, cached.file_mtime_ns, cached.file_ctime_ns)
+            current = (file_meta.dev, file_meta.ino, file_meta.mtime_ns or None, file_meta.ctime_ns or None)
+            if recorded != current:
+                # Content unchanged but stat key not fully recorded (older
+                # entry, or ctime cleared by a move) - keep the hash
+                batch_entries.append(new_entry(file_meta, cached))
                 updated_count += 1
             else:
                 skipped_count += 1
 
             # Update progress every 1000 files
-            if idx % 1000 == 0 or idx == len(files):
+            if idx % 1000 == 0:
                 cache_progress.update(idx, {"Updated": updated_count, "Skipped": skipped_count})
 
+        # Step 2: Files moved or renamed since they were cached keep their hash
+        moved = self.resolve_moved_files(unresolved.values(), folder)
+
+        # Not in cache (or changed) - add to batch
+        for path, file_meta in unresolved.items():
+            cached = moved.get(path)
+            if cached is not None:
+                cached_by_path[path] = cached
+            batch_entries.append(new_entry(file_meta, cached))
+            updated_count += 1
+        del unresolved
+
+        cache_progress.update(len(files), {"Updated": updated_count, "Skipped": skipped_count})
+
         # Step 4: Save all updates in one batch operation
         if batch_entries:
             self.cache.save_batch(batch_entries)
 
         cache_progress.finish({"Updated": updated_count, "Skipped": skipped_count})
 
+        # Drop cache entries of files under this directory that are gone
+        # (after move resolution, which reads the entries at their old paths)
+        self.prune_stale_entries(directory, folder, files)
+
+        # Hard links share one inode: hash (and compare) only one path per inode
+        files = self.collapse_hardlinks(files)
+
         # Phase 2: Group by size
         if self.progress_callback:
             self.progress_callback('phase', 2, 4, "Phase 2: Grouping by size...")
@@ -374,6 +862,7 @@ class DuplicateDetector:
             self.progress_callback('phase', 3, 4, "Phase 3: Hashing collision groups...")
 
         hash_groups = {}
+        full_hashes = {}
         total_to_hash = self.stats['size_collisions']
         hashed_count = 0
         skipped_count = 0
@@ -387,55 +876,115 @@ class DuplicateDetector:
                 min_duration=1.0
             )
 
-        idx = 0
-        for size, file_list in collision_groups.items():
-            for file_meta in file_list:
-                idx += 1
-                file_hash = self.hash_file_with_cache(file_meta, folder)
+        groups_to_hash = [
+            [(file_meta, folder) for file_meta in file_list]
+            for file_list in collision_groups.values()
+        ]
+        cached_by_key = {(path, folder): cached for path, cached in cached_by_path.items()}
 
-                if not file_hash:
-                    skipped_count += 1
-                    if total_to_hash > 0:
-                        hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
-                    continue  # Skip files with hash errors
+        # Cache hits come straight from the batch lookup above; misses are
+        # sampled and/or hashed on the worker pool (results return here for caching)
+        results = self.hash_size_groups(groups_to_hash, cached_by_key)
+        for idx, (file_meta, _, file_hash) in enumerate(results, 1):
+            if not file_hash:
+                skipped_count += 1
+                hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
+                continue  # Skip files with hash errors
 
-                # Group by hash
-                if file_hash not in hash_groups:
-                    hash_groups[file_hash] = []
-                hash_groups[file_hash].append((file_meta.path, size))
+            # Group by hash
+            if file_hash not in hash_groups:
+                hash_groups[file_hash] = []
+            hash_groups[file_hash].append((file_meta.path, file_meta.size))
+            full_hashes[file_meta.path] = file_hash
 
-                hashed_count += 1
+            hashed_count += 1
 
-                # Update progress bar
-                if total_to_hash > 0:
-                    hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
+            # Update progress bar
+            hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
 
         # Finish progress bar
         if total_to_hash > 0:
             hash_progress.finish({"Hashed": hashed_count, "Skipped": skipped_count})
 
+        # The other links of each hashed inode share its hash (Stage 3B reads them)
+        self._cache_hardlink_hashes(full_hashes, cached_by_path, folder)
+
         # Phase 4: Find duplicates (groups with 2+ files)
         if self.progress_callback:
             self.progress_callback('phase', 4, 4, "Phase 4: Identifying duplicates...")
 
+        # Hashed files are one per inode; groups list every link of each inode
+        links_by_path = {group.files[0]: group for group in self.hardlink_groups}
+
         duplicate_groups = []
         for file_hash, file_list in hash_groups.items():
             if len(file_list) >= 2:
-                paths = [path for path, size in file_list]
                 size = file_list[0][1]  # All files in group have same size
+                paths = []
+                inodes = {}
+                for path, _ in file_list:
+                    links = links_by_path.get(path)
+                    if links is None:
+                        paths.append(path)
+                        continue
+                    for link in links.files:
+                        paths.append(link)
+                        inodes[link] = (links.dev, links.ino)
 
                 duplicate_groups.append(DuplicateGroup(
                     hash=file_hash,
                     files=paths,
-                    size=size
+                    size=size,
+                    inodes=inodes or None
                 ))
 
-                # Calculate bytes saved (keep 1, delete N-1)
-                self.stats['duplicates_found'] += len(paths) - 1
-                self.stats['bytes_saved'] += size * (len(paths) - 1)
+                # Count distinct inodes (keep 1, the other N-1 are duplicates);
+                # extra links of one inode are counted in the hardlink stats
+                self.stats['duplicates_found'] += len(file_list) - 1
+                self.stats['bytes_saved'] += size * (len(file_list) - 1)
 
         return duplicate_groups
 
+    def _cache_hardlink_hashes(
+        self,
+        full_hashes: Dict[str, str],
+        cached_by_path: Dict[str, CachedFile],
+        folder: str
+    ):
+        """
+        Cache each hashed inode's full hash under its other hard links.
+
+        Args:
+            full_hashes: Full hash by path of the representative link
+            cached_by_path: Cache entries loaded before hashing
+            folder: Folder label ('input' or 'output')
+        """
+        batch_entries = []
+        for group in self.hardlink_groups:
+            file_hash = full_hashes.get(group.files[0])
+            if not file_hash:
+                continue
+
+            for path in group.files[1:]:
+                cached = cached_by_path.get(path)
+                if cached and cached.hash_type == HASH_TYPE_FULL and cached.file_hash == file_hash:
+                    continue
+                batch_entries.append({
+                    'file_path': path,
+                    'folder': folder,
+                    'file_size': group.size,
+                    'file_mtime': group.mtime,  # Links share the inode's times
+                    'file_mtime_ns': group.mtime_ns or None,
+                    'file_ctime_ns': group.ctime_ns or None,
+                    'file_hash': file_hash,
+                    'hash_type': HASH_TYPE_FULL,
+                    'file_dev': group.dev,
+                    'file_ino': group.ino
+                })
+
+        if batch_entries:
+            self.cache.save_batch(batch_entries)
+
     def get_stats_summary(self) -> str:
         """
         Get formatted statistics summary.
@@ -463,8 +1012,17 @@ class DuplicateDetector:
             "",
             f"Hashing:",
             f"  - Files hashed: {self.stats['files_hashed']:,}",
+            f"  - Sample hashes: {self.stats['samples_hashed']:,} "
+            f"({self.stats['sample_unique']:,} files ruled out without a full hash)",
+            f"  - Data read: {self._format_bytes(self.stats['bytes_hashed'])}",
             f"  - Cache hits: {self.stats['cache_hits']:,}",
             f"  - Cache hit rate: {self._cache_hit_rate():.1f}%",
+            f"  - Moved files matched by inode: {self.stats['cache_moved']:,}",
+            f"  - Stale cache entries pruned: {self.stats['cache_pruned']:,}",
+            "",
+            f"Hard links:",
+            f"  - Hard link groups: {self.stats['hardlink_groups']:,} "
+            f"({self.stats['hardlinks']:,} extra links, not counted as duplicates)",
             "",
             f"Duplicates:",
             f"  - Duplicate files found: {self.stats['duplicates_found']:,}",
@@ -476,7 +1034,7 @@ class DuplicateDetector:
 
     def _cache_hit_rate(self) -> float:
         """Calculate cache hit rate percentage."""
-        total = self.stats['cache_hits'] + self.stats['files_hashed']
+        total = self.stats['cache_hits'] + self.stats['files_hashed'] + self.stats['samples_hashed']
         if total == 0:
             return 0.0
         return (self.stats['cache_hits'] / total) * 100
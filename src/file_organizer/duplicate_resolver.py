@@ -11,23 +11,37 @@ import os
 import logging
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict
-from dataclasses import dataclass
 
 from .hash_cache import CachedFile
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
 class FileInfo:
-    """Extended file information for resolution."""
-    path: str
-    size: int
-    mtime: float
-    depth: int
-    has_keep: bool
-    keep_in_folder: bool  # True if "keep" is in folder path, False if only in filename
-    keep_ancestor_depth: Optional[int]  # Depth of "keep" ancestor folder (None if no keep)
+    """Extended file information for resolution (slotted)."""
+
+    __slots__ = ('path', 'size', 'mtime', 'depth', 'has_keep', 'keep_in_folder', 'keep_ancestor_depth')
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        mtime: float,
+        depth: int,
+        has_keep: bool,
+        keep_in_folder: bool,
+        keep_ancestor_depth: Optional[int]
+    ):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.depth = depth
+        self.has_keep = has_keep
+        self.keep_in_folder = keep_in_folder  # True if "keep" is in folder path, False if only in filename
+        self.keep_ancestor_depth = keep_ancestor_depth  # Depth of "keep" ancestor folder (None if no keep)
+
+    def __repr__(self) -> str:
+        return f"FileInfo({self.path!r}, depth={self.depth}, has_keep={self.has_keep})"
 
 
 class DuplicateResolver:
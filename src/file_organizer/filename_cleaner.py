@@ -7,15 +7,48 @@ Handles all filename cleaning operations according to Stage 1 requirements:
 - Special character removal
 - Extension normalization
 - Collision detection and resolution
+
+Names that are already clean ASCII are recognised with a single regex match;
+everything else goes through a translate table (transliterating only
+non-ASCII names) and a bounded LRU memo, since directory and camera-style
+names repeat heavily across large trees.
 """
 
 import re
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import Dict, Iterable, Optional, Set, Tuple
 from unidecode import unidecode
 
 
+# Names that sanitize_filename() would return unchanged: a clean base
+# (alphanumeric runs joined by single underscores) plus, for files, an
+# extension with no uppercase letters, periods or non-ASCII characters.
+_CLEAN_DIRNAME = re.compile(r'[a-z0-9]+(?:_[a-z0-9]+)*')
+_CLEAN_FILENAME = re.compile(
+    r'[a-z0-9]+(?:_[a-z0-9]+)*(?:\.[\x00-\x2d\x2f-\x40\x5b-\x7f]+)?'
+)
+
+# Base-name rules 2-5 for ASCII input in one pass: lowercase, spaces and
+# periods to underscores, every other special character removed
+_BASE_TABLE = {}
+for _code in range(128):
+    _char = chr(_code).lower()
+    if _char in ' .':
+        _BASE_TABLE[_code] = '_'
+    elif _char.isalnum() or _char == '_':
+        _BASE_TABLE[_code] = _char
+    else:
+        _BASE_TABLE[_code] = None
+del _code, _char
+
+_UNDERSCORE_RUNS = re.compile(r'_{2,}')
+
+# Stem of a generated collision name: <stem>_<YYYYMMDD>_<counter>
+_COLLISION_STEM = re.compile(r'(.*)_(\d{8})_(\d+)')
+
+
 class FilenameCleaner:
     """
     Core filename sanitization engine.
@@ -31,10 +64,14 @@ class FilenameCleaner:
     
     # Maximum filename length (200 chars for safety, 255 is Linux limit)
     MAX_FILENAME_LENGTH = 200
+
+    # Sanitized names remembered per cleaner (LRU-evicted beyond this)
+    MEMO_SIZE = 65536
     
     def __init__(self):
         """Initialize the filename cleaner."""
         self.collision_counters = {}  # Track collisions per directory
+        self._sanitize_memo = lru_cache(maxsize=self.MEMO_SIZE)(self._sanitize)
         
     def sanitize_filename(self, filename: str, is_directory: bool = False) -> str:
         """
@@ -59,7 +96,16 @@ class FilenameCleaner:
         """
         if not filename or filename in ('.', '..'):
             return filename
-            
+
+        # Fast path: already-clean names come back unchanged
+        clean = _CLEAN_DIRNAME if is_directory else _CLEAN_FILENAME
+        if len(filename) <= self.MAX_FILENAME_LENGTH and clean.fullmatch(filename):
+            return filename
+
+        return self._sanitize_memo(filename, is_directory)
+
+    def _sanitize(self, filename: str, is_directory: bool) -> str:
+        """Apply the sanitize_filename() rules (memoized per cleaner)."""
         # Separate extension for files (not directories)
         if is_directory:
             base = filename
@@ -67,28 +113,21 @@ class FilenameCleaner:
         else:
             base, ext = self._split_extension(filename)
         
-        # Step 1: Transliterate non-ASCII to ASCII
-        base = unidecode(base)
-        if ext:
+        # Step 1: Transliterate non-ASCII to ASCII (pure ASCII is unchanged)
+        if not base.isascii():
+            base = unidecode(base)
+        if ext and not ext.isascii():
             ext = unidecode(ext)
         
-        # Step 2: Convert to lowercase
-        base = base.lower()
+        # Steps 2-5: Lowercase, spaces and internal periods (.tar.gz) to
+        # underscores, remove special characters (keep alphanumeric and underscore)
+        base = base.translate(_BASE_TABLE)
         if ext:
             ext = ext.lower()
         
-        # Step 3: Replace spaces with underscores
-        base = base.replace(' ', '_')
-        
-        # Step 4: Replace internal periods in base with underscores
-        # (for extensions like .tar.gz)
-        base = base.replace('.', '_')
-        
-        # Step 5: Remove special characters (keep only alphanumeric and underscore)
-        base = re.sub(r'[^a-z0-9_]', '', base)
-        
         # Step 6: Collapse consecutive underscores
-        base = re.sub(r'_+', '_', base)
+        if '__' in base:
+            base = _UNDERSCORE_RUNS.sub('_', base)
         
         # Step 7: Strip leading/trailing underscores
         base = base.strip('_')
@@ -222,6 +261,95 @@ class FilenameCleaner:
         self.collision_counters.clear()
 
 
+def _split_collision_name(name: str) -> Tuple[str, str]:
+    """Split a name like generate_collision_name() does: (stem, '.ext' or '')."""
+    stem, dot, ext = name.rpartition('.')
+    if not dot:
+        return name, ""
+    return stem, dot + ext
+
+
+class CollisionAllocator:
+    """
+    Unique-name allocation for one directory.
+
+    Seeded once from the directory listing. Tracks the lowercase names
+    taken in the directory and, per (stem, extension), the next free
+    collision counter for the date stamp, so allocating a name is O(1)
+    no matter how many names in the directory sanitize identically.
+    Generated names use the generate_collision_name() format:
+    base_YYYYMMDD_N.ext
+    """
+
+    __slots__ = ('date_stamp', 'used', 'next_counters')
+
+    def __init__(self, names: Iterable[str] = (), date_stamp: Optional[str] = None):
+        """
+        Initialize the allocator.
+
+        Args:
+            names: Names already present in the directory
+            date_stamp: YYYYMMDD stamp for collision names (default: today)
+        """
+        self.date_stamp = date_stamp or datetime.now().strftime("%Y%m%d")
+        self.used: Set[str] = set()
+        self.next_counters: Dict[Tuple[str, str], int] = {}
+        for name in names:
+            self.claim(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.used
+
+    def __len__(self) -> int:
+        return len(self.used)
+
+    def claim(self, name: str):
+        """
+        Mark a name as taken (case-insensitive).
+
+        Collision names with this allocator's date stamp also move their
+        stem's counter past them, so allocate() never has to probe.
+        """
+        name = name.lower()
+        self.used.add(name)
+
+        stem, ext = _split_collision_name(name)
+        match = _COLLISION_STEM.fullmatch(stem)
+        if match is not None and match.group(2) == self.date_stamp:
+            key = (match.group(1), ext)
+            counter = int(match.group(3)) + 1
+            if counter > self.next_counters.get(key, 1):
+                self.next_counters[key] = counter
+
+    def allocate(self, filename: str) -> str:
+        """
+        Claim filename, or the next free collision name if it is taken.
+
+        Args:
+            filename: Proposed (sanitized) name
+
+        Returns:
+            The name that was claimed
+        """
+        if filename.lower() not in self.used:
+            self.claim(filename)
+            return filename
+
+        stem, ext = _split_collision_name(filename)
+        key = (stem.lower(), ext.lower())
+        counter = self.next_counters.get(key, 1)
+
+        # claim() keeps the counter past every taken name of this stem, so
+        # the first candidate is normally free; loop only as a safeguard
+        candidate = f"{stem}_{self.date_stamp}_{counter}{ext}"
+        while candidate.lower() in self.used:
+            counter += 1
+            candidate = f"{stem}_{self.date_stamp}_{counter}{ext}"
+
+        self.claim(candidate)
+        return candidate
+
+
 def test_filename_cleaner():
     """Quick test function to validate sanitization rules."""
     cleaner = FilenameCleaner()
@@ -0,0 +1,229 @@
+"""
+In-memory planner for Stage 2 folder flattening.
+
+Computes the end result of the flattening rules on a model of the folder
+tree, then emits the minimal ordered list of filesystem operations:
+
+- One bottom-up pass reaches the fixed point: a folder's item count only
+  changes when one of its direct children is flattened, and children are
+  always evaluated before their parent
+- Cascades are simulated (a folder that becomes small after its children
+  are flattened into it is flattened too), so dry-run previews match
+  what execute mode does
+- Each surviving item moves at most once, straight to its final parent,
+  instead of once per flattened level
+
+Operations are ordered deepest source first, so every path in the plan
+is still valid when the operation runs.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .filename_cleaner import FilenameCleaner
+from .scan_index import IndexEntry
+
+# Plan operation types
+OP_MOVE = 'move'
+OP_RMDIR = 'rmdir'
+
+
+class _PlanNode:
+    """One entry of the simulated folder tree."""
+
+    __slots__ = ('name', 'path', 'depth', 'parent', 'orig_parent', 'children',
+                 'is_dir', 'used_names')
+
+    def __init__(self, name: str, path: str, depth: int, parent: Optional['_PlanNode'],
+                 entry: IndexEntry):
+        self.name = name
+        self.path = path  # Original absolute path
+        self.depth = depth
+        self.parent = parent
+        self.orig_parent = parent
+        # Real directories only; symlinked folders are never flattened
+        self.children: Optional[Dict[str, '_PlanNode']] = {} if entry.children is not None else None
+        self.is_dir = entry.is_dir
+        self.used_names: Optional[Set[str]] = None  # Lowercase names taken in this folder
+
+
+class FlattenPlan(NamedTuple):
+    """Result of planning: what gets flattened and the operations to do it."""
+    flattened: List[Tuple[str, str]]        # (folder, parent it is flattened into), in rule order
+    operations: List[Tuple[str, str, str]]  # (OP_MOVE, src, dest) or (OP_RMDIR, path, '')
+    moves: int
+    collisions: int
+
+
+class FlattenPlanner:
+    """
+    Plan folder flattening over an indexed tree.
+
+    Flattening rules (same as Stage 2 always used):
+    1. Empty folders are flattened (removed)
+    2. Single-child chains: a folder holding only one subfolder
+    3. Small folders: fewer than threshold items
+    The root folder is never flattened.
+
+    Usage:
+        planner = FlattenPlanner(threshold=5, cleaner=cleaner)
+        plan = planner.plan(index.get(root), root)
+    """
+
+    def __init__(self, threshold: int, cleaner: FilenameCleaner):
+        """
+        Initialize planner.
+
+        Args:
+            threshold: Folders with fewer items than this are flattened
+            cleaner: FilenameCleaner used to generate collision names
+        """
+        self.threshold = threshold
+        self.cleaner = cleaner
+        self.collisions = 0
+
+    def plan(self, root_entry: IndexEntry, root_path: str) -> FlattenPlan:
+        """
+        Simulate flattening and return the operations to apply.
+
+        Args:
+            root_entry: Index entry of the root folder
+            root_path: Absolute path of the root folder
+
+        Returns:
+            FlattenPlan
+        """
+        self.collisions = 0
+        root, folders = self._build_tree(root_entry, root_path)
+
+        flattened = []
+        removed = []
+        for node in folders:
+            if self._should_flatten(node):
+                flattened.append((node.path, node.parent.path))
+                removed.append(node)
+                self._flatten(node)
+
+        operations, moves = self._operations(root, removed)
+        return FlattenPlan(flattened, operations, moves, self.collisions)
+
+    def _build_tree(self, root_entry: IndexEntry, root_path: str) -> Tuple[_PlanNode, List[_PlanNode]]:
+        """
+        Copy the indexed tree into plan nodes.
+
+        Returns:
+            (root node, folders below root in evaluation order: children before parents)
+        """
+        root = _PlanNode(os.path.basename(root_path), root_path, 0, None, root_entry)
+        preorder = []
+        stack = [(root, root_entry)]
+        while stack:
+            node, entry = stack.pop()
+            preorder.append(node)
+            subdirs = []
+            for name, child_entry in entry.children.items():
+                child = _PlanNode(name, os.path.join(node.path, name), node.depth + 1, node, child_entry)
+                node.children[name] = child
+                if child.children is not None:
+                    subdirs.append((child, child_entry))
+            stack.extend(subdirs)
+
+        # This pre-order takes subfolders last-first, so its reverse is a
+        # post-order in listing order: every folder after all its descendants
+        folders = [node for node in reversed(preorder) if node is not root]
+        return root, folders
+
+    def _should_flatten(self, node: _PlanNode) -> bool:
+        """Apply the flattening rules to a folder's current (simulated) contents."""
+        if node.children is None:
+            return False
+
+        num_items = len(node.children)
+
+        # Empty folders are flattened (effectively removed)
+        if num_items == 0:
+            return True
+
+        # Single-child chain (only one subfolder, no files)
+        if num_items == 1 and next(iter(node.children.values())).is_dir:
+            return True
+
+        # Small folder (< threshold items)
+        return num_items < self.threshold
+
+    def _flatten(self, node: _PlanNode):
+        """Move a folder's simulated contents into its parent and drop the folder."""
+        parent = node.parent
+
+        # Reserve every name currently in the parent (including this folder's
+        # own name) before anything moves, so planned names never clash with
+        # an entry that still exists when the move runs
+        self._used_names(parent)
+
+        for child in list(node.children.values()):
+            new_name = self._resolve_collision(parent, child.name)
+            child.name = new_name
+            child.parent = parent
+            parent.children[new_name] = child
+
+        node.children.clear()
+        del parent.children[node.name]
+
+    def _used_names(self, node: _PlanNode) -> Set[str]:
+        """Lowercase names taken in a folder (seeded from its current contents)."""
+        if node.used_names is None:
+            node.used_names = {name.lower() for name in node.children}
+        return node.used_names
+
+    def _resolve_collision(self, parent: _PlanNode, name: str) -> str:
+        """Return a name unique within parent (case-insensitive) and reserve it."""
+        used = self._used_names(parent)
+
+        if name.lower() in used:
+            original_name = name
+            name = self.cleaner.generate_collision_name(name, Path(parent.path))
+            self.collisions += 1
+
+            # Keep trying if still collides
+            while name.lower() in used:
+                name = self.cleaner.generate_collision_name(original_name, Path(parent.path))
+
+        used.add(name.lower())
+        return name
+
+    def _operations(self, root: _PlanNode, removed: List[_PlanNode]) -> Tuple[List[Tuple[str, str, str]], int]:
+        """
+        Collect the minimal operations, ordered deepest first.
+
+        An entry moves once, from its original path to its final parent,
+        when its original parent is flattened. Flattened folders are
+        removed once emptied.
+
+        Args:
+            root: Root of the simulated (final) tree
+            removed: Flattened folders, in rule order
+
+        Returns:
+            (operations, number of moves)
+        """
+        ops = []  # (original depth, 0 = move / 1 = rmdir, operation)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for child in node.children.values():
+                if child.parent is not child.orig_parent:
+                    # Final parents never move before this runs (they are shallower)
+                    dest = os.path.join(node.path, child.name)
+                    ops.append((child.depth, 0, (OP_MOVE, child.path, dest)))
+                if child.children is not None:
+                    stack.append(child)
+
+        for node in removed:
+            ops.append((node.depth, 1, (OP_RMDIR, node.path, '')))
+
+        moves = len(ops) - len(removed)
+
+        # Deepest first; at one depth, move entries out before removing folders
+        ops.sort(key=lambda item: (-item[0], item[1]))
+        return [op for _, _, op in ops], moves
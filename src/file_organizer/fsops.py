@@ -0,0 +1,140 @@
+"""
+Directory-fd relative filesystem mutations.
+
+Stages that rename and delete many entries open each parent directory once
+and issue the syscalls relative to that descriptor (renameat, unlinkat,
+fchmodat, fstatat) instead of passing absolute paths:
+- The kernel resolves only the final name, not every path component again
+- Parents are opened with O_DIRECTORY | O_NOFOLLOW, which protects only the
+  final component of the parent path: a parent directory swapped for a
+  symlink after the scan makes the operation fail. Symlinks swapped into
+  any ancestor above it are still followed when the parent is opened, and
+  once a parent is open, operations stay within that directory even if its
+  path is changed later
+- Platforms without dir_fd support (os.supports_dir_fd) fall back to the
+  plain absolute-path calls
+"""
+
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+PathLike = Union[str, 'os.PathLike[str]']
+
+# renameat/unlinkat/fchmodat/fstatat (and openat) available on this platform
+DIR_FD_SUPPORTED = {os.open, os.rename, os.unlink, os.chmod, os.stat} <= os.supports_dir_fd
+
+# Flags for opening parent directories (missing flags are skipped on other platforms)
+_DIR_OPEN_FLAGS = (
+    os.O_RDONLY
+    | getattr(os, 'O_DIRECTORY', 0)
+    | getattr(os, 'O_NOFOLLOW', 0)
+    | getattr(os, 'O_CLOEXEC', 0)
+)
+
+# Parent directory descriptors kept open per DirFdOps (LRU-closed beyond this)
+DEFAULT_MAX_OPEN_DIRS = 64
+
+
+class DirFdOps:
+    """
+    Rename, unlink, chmod and stat relative to cached parent directory fds.
+
+    Descriptors are kept in a small LRU and closed by close() or on leaving
+    a ``with`` block; a closed instance reopens directories as needed.
+    Renaming a directory closes the cached descriptors of it and of the
+    directories below it, so paths are never resolved through a stale
+    cache entry. Only the last component of each parent path is opened
+    with O_NOFOLLOW (see the module docstring).
+
+    Not thread-safe: use one instance per thread (Stage 1 rename workers
+    each get their own).
+    """
+
+    def __init__(self, use_dir_fd: Optional[bool] = None, max_open_dirs: int = DEFAULT_MAX_OPEN_DIRS):
+        """
+        Initialize the helper.
+
+        Args:
+            use_dir_fd: Use directory-relative syscalls (default: if supported);
+                False always uses absolute paths
+            max_open_dirs: Parent directory descriptors kept open (min 2)
+        """
+        self.use_dir_fd = DIR_FD_SUPPORTED if use_dir_fd is None else (use_dir_fd and DIR_FD_SUPPORTED)
+        self.max_open_dirs = max(2, max_open_dirs)
+        self._fds: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {'dirs_opened': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close all cached directory descriptors."""
+        while self._fds:
+            os.close(self._fds.popitem()[1])
+
+    def _split(self, path: PathLike) -> Tuple[str, str]:
+        """Return (absolute parent directory, name) of a path."""
+        return os.path.split(os.path.abspath(os.fspath(path)))
+
+    def _dir_fd(self, directory: str) -> int:
+        """Descriptor of a directory, opening it on first use."""
+        fd = self._fds.get(directory)
+        if fd is not None:
+            self._fds.move_to_end(directory)
+            return fd
+
+        fd = os.open(directory, _DIR_OPEN_FLAGS)
+        self._fds[directory] = fd
+        self.stats['dirs_opened'] += 1
+        if len(self._fds) > self.max_open_dirs:
+            os.close(self._fds.popitem(last=False)[1])
+        return fd
+
+    def _forget(self, path: str):
+        """Close descriptors of a moved directory and the directories below it."""
+        prefix = path + os.sep
+        for directory in [d for d in self._fds if d == path or d.startswith(prefix)]:
+            os.close(self._fds.pop(directory))
+
+    def rename(self, src: PathLike, dst: PathLike):
+        """Rename src to dst (like os.rename)."""
+        if not self.use_dir_fd:
+            os.rename(src, dst)
+            return
+
+        src_dir, src_name = self._split(src)
+        dst_dir, dst_name = self._split(dst)
+        src_fd = self._dir_fd(src_dir)
+        dst_fd = self._dir_fd(dst_dir)
+        os.rename(src_name, dst_name, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+        self._forget(os.path.join(src_dir, src_name))
+
+    def unlink(self, path: PathLike):
+        """Remove a file or symlink (like os.unlink)."""
+        if not self.use_dir_fd:
+            os.unlink(path)
+            return
+
+        directory, name = self._split(path)
+        os.unlink(name, dir_fd=self._dir_fd(directory))
+
+    def chmod(self, path: PathLike, mode: int):
+        """Change permission bits (like os.chmod)."""
+        if not self.use_dir_fd:
+            os.chmod(path, mode)
+            return
+
+        directory, name = self._split(path)
+        os.chmod(name, mode, dir_fd=self._dir_fd(directory))
+
+    def stat(self, path: PathLike, follow_symlinks: bool = True) -> os.stat_result:
+        """Stat a path (like os.stat)."""
+        if not self.use_dir_fd:
+            return os.stat(path, follow_symlinks=follow_symlinks)
+
+        directory, name = self._split(path)
+        return os.stat(name, dir_fd=self._dir_fd(directory), follow_symlinks=follow_symlinks)
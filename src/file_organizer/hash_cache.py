@@ -1,32 +1,416 @@
 """
 SQLite-based file hash cache for duplicate detection.
 
-Stores file metadata (path, size, mtime) and hashes (nullable for unique sizes).
+Stores file metadata (path, size, mtime, device/inode) and hashes (nullable for unique sizes).
 Supports metadata-first deduplication strategy and moved file detection.
+Hash results can be written behind through a batching CacheWriter.
+
+Entries are keyed by a registered root directory plus the path relative
+to it, so one cache directory can serve many unrelated trees: queries for
+a folder label ('input', 'output') only see the root registered for it.
+Directory paths are stored once in a directories table; file rows hold
+only a dir_id and the file name, and hex digests are stored as BLOBs.
 """
 
 import sqlite3
 import os
+from array import array
+from itertools import groupby
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
-from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 import time
 
 
-@dataclass
+# hash_type values stored in file_cache
+HASH_TYPE_FULL = 'full'
+HASH_TYPE_SAMPLED = 'sampled'
+
+# Per-connection tuning defaults (applied on every open)
+DEFAULT_CACHE_SIZE_MB = 64
+MMAP_MIN_MB = 64
+MMAP_MAX_MB = 4096
+MMAP_HEADROOM = 1.25  # Auto mmap covers the database plus room to grow
+
+# Write-behind defaults: flush every N entries or after N seconds
+WRITER_BATCH_SIZE = 1000
+WRITER_FLUSH_INTERVAL = 5.0
+
+# Root path used for a folder label with no registered root (absolute paths)
+UNSCOPED_ROOT_FORMAT = '<{}>'
+
+# Layout version stored in PRAGMA user_version. Older layouts (both left
+# user_version at 0) are told apart by their columns:
+#   (file_path, folder) keys -> (root_id, rel_path) keys -> 2: (dir_id, name)
+#   keys into the directories table, hex hashes stored as BLOBs
+#   -> 3: st_mtime_ns/st_ctime_ns validation columns (added in place)
+SCHEMA_VERSION = 3
+
+# Rows fetched per fetchmany() call by the streaming readers (iter_*, load_columns)
+FETCH_BATCH_SIZE = 5000
+
+# Bound parameters per statement: SQLITE_MAX_VARIABLE_NUMBER was 999 before
+# SQLite 3.32.0 and is 32766 since (queried from the connection where possible)
+SQLITE_LEGACY_MAX_VARIABLES = 999
+SQLITE_MAX_VARIABLES = 32766
+
+# get_files_by_paths: lists longer than this are joined through a TEMP table
+# instead of chunked VALUES joins (one statement, one index probe per key)
+PATH_JOIN_MIN = 2000
+
+# One shared str object per hash_type (SQLite returns a new str for every row)
+_HASH_TYPES = {HASH_TYPE_FULL: HASH_TYPE_FULL, HASH_TYPE_SAMPLED: HASH_TYPE_SAMPLED}
+
+
+def _is_unscoped_root(root_path: str) -> bool:
+    """True for the per-label roots that hold absolute paths."""
+    return root_path.startswith('<')
+
+
+def _is_populated_dir(path: str) -> bool:
+    """
+    True if path is a directory with at least one entry.
+
+    An unmounted NAS or USB share usually leaves an empty mountpoint, so
+    missing and empty directories both count as unreachable.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return any(True for _ in entries)
+    except OSError:
+        return False
+
+
+def _directory_path(root_path: str, rel_dir: str) -> str:
+    """Absolute path of a directory row (unscoped roots store absolute rel_dirs)."""
+    if _is_unscoped_root(root_path):
+        return rel_dir
+    if not rel_dir:
+        return root_path
+    return os.path.join(root_path, rel_dir)
+
+
+def _encode_hash(file_hash: Optional[str]) -> Any:
+    """Stored form of a hash: hex digests as BLOBs (half the bytes), anything else as is."""
+    if not file_hash:
+        return file_hash
+    try:
+        blob = bytes.fromhex(file_hash)
+    except (TypeError, ValueError):
+        return file_hash
+    # Only lowercase hex without separators round-trips through .hex()
+    return blob if blob.hex() == file_hash else file_hash
+
+
+def _decode_hash(value: Any) -> Optional[str]:
+    """Hash as returned to callers (hex string) from its stored form."""
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _fetch_rows(cursor: sqlite3.Cursor, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """Yield the rows of an executed query, fetching batch_size rows at a time."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
 class CachedFile:
-    """Represents a cached file entry."""
-    file_path: str
-    folder: str
-    file_hash: Optional[str]
-    hash_type: Optional[str]
-    sample_size: Optional[int]
-    file_size: int
-    file_mtime: float
-    video_duration: Optional[float]
-    video_codec: Optional[str]
-    video_resolution: Optional[str]
-    last_checked: float
+    """
+    Represents a cached file entry.
+
+    Slotted (no per-instance __dict__): Stage 3 can hold one per scanned
+    file, so the per-record overhead matters more than anywhere else.
+    """
+
+    __slots__ = (
+        'file_path', 'folder', 'file_hash', 'hash_type', 'sample_size',
+        'file_size', 'file_mtime', 'video_duration', 'video_codec',
+        'video_resolution', 'last_checked', 'file_dev', 'file_ino',
+        'file_mtime_ns', 'file_ctime_ns'
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        folder: str,
+        file_hash: Optional[str],
+        hash_type: Optional[str],
+        sample_size: Optional[int],
+        file_size: int,
+        file_mtime: float,
+        video_duration: Optional[float],
+        video_codec: Optional[str],
+        video_resolution: Optional[str],
+        last_checked: float,
+        file_dev: Optional[int] = None,
+        file_ino: Optional[int] = None,
+        file_mtime_ns: Optional[int] = None,
+        file_ctime_ns: Optional[int] = None
+    ):
+        self.file_path = file_path
+        self.folder = folder
+        self.file_hash = file_hash
+        self.hash_type = _HASH_TYPES.get(hash_type, hash_type)
+        self.sample_size = sample_size
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+        self.video_duration = video_duration
+        self.video_codec = video_codec
+        self.video_resolution = video_resolution
+        self.last_checked = last_checked
+        self.file_dev = file_dev  # st_dev (None if not recorded)
+        self.file_ino = file_ino  # st_ino (None if not recorded)
+        self.file_mtime_ns = file_mtime_ns  # st_mtime_ns (None if not recorded)
+        self.file_ctime_ns = file_ctime_ns  # st_ctime_ns (None if not recorded or moved)
+
+    def __repr__(self) -> str:
+        return f"CachedFile({self.file_path!r}, {self.folder}, size={self.file_size}, hash={self.file_hash})"
+
+    @property
+    def full_hash(self) -> Optional[str]:
+        """Whole-file hash, or None if the entry is unhashed or only sampled."""
+        if self.hash_type == HASH_TYPE_SAMPLED:
+            return None
+        return self.file_hash
+
+    @property
+    def inode_key(self) -> Optional[Tuple[int, int]]:
+        """(st_dev, st_ino) identifying the file's inode, or None if unknown."""
+        if not self.file_ino:
+            return None
+        return (self.file_dev, self.file_ino)
+
+    def matches(
+        self,
+        file_size: int,
+        file_mtime: float,
+        mtime_ns: int = 0,
+        ino: int = 0,
+        ctime_ns: int = 0
+    ) -> bool:
+        """
+        Whether the entry still describes a file with these stat values.
+
+        Entries with st_mtime_ns are validated exactly on (size,
+        st_mtime_ns, st_ino, st_ctime_ns); a value unknown on either side
+        (0 or None) is not compared. Entries written before nanosecond
+        times were stored fall back to the float st_mtime.
+        """
+        if self.file_size != file_size:
+            return False
+        if not (self.file_mtime_ns and mtime_ns):
+            return self.file_mtime == file_mtime
+        if self.file_mtime_ns != mtime_ns:
+            return False
+        if self.file_ino and ino and self.file_ino != ino:
+            return False
+        if self.file_ctime_ns and ctime_ns and self.file_ctime_ns != ctime_ns:
+            return False
+        return True
+
+
+def _cached_file_from_row(row: sqlite3.Row, file_path: str, folder: str) -> CachedFile:
+    """Build a CachedFile from a file_cache row (rows store only dir_id and name)."""
+    return CachedFile(
+        file_path=file_path,
+        folder=folder,
+        file_hash=_decode_hash(row['file_hash']),
+        hash_type=row['hash_type'],
+        sample_size=row['sample_size'],
+        file_size=row['file_size'],
+        file_mtime=row['file_mtime'],
+        video_duration=row['video_duration'],
+        video_codec=row['video_codec'],
+        video_resolution=row['video_resolution'],
+        last_checked=row['last_checked'],
+        file_dev=row['file_dev'],
+        file_ino=row['file_ino'],
+        file_mtime_ns=row['file_mtime_ns'],
+        file_ctime_ns=row['file_ctime_ns']
+    )
+
+
+class CachedColumns:
+    """
+    Struct-of-arrays view of cache entries (see HashCache.load_columns).
+
+    Row i is the file names[i] in directory dir_paths[dir_ids[i]], with
+    sizes[i], mtimes[i], ...; nanosecond times, file_dev and file_ino are
+    0 when not recorded.
+    """
+
+    __slots__ = (
+        'folder', 'dir_paths', 'dir_ids', 'names', 'sizes', 'mtimes',
+        'mtimes_ns', 'ctimes_ns', 'devs', 'inos', 'hashes', 'hash_types'
+    )
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.dir_paths: Dict[int, str] = {}  # dir_id -> absolute directory path
+        self.dir_ids = array('q')
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.mtimes_ns = array('q')
+        self.ctimes_ns = array('q')
+        self.devs = array('q')
+        self.inos = array('q')
+        self.hashes: List[Optional[str]] = []
+        self.hash_types: List[Optional[str]] = []
+
+    def extend(self, rows: Iterable[Tuple]):
+        """Append rows of (dir_id, name, size, mtime, mtime_ns, ctime_ns, dev, ino, hash, hash_type)."""
+        for dir_id, name, size, mtime, mtime_ns, ctime_ns, dev, ino, file_hash, hash_type in rows:
+            self.dir_ids.append(dir_id)
+            self.names.append(name)
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+            self.mtimes_ns.append(mtime_ns or 0)
+            self.ctimes_ns.append(ctime_ns or 0)
+            self.devs.append(dev or 0)
+            self.inos.append(ino or 0)
+            self.hashes.append(_decode_hash(file_hash))
+            self.hash_types.append(_HASH_TYPES.get(hash_type, hash_type))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, i: int) -> str:
+        """Absolute path of row i."""
+        return os.path.join(self.dir_paths[self.dir_ids[i]], self.names[i])
+
+    def iter_paths(self) -> Iterator[Tuple[str, int]]:
+        """Yield (absolute path, size) for every row."""
+        for i in range(len(self.names)):
+            yield self.path(i), self.sizes[i]
+
+    def record(self, i: int) -> CachedFile:
+        """Row i as a CachedFile (video metadata is not loaded)."""
+        return CachedFile(
+            file_path=self.path(i),
+            folder=self.folder,
+            file_hash=self.hashes[i],
+            hash_type=self.hash_types[i],
+            sample_size=None,
+            file_size=self.sizes[i],
+            file_mtime=self.mtimes[i],
+            video_duration=None,
+            video_codec=None,
+            video_resolution=None,
+            last_checked=0.0,
+            file_dev=self.devs[i] or None,
+            file_ino=self.inos[i] or None,
+            file_mtime_ns=self.mtimes_ns[i] or None,
+            file_ctime_ns=self.ctimes_ns[i] or None
+        )
+
+
+class CacheWriter:
+    """
+    Write-behind buffer for cache entries.
+
+    Entries are accumulated in memory and written with one save_batch()
+    transaction once batch_size entries are pending or flush_interval
+    seconds have passed. Pending entries are flushed when the writer is
+    closed (including on exceptions inside a ``with`` block) and when the
+    owning HashCache is closed or queried in bulk.
+
+    Usage:
+        with cache.writer() as writer:
+            writer.add(file_path=..., folder=..., file_size=..., file_mtime=..., file_hash=...)
+    """
+
+    def __init__(
+        self,
+        cache: 'HashCache',
+        batch_size: int = WRITER_BATCH_SIZE,
+        flush_interval: float = WRITER_FLUSH_INTERVAL
+    ):
+        """
+        Initialize writer.
+
+        Args:
+            cache: HashCache to write to
+            batch_size: Flush once this many entries are pending
+            flush_interval: Flush once this many seconds have passed since the last flush
+        """
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.entries_written = 0
+        self.flushes = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, **entry):
+        """
+        Queue a cache entry (same fields as HashCache.save_to_cache).
+
+        A later entry for the same (file_path, folder) replaces the pending one.
+        """
+        entry.setdefault('last_checked', time.time())
+        self.pending[(entry['file_path'], entry['folder'])] = entry
+
+        if (
+            len(self.pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def get(self, file_path: str, folder: str) -> Optional[CachedFile]:
+        """Return the pending (not yet written) entry for a file, if any."""
+        entry = self.pending.get((file_path, folder))
+        if entry is None:
+            return None
+
+        return CachedFile(
+            file_path=entry['file_path'],
+            folder=entry['folder'],
+            file_hash=entry.get('file_hash'),
+            hash_type=entry.get('hash_type'),
+            sample_size=entry.get('sample_size'),
+            file_size=entry['file_size'],
+            file_mtime=entry['file_mtime'],
+            video_duration=entry.get('video_duration'),
+            video_codec=entry.get('video_codec'),
+            video_resolution=entry.get('video_resolution'),
+            last_checked=entry['last_checked'],
+            file_dev=entry.get('file_dev'),
+            file_ino=entry.get('file_ino'),
+            file_mtime_ns=entry.get('file_mtime_ns'),
+            file_ctime_ns=entry.get('file_ctime_ns')
+        )
+
+    def flush(self):
+        """Write all pending entries in a single transaction."""
+        self._last_flush = time.monotonic()
+        if not self.pending:
+            return
+
+        entries = list(self.pending.values())
+        self.pending.clear()
+        self.cache.save_batch(entries)
+        self.entries_written += len(entries)
+        self.flushes += 1
+
+    def close(self):
+        """Flush pending entries and detach from the cache."""
+        try:
+            self.flush()
+        finally:
+            self.cache._writers.discard(self)
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit (flushes even if an exception is propagating)."""
+        self.close()
+        return False
 
 
 class HashCache:
@@ -39,16 +423,30 @@ class HashCache:
     - Video metadata storage
     - Cache invalidation on size/mtime changes
 
+    Rows are keyed by (dir_id, name), where dir_id names a directory
+    relative to a root. register_root() binds a folder label to a
+    directory for the session; until then (or for files outside it) the
+    label maps to an unscoped root that stores absolute directory paths.
+    The public API always takes and returns absolute paths and hex hashes.
+
     Database location: .file_organizer_cache/hashes.db in execution directory
     """
 
-    def __init__(self, cache_dir: Optional[Path] = None, verbose: bool = False):
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        verbose: bool = False,
+        cache_size_mb: int = DEFAULT_CACHE_SIZE_MB,
+        mmap_size_mb: Optional[int] = None
+    ):
         """
         Initialize hash cache.
 
         Args:
             cache_dir: Directory for cache database (defaults to .file_organizer_cache in CWD)
             verbose: Print status messages during initialization
+            cache_size_mb: SQLite page cache size per connection in MB (default 64)
+            mmap_size_mb: Memory-mapped I/O size in MB (None = scale to database size, 0 = off)
         """
         if cache_dir is None:
             cache_dir = Path.cwd() / '.file_organizer_cache'
@@ -59,6 +457,16 @@ class HashCache:
 
         self.db_path = self.cache_dir / 'hashes.db'
         self.conn: Optional[sqlite3.Connection] = None
+        self._writers = set()
+        self._roots: Dict[str, Tuple[int, str]] = {}           # folder -> registered root
+        self._unscoped_roots: Dict[str, Tuple[int, str]] = {}  # folder -> unscoped root
+        self._root_paths: Dict[int, str] = {}
+        self._dir_ids: Dict[Tuple[int, str], int] = {}  # (root_id, rel_dir) -> dir_id
+        self._dir_paths: Dict[int, str] = {}            # dir_id -> absolute directory path
+        self._loaded_roots = set()                      # roots whose directories are in the maps
+        self._lookup_tables = 0  # TEMP path lookup tables created (unique names)
+        self.cache_size_mb = cache_size_mb
+        self.mmap_size_mb = mmap_size_mb
 
         # Open database and create schema if needed
         if self.verbose:
@@ -84,11 +492,59 @@ class HashCache:
         """Open SQLite database connection."""
         self.conn = sqlite3.connect(str(self.db_path))
         self.conn.row_factory = sqlite3.Row  # Enable column access by name
+        self._apply_connection_tuning()
+        self.max_variables = self._max_variables()
+
+    def _max_variables(self) -> int:
+        """Bound parameters allowed per statement on this connection."""
+        getlimit = getattr(self.conn, 'getlimit', None)  # Python 3.11+
+        if getlimit is not None:
+            return getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        if sqlite3.sqlite_version_info >= (3, 32, 0):
+            return SQLITE_MAX_VARIABLES
+        return SQLITE_LEGACY_MAX_VARIABLES
+
+    def _mmap_size_bytes(self) -> int:
+        """Resolve the mmap size: explicit MB value, or database size plus headroom."""
+        if self.mmap_size_mb is not None:
+            return max(0, int(self.mmap_size_mb)) * 1024 * 1024
+
+        db_size = self.db_path.stat().st_size if self.db_path.exists() else 0
+        mmap_mb = int(db_size * MMAP_HEADROOM / (1024 * 1024)) + 1
+        return min(max(mmap_mb, MMAP_MIN_MB), MMAP_MAX_MB) * 1024 * 1024
+
+    def _apply_connection_tuning(self):
+        """
+        Apply per-connection PRAGMAs.
+
+        cache_size, mmap_size, synchronous and temp_store are not stored in
+        the database file, so they must be set on every connection (not just
+        when the schema is first created).
+        """
+        cursor = self.conn.cursor()
+
+        # Normal synchronous mode (faster than FULL, still safe with WAL)
+        cursor.execute("PRAGMA synchronous=NORMAL")
+
+        # Page cache size (negative = KB)
+        cursor.execute(f"PRAGMA cache_size=-{int(self.cache_size_mb) * 1024}")
+
+        # Store temp tables in memory for speed
+        cursor.execute("PRAGMA temp_store=MEMORY")
+
+        # Memory-mapped I/O sized to the database (avoids re-reading pages)
+        cursor.execute(f"PRAGMA mmap_size={self._mmap_size_bytes()}")
 
     def _create_schema(self):
         """Create database schema and indexes if they don't exist."""
         cursor = self.conn.cursor()
 
+        # Current databases are recognised by their version alone
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
         # Check if table exists to avoid unnecessary work
         cursor.execute("""
             SELECT name FROM sqlite_master
@@ -104,71 +560,375 @@ class HashCache:
                 sys.stdout.flush()
 
             # Write-Ahead Logging mode for better concurrency and performance
+            # (persistent: stored in the database file; per-connection
+            # settings are applied in _apply_connection_tuning)
             cursor.execute("PRAGMA journal_mode=WAL")
 
-            # Normal synchronous mode (faster than FULL, still safe)
-            cursor.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables(cursor)
+            self.conn.commit()
+        elif version:
+            # Versioned layout: later versions only add columns
+            self._upgrade_schema(cursor, version)
+        else:
+            # Tables were written by an older version; rewrite the layout
+            self._migrate_schema(cursor)
 
-            # Larger cache size (10MB default, increase to 50MB)
-            cursor.execute("PRAGMA cache_size=-51200")  # Negative = KB
+    def _create_tables(self, cursor: sqlite3.Cursor):
+        """Create the cache tables and indexes."""
+        # Registered root directories (and one unscoped root per folder label)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_roots (
+                root_id INTEGER PRIMARY KEY,
+                root_path TEXT NOT NULL UNIQUE,
+                last_used REAL NOT NULL
+            )
+        """)
 
-            # Store temp tables in memory for speed
-            cursor.execute("PRAGMA temp_store=MEMORY")
+        # Each directory path is stored once ('' is the root itself;
+        # unscoped roots store absolute directory paths)
+        cursor.execute("""
+            CREATE TABLE directories (
+                dir_id INTEGER PRIMARY KEY,
+                root_id INTEGER NOT NULL,
+                rel_dir TEXT NOT NULL,
+                UNIQUE (root_id, rel_dir)
+            )
+        """)
 
-            # Memory-mapped I/O (64MB - sufficient for ~80K files)
-            cursor.execute("PRAGMA mmap_size=67108864")  # 64MB
+        # Create main cache table
+        cursor.execute("""
+            CREATE TABLE file_cache (
+                -- Primary file identification (directory row + file name)
+                dir_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                root_id INTEGER NOT NULL,  -- Copy of directories.root_id
+
+                -- Hash information (nullable for unique-sized files;
+                -- hex digests are stored as BLOBs)
+                file_hash BLOB,
+                hash_type TEXT,
+                sample_size INTEGER,
+
+                -- File metadata (for moved file detection)
+                file_size INTEGER NOT NULL,
+                file_mtime REAL NOT NULL,
+
+                -- Exact validation key (NULL if unknown; ctime is cleared
+                -- when the entry is moved, since a rename changes it)
+                file_mtime_ns INTEGER,
+                file_ctime_ns INTEGER,
+
+                -- Inode identity (hard links share it; NULL if unknown)
+                file_dev INTEGER,
+                file_ino INTEGER,
+
+                -- Video-specific metadata (NULL for non-videos)
+                video_duration REAL,
+                video_codec TEXT,
+                video_resolution TEXT,
+
+                -- Cache management
+                last_checked REAL NOT NULL,
+
+                PRIMARY KEY (dir_id, name)
+            ) WITHOUT ROWID
+        """)
 
-            # Create main cache table
-            cursor.execute("""
-                CREATE TABLE file_cache (
-                    -- Primary file identification
-                    file_path TEXT NOT NULL,
-                    folder TEXT NOT NULL,
+        # Secondary indexes carry the primary key, so both cover the
+        # (dir_id, name) lookups made through them.
+        # Per-root scans, size grouping, counts and identity lookups
+        cursor.execute("""
+            CREATE INDEX idx_size_grouping
+            ON file_cache(root_id, file_size)
+        """)
 
-                    -- Hash information (nullable for unique-sized files)
-                    file_hash TEXT,
-                    hash_type TEXT,
-                    sample_size INTEGER,
+        # Hash lookups and intersections (unhashed files are left out)
+        cursor.execute("""
+            CREATE INDEX idx_hash_lookup
+            ON file_cache(file_hash, root_id)
+            WHERE file_hash IS NOT NULL
+        """)
 
-                    -- File metadata (for moved file detection)
-                    file_size INTEGER NOT NULL,
-                    file_mtime REAL NOT NULL,
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
-                    -- Video-specific metadata (NULL for non-videos)
-                    video_duration REAL,
-                    video_codec TEXT,
-                    video_resolution TEXT,
+    def _upgrade_schema(self, cursor: sqlite3.Cursor, version: int):
+        """Bring a versioned database up to SCHEMA_VERSION in place."""
+        if version < 3:
+            # Older entries keep NULL and are validated on the float mtime
+            cursor.execute("ALTER TABLE file_cache ADD COLUMN file_mtime_ns INTEGER")
+            cursor.execute("ALTER TABLE file_cache ADD COLUMN file_ctime_ns INTEGER")
 
-                    -- Cache management
-                    last_checked REAL NOT NULL,
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
 
-                    PRIMARY KEY (file_path, folder)
-                )
-            """)
+    def _migrate_schema(self, cursor: sqlite3.Cursor):
+        """
+        Rewrite databases from older layouts into the current one.
+
+        Databases keyed by (file_path, folder) get one unscoped root per
+        folder label holding the absolute paths; register_root() later
+        adopts the entries under its directory, so existing hashes are
+        kept. Databases keyed by (root_id, rel_path) keep their roots.
+        Paths are split into directory rows and names, and hex hashes are
+        converted to BLOBs.
+        """
+        cursor.execute("PRAGMA table_info(file_cache)")
+        columns = {row['name'] for row in cursor.fetchall()}
 
-            # Create all indexes at once (faster than checking each one)
-            cursor.execute("""
-                CREATE INDEX idx_file_identity
-                ON file_cache(file_size, file_mtime, file_hash)
-            """)
+        if self.verbose:
+            print("  Migrating cache to schema version {}...".format(SCHEMA_VERSION))
+            import sys
+            sys.stdout.flush()
 
-            cursor.execute("""
-                CREATE INDEX idx_hash_lookup
-                ON file_cache(file_hash)
-            """)
+        # Path and hash conversions used by the INSERT ... SELECT below
+        self.conn.create_function('path_dir', 1, lambda path: os.path.split(path)[0], deterministic=True)
+        self.conn.create_function('path_name', 1, lambda path: os.path.split(path)[1], deterministic=True)
+        self.conn.create_function('hash_blob', 1, _encode_hash, deterministic=True)
 
-            cursor.execute("""
-                CREATE INDEX idx_folder
-                ON file_cache(folder)
-            """)
+        cursor.execute("BEGIN")
+        cursor.execute("ALTER TABLE file_cache RENAME TO file_cache_legacy")
+        for index in ('idx_file_identity', 'idx_hash_lookup', 'idx_folder', 'idx_size_grouping'):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        self._create_tables(cursor)
+
+        if 'folder' in columns:
+            # Inode columns only exist in databases written by newer versions
+            file_dev = 'l.file_dev' if 'file_dev' in columns else 'NULL'
+            file_ino = 'l.file_ino' if 'file_ino' in columns else 'NULL'
 
             cursor.execute("""
-                CREATE INDEX idx_size_grouping
-                ON file_cache(file_size)
-            """)
+                INSERT OR IGNORE INTO cache_roots (root_path, last_used)
+                SELECT DISTINCT '<' || folder || '>', ? FROM file_cache_legacy
+            """, (time.time(),))
+            source = f"""
+                SELECT r.root_id, l.file_path AS rel_path, l.file_hash, l.hash_type,
+                       l.sample_size, l.file_size, l.file_mtime, {file_dev} AS file_dev,
+                       {file_ino} AS file_ino, l.video_duration, l.video_codec,
+                       l.video_resolution, l.last_checked
+                FROM file_cache_legacy l
+                JOIN cache_roots r ON r.root_path = '<' || l.folder || '>'
+            """
+        else:
+            source = "SELECT * FROM file_cache_legacy"
 
-            self.conn.commit()
-        # else: Table and indexes already exist, skip creation and PRAGMA settings
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO directories (root_id, rel_dir)
+            SELECT DISTINCT root_id, path_dir(rel_path) FROM ({source})
+        """)
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO file_cache (
+                dir_id, name, root_id, file_hash, hash_type, sample_size,
+                file_size, file_mtime, file_dev, file_ino, video_duration,
+                video_codec, video_resolution, last_checked
+            )
+            SELECT d.dir_id, path_name(s.rel_path), s.root_id, hash_blob(s.file_hash),
+                   s.hash_type, s.sample_size, s.file_size, s.file_mtime, s.file_dev,
+                   s.file_ino, s.video_duration, s.video_codec, s.video_resolution,
+                   s.last_checked
+            FROM ({source}) s
+            JOIN directories d ON d.root_id = s.root_id AND d.rel_dir = path_dir(s.rel_path)
+        """)
+        cursor.execute("DROP TABLE file_cache_legacy")
+        self.conn.commit()
+
+        # Hand the old table's pages back to the filesystem
+        cursor.execute("VACUUM")
+
+    def register_root(self, folder: str, root_path: Any) -> int:
+        """
+        Bind a folder label to a root directory for this session.
+
+        Entries for files under root_path are stored relative to it, and
+        bulk queries for the label (get_all_files, get_size_groups, ...)
+        only see this root. Entries cached for files under root_path
+        without a registered root (e.g. by older versions) are adopted.
+
+        Args:
+            folder: Folder label ('input' or 'output')
+            root_path: Root directory
+
+        Returns:
+            root_id of the root
+        """
+        self._flush_writers()
+        root_path = os.path.abspath(os.fspath(root_path))
+        root_id = self._root_id(root_path)
+        self._roots[folder] = (root_id, root_path)
+        self._adopt_unscoped_entries(root_id, root_path)
+        return root_id
+
+    def _root_id(self, root_path: str) -> int:
+        """Get (creating if needed) the id of a root and mark it used."""
+        cursor = self.conn.cursor()
+        now = time.time()
+        cursor.execute(
+            "INSERT OR IGNORE INTO cache_roots (root_path, last_used) VALUES (?, ?)",
+            (root_path, now)
+        )
+        cursor.execute("UPDATE cache_roots SET last_used = ? WHERE root_path = ?", (now, root_path))
+        cursor.execute("SELECT root_id FROM cache_roots WHERE root_path = ?", (root_path,))
+        root_id = cursor.fetchone()['root_id']
+        self.conn.commit()
+
+        self._root_paths[root_id] = root_path
+        return root_id
+
+    def _adopt_unscoped_entries(self, root_id: int, root_path: str):
+        """Move unscoped entries of files under root_path into the root."""
+        prefix = os.path.join(root_path, '')
+        # Every path starting with prefix sorts in [prefix, prefix_end)
+        prefix_end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT d.dir_id, d.rel_dir FROM directories d
+            JOIN cache_roots r ON r.root_id = d.root_id
+            WHERE r.root_path LIKE '<%'
+              AND (d.rel_dir = ? OR (d.rel_dir >= ? AND d.rel_dir < ?))
+        """, (root_path, prefix, prefix_end))
+        unscoped_dirs = [(row['dir_id'], row['rel_dir']) for row in cursor.fetchall()]
+
+        for old_dir_id, abs_dir in unscoped_dirs:
+            new_dir_id = self._dir_id(root_id, abs_dir[len(prefix):], create=True)
+            # Entries already cached under the root win over older unscoped ones
+            cursor.execute(
+                "UPDATE OR IGNORE file_cache SET dir_id = ?, root_id = ? WHERE dir_id = ?",
+                (new_dir_id, root_id, old_dir_id)
+            )
+            cursor.execute("DELETE FROM file_cache WHERE dir_id = ?", (old_dir_id,))
+            cursor.execute("DELETE FROM directories WHERE dir_id = ?", (old_dir_id,))
+
+        self.conn.commit()
+        if unscoped_dirs:
+            self._forget_directories()
+
+    def _unscoped_root(self, folder: str) -> Tuple[int, str]:
+        """Root holding absolute paths for a folder label."""
+        root = self._unscoped_roots.get(folder)
+        if root is None:
+            root_path = UNSCOPED_ROOT_FORMAT.format(folder)
+            root = (self._root_id(root_path), root_path)
+            self._unscoped_roots[folder] = root
+        return root
+
+    def _folder_root_id(self, folder: str) -> int:
+        """Root id queried for a folder label (registered root, else unscoped)."""
+        root = self._roots.get(folder)
+        if root is None:
+            root = self._unscoped_root(folder)
+        return root[0]
+
+    def _session_roots(self) -> Dict[int, str]:
+        """Folder label by root id, for every root used in this session."""
+        labels = {root_id: folder for folder, (root_id, _) in self._unscoped_roots.items()}
+        labels.update({root_id: folder for folder, (root_id, _) in self._roots.items()})
+        return labels
+
+    def _load_directories(self, root_id: int):
+        """Read a root's directory rows into the in-memory maps (once per root)."""
+        if root_id in self._loaded_roots:
+            return
+        self._loaded_roots.add(root_id)
+
+        cursor = self.conn.cursor()
+        if root_id not in self._root_paths:
+            cursor.execute("SELECT root_path FROM cache_roots WHERE root_id = ?", (root_id,))
+            self._root_paths[root_id] = cursor.fetchone()['root_path']
+        root_path = self._root_paths[root_id]
+
+        cursor.execute("SELECT dir_id, rel_dir FROM directories WHERE root_id = ?", (root_id,))
+        for dir_id, rel_dir in _fetch_rows(cursor):
+            self._dir_ids[(root_id, rel_dir)] = dir_id
+            self._dir_paths[dir_id] = _directory_path(root_path, rel_dir)
+
+    def _forget_directories(self):
+        """Drop the in-memory directory maps after rows were moved or deleted."""
+        self._dir_ids.clear()
+        self._dir_paths.clear()
+        self._loaded_roots.clear()
+
+    def _dir_id(self, root_id: int, rel_dir: str, create: bool = False) -> Optional[int]:
+        """
+        Id of a directory row.
+
+        Returns:
+            dir_id, or None if the directory has no row and create is False
+        """
+        self._load_directories(root_id)
+        dir_id = self._dir_ids.get((root_id, rel_dir))
+        if dir_id is not None or not create:
+            return dir_id
+
+        # Another connection may have added the row since it was loaded
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO directories (root_id, rel_dir) VALUES (?, ?)",
+            (root_id, rel_dir)
+        )
+        cursor.execute(
+            "SELECT dir_id FROM directories WHERE root_id = ? AND rel_dir = ?",
+            (root_id, rel_dir)
+        )
+        dir_id = cursor.fetchone()['dir_id']
+        self._dir_ids[(root_id, rel_dir)] = dir_id
+        self._dir_paths[dir_id] = _directory_path(self._root_paths[root_id], rel_dir)
+        return dir_id
+
+    def _dir_path(self, dir_id: int) -> str:
+        """Absolute path of a directory row."""
+        dir_path = self._dir_paths.get(dir_id)
+        if dir_path is None:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT root_id FROM directories WHERE dir_id = ?", (dir_id,))
+            root_id = cursor.fetchone()['root_id']
+            # Reload: the row may have been added by another connection
+            self._loaded_roots.discard(root_id)
+            self._load_directories(root_id)
+            dir_path = self._dir_paths[dir_id]
+        return dir_path
+
+    def _root_key(self, file_path: str, folder: str) -> Tuple[int, str]:
+        """Root id and path relative to it for an absolute file path."""
+        root = self._roots.get(folder)
+        if root is not None:
+            root_id, root_path = root
+            prefix = os.path.join(root_path, '')
+            if file_path.startswith(prefix):
+                return root_id, file_path[len(prefix):]
+
+        # No root registered for the label, or file outside it
+        return self._unscoped_root(folder)[0], file_path
+
+    def _key(self, file_path: str, folder: str, create: bool = False) -> Tuple[int, Optional[int], str]:
+        """
+        Storage key (root_id, dir_id, name) for an absolute file path.
+
+        dir_id is None when nothing was ever cached in the file's directory
+        (unless create is set, which adds the directory row).
+        """
+        root_id, rel_path = self._root_key(file_path, folder)
+        rel_dir, name = os.path.split(rel_path)
+        return root_id, self._dir_id(root_id, rel_dir, create), name
+
+    def _path(self, dir_id: int, name: str) -> str:
+        """Absolute file path for a storage key."""
+        return os.path.join(self._dir_path(dir_id), name)
+
+    def _directory_range(self, directory: Any, folder: str) -> Tuple[int, Optional[Tuple[str, str, str]]]:
+        """
+        Directory rows covering every file under a directory.
+
+        Returns:
+            (root_id, (rel_dir, first, end)): rows with rel_dir equal to the
+            first element or in [first, end); the range is None when the
+            directory is the root itself (the whole root matches)
+        """
+        prefix = os.path.join(os.path.abspath(os.fspath(directory)), '')
+        root_id, rel_prefix = self._root_key(prefix, folder)
+        if not rel_prefix:
+            return root_id, None
+        # Every subdirectory of rel_prefix sorts in [rel_prefix, end)
+        return root_id, (rel_prefix[:-1], rel_prefix, rel_prefix[:-1] + chr(ord(rel_prefix[-1]) + 1))
 
     def get_from_cache(self, file_path: str, folder: str) -> Optional[CachedFile]:
         """
@@ -181,29 +941,27 @@ class HashCache:
         Returns:
             CachedFile object if found, None otherwise
         """
+        # Entries still buffered in a writer are newer than the database
+        for writer in self._writers:
+            pending = writer.get(file_path, folder)
+            if pending is not None:
+                return pending
+
+        _, dir_id, name = self._key(file_path, folder)
+        if dir_id is None:
+            return None
+
         cursor = self.conn.cursor()
         cursor.execute("""
             SELECT * FROM file_cache
-            WHERE file_path = ? AND folder = ?
-        """, (file_path, folder))
+            WHERE dir_id = ? AND name = ?
+        """, (dir_id, name))
 
         row = cursor.fetchone()
         if row is None:
             return None
 
-        return CachedFile(
-            file_path=row['file_path'],
-            folder=row['folder'],
-            file_hash=row['file_hash'],
-            hash_type=row['hash_type'],
-            sample_size=row['sample_size'],
-            file_size=row['file_size'],
-            file_mtime=row['file_mtime'],
-            video_duration=row['video_duration'],
-            video_codec=row['video_codec'],
-            video_resolution=row['video_resolution'],
-            last_checked=row['last_checked']
-        )
+        return _cached_file_from_row(row, file_path, folder)
 
     def save_to_cache(
         self,
@@ -216,7 +974,11 @@ class HashCache:
         sample_size: Optional[int] = None,
         video_duration: Optional[float] = None,
         video_codec: Optional[str] = None,
-        video_resolution: Optional[str] = None
+        video_resolution: Optional[str] = None,
+        file_dev: Optional[int] = None,
+        file_ino: Optional[int] = None,
+        file_mtime_ns: Optional[int] = None,
+        file_ctime_ns: Optional[int] = None
     ):
         """
         Save or update a cache entry.
@@ -232,20 +994,29 @@ class HashCache:
             video_duration: Video duration in seconds (None for non-videos)
             video_codec: Video codec name (None for non-videos)
             video_resolution: Video resolution (None for non-videos)
+            file_dev: Device number (st_dev) of the file
+            file_ino: Inode number (st_ino) of the file
+            file_mtime_ns: Modification time in nanoseconds (st_mtime_ns)
+            file_ctime_ns: Status change time in nanoseconds (st_ctime_ns)
         """
+        # A direct write supersedes anything still buffered for this file
+        for writer in self._writers:
+            writer.pending.pop((file_path, folder), None)
+
+        root_id, dir_id, name = self._key(file_path, folder, create=True)
         cursor = self.conn.cursor()
         now = time.time()
 
         cursor.execute("""
             INSERT OR REPLACE INTO file_cache (
-                file_path, folder, file_hash, hash_type, sample_size,
-                file_size, file_mtime, video_duration, video_codec,
-                video_resolution, last_checked
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                root_id, dir_id, name, file_hash, hash_type, sample_size,
+                file_size, file_mtime, file_mtime_ns, file_ctime_ns, file_dev,
+                file_ino, video_duration, video_codec, video_resolution, last_checked
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
-            file_path, folder, file_hash, hash_type, sample_size,
-            file_size, file_mtime, video_duration, video_codec,
-            video_resolution, now
+            root_id, dir_id, name, _encode_hash(file_hash), hash_type, sample_size,
+            file_size, file_mtime, file_mtime_ns, file_ctime_ns, file_dev,
+            file_ino, video_duration, video_codec, video_resolution, now
         ))
 
         self.conn.commit()
@@ -270,9 +1041,13 @@ class HashCache:
             - folder (str, required)
             - file_size (int, required)
             - file_mtime (float, required)
+            - file_mtime_ns (int, optional)
+            - file_ctime_ns (int, optional)
             - file_hash (str, optional)
             - hash_type (str, optional)
             - sample_size (int, optional)
+            - file_dev (int, optional)
+            - file_ino (int, optional)
             - video_duration (float, optional)
             - video_codec (str, optional)
             - video_resolution (str, optional)
@@ -287,26 +1062,29 @@ class HashCache:
         batch_data = []
         for entry in entries:
             batch_data.append((
-                entry['file_path'],
-                entry['folder'],
-                entry.get('file_hash'),
+                *self._key(entry['file_path'], entry['folder'], create=True),
+                _encode_hash(entry.get('file_hash')),
                 entry.get('hash_type'),
                 entry.get('sample_size'),
                 entry['file_size'],
                 entry['file_mtime'],
+                entry.get('file_mtime_ns'),
+                entry.get('file_ctime_ns'),
+                entry.get('file_dev'),
+                entry.get('file_ino'),
                 entry.get('video_duration'),
                 entry.get('video_codec'),
                 entry.get('video_resolution'),
-                now
+                entry.get('last_checked', now)
             ))
 
         # Execute batch insert with executemany (much faster than loop)
         cursor.executemany("""
             INSERT OR REPLACE INTO file_cache (
-                file_path, folder, file_hash, hash_type, sample_size,
-                file_size, file_mtime, video_duration, video_codec,
-                video_resolution, last_checked
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                root_id, dir_id, name, file_hash, hash_type, sample_size,
+                file_size, file_mtime, file_mtime_ns, file_ctime_ns, file_dev,
+                file_ino, video_duration, video_codec, video_resolution, last_checked
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, batch_data)
 
         # Single commit for entire batch
@@ -332,6 +1110,11 @@ class HashCache:
             file_mtime: New modification time
             hash_type: 'full' or 'sampled'
         """
+        self._flush_writers()
+        _, dir_id, name = self._key(file_path, folder)
+        if dir_id is None:
+            return
+
         cursor = self.conn.cursor()
         now = time.time()
 
@@ -339,8 +1122,8 @@ class HashCache:
             UPDATE file_cache
             SET file_hash = ?, file_size = ?, file_mtime = ?,
                 hash_type = ?, last_checked = ?
-            WHERE file_path = ? AND folder = ?
-        """, (file_hash, file_size, file_mtime, hash_type, now, file_path, folder))
+            WHERE dir_id = ? AND name = ?
+        """, (_encode_hash(file_hash), file_size, file_mtime, hash_type, now, dir_id, name))
 
         self.conn.commit()
 
@@ -353,6 +1136,8 @@ class HashCache:
         """
         Find files with matching identity (for moved file detection).
 
+        Only roots used in this session are searched.
+
         Args:
             file_size: File size in bytes
             file_mtime: Modification time
@@ -361,13 +1146,23 @@ class HashCache:
         Returns:
             List of (file_path, folder) tuples for matching files
         """
+        self._flush_writers()
+        folders = self._session_roots()
+        if not folders:
+            return []
+
+        placeholders = ','.join('?' * len(folders))
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT file_path, folder FROM file_cache
+            SELECT dir_id, name, root_id FROM file_cache
             WHERE file_size = ? AND file_mtime = ? AND file_hash = ?
-        """, (file_size, file_mtime, file_hash))
+              AND root_id IN ({})
+        """.format(placeholders), (file_size, file_mtime, _encode_hash(file_hash), *folders))
 
-        return [(row['file_path'], row['folder']) for row in cursor.fetchall()]
+        return [
+            (self._path(row['dir_id'], row['name']), folders[row['root_id']])
+            for row in cursor.fetchall()
+        ]
 
     def update_cache_path(self, old_path: str, folder: str, new_path: str):
         """
@@ -378,17 +1173,241 @@ class HashCache:
             folder: 'input' or 'output'
             new_path: New file path
         """
+        self._flush_writers()
+        _, old_dir_id, old_name = self._key(old_path, folder)
+        if old_dir_id is None:
+            return
+
+        new_root_id, new_dir_id, new_name = self._key(new_path, folder, create=True)
         cursor = self.conn.cursor()
         now = time.time()
 
         cursor.execute("""
-            UPDATE file_cache
-            SET file_path = ?, last_checked = ?
-            WHERE file_path = ? AND folder = ?
-        """, (new_path, now, old_path, folder))
+            UPDATE OR REPLACE file_cache
+            SET root_id = ?, dir_id = ?, name = ?, last_checked = ?, file_ctime_ns = NULL
+            WHERE dir_id = ? AND name = ?
+        """, (new_root_id, new_dir_id, new_name, now, old_dir_id, old_name))
 
         self.conn.commit()
 
+    def update_cache_paths(
+        self,
+        moves: Iterable[Tuple[Any, ...]],
+        old_folder: str,
+        new_folder: str
+    ) -> int:
+        """
+        Update file paths for many moved files in one transaction.
+
+        Hashes and metadata are kept; only the storage key changes (and
+        the stored st_ctime_ns, which a rename updates). A move across
+        filesystems copies the file, so its st_dev and st_ino change too:
+        pass them to keep the entry valid. An entry already cached at a
+        destination path is replaced.
+
+        Args:
+            moves: (old_path, new_path) pairs of full absolute paths, or
+                (old_path, new_path, st_dev, st_ino) with the destination's
+                device and inode (None keeps the stored value)
+            old_folder: Folder label of the old paths ('input' or 'output')
+            new_folder: Folder label of the new paths
+
+        Returns:
+            Number of entries updated (files never cached are skipped)
+        """
+        self._flush_writers()
+        now = time.time()
+
+        # Keys are resolved up front: new directory rows are inserted here,
+        # not while executemany() is stepping its statement
+        rows = []
+        for move in moves:
+            old_path, new_path = move[0], move[1]
+            dev, ino = (move[2], move[3]) if len(move) > 2 else (None, None)
+            _, old_dir_id, old_name = self._key(old_path, old_folder)
+            if old_dir_id is not None:
+                rows.append(self._key(new_path, new_folder, create=True)
+                            + (now, dev, ino, old_dir_id, old_name))
+
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            UPDATE OR REPLACE file_cache
+            SET root_id = ?, dir_id = ?, name = ?, last_checked = ?, file_ctime_ns = NULL,
+                file_dev = COALESCE(?, file_dev), file_ino = COALESCE(?, file_ino)
+            WHERE dir_id = ? AND name = ?
+        """, rows)
+        updated = cursor.rowcount
+        self.conn.commit()
+        return updated
+
+    def load_columns(
+        self,
+        folder: str,
+        directory: Any = None,
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> 'CachedColumns':
+        """
+        Bulk-load a folder's entries column by column.
+
+        Much smaller than a list of CachedFile objects: numbers go into
+        typed arrays, each directory path is held once, and repeated
+        hash_type values share one string.
+
+        Args:
+            folder: 'input' or 'output'
+            directory: Only load files under this directory (default: whole root)
+            batch_size: Rows per fetchmany() call
+
+        Returns:
+            CachedColumns with one row per entry
+        """
+        self._flush_writers()
+        root_id = self._folder_root_id(folder)
+        cursor = self.conn.cursor()
+        query = """
+            SELECT dir_id, name, file_size, file_mtime, file_mtime_ns, file_ctime_ns,
+                   file_dev, file_ino, file_hash, hash_type
+            FROM file_cache WHERE root_id = ?
+        """
+
+        dir_range = None
+        if directory is not None:
+            root_id, dir_range = self._directory_range(directory, folder)
+
+        if dir_range is None:
+            cursor.execute(query, (root_id,))
+        else:
+            cursor.execute(query + """
+                AND dir_id IN (
+                    SELECT dir_id FROM directories
+                    WHERE root_id = ? AND (rel_dir = ? OR (rel_dir >= ? AND rel_dir < ?))
+                )
+            """, (root_id, root_id, *dir_range))
+
+        columns = CachedColumns(folder)
+        columns.extend(_fetch_rows(cursor, batch_size))
+        columns.dir_paths = {dir_id: self._dir_path(dir_id) for dir_id in set(columns.dir_ids)}
+        return columns
+
+    def remove_from_cache(self, file_paths: Iterable[str], folder: str) -> int:
+        """
+        Delete entries for files that were deleted or no longer exist.
+
+        Args:
+            file_paths: Full absolute paths
+            folder: 'input' or 'output'
+
+        Returns:
+            Number of entries removed
+        """
+        keys = []
+        for file_path in file_paths:
+            for writer in self._writers:
+                writer.pending.pop((file_path, folder), None)
+            _, dir_id, name = self._key(file_path, folder)
+            if dir_id is not None:
+                keys.append((dir_id, name))
+
+        if not keys:
+            return 0
+
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            DELETE FROM file_cache
+            WHERE dir_id = ? AND name = ?
+        """, keys)
+        removed = cursor.rowcount
+        self.conn.commit()
+        return removed
+
+    def collect_garbage(self) -> Dict[str, Any]:
+        """
+        Remove entries of files that no longer exist, in every root.
+
+        Each directory row is listed once instead of stat-ing every entry;
+        directory rows left without entries are dropped. Nothing is removed
+        on the strength of a missing path alone:
+        - Roots whose folder is missing or empty (e.g. an unmounted share)
+          are skipped, keeping all their entries, and reported
+        - A directory that no longer exists loses its entries only if its
+          parent directory still exists and is not empty
+        - Directories that cannot be listed for other reasons (permissions,
+          I/O errors) keep their entries
+
+        Returns:
+            Dictionary with entries_checked, entries_removed and
+            unreachable_roots (list of skipped root folders)
+        """
+        self._flush_writers()
+        cursor = self.conn.cursor()
+        stats = {'entries_checked': 0, 'entries_removed': 0, 'unreachable_roots': []}
+
+        cursor.execute("SELECT root_id, root_path FROM cache_roots ORDER BY root_id")
+        roots = [(row['root_id'], row['root_path']) for row in cursor.fetchall()]
+
+        for root_id, root_path in roots:
+            unscoped = _is_unscoped_root(root_path)
+
+            if not unscoped and not _is_populated_dir(root_path):
+                stats['unreachable_roots'].append(root_path)
+                continue
+
+            cursor.execute("SELECT dir_id, rel_dir FROM directories WHERE root_id = ?", (root_id,))
+            directories = [(row['dir_id'], row['rel_dir']) for row in cursor.fetchall()]
+            root_entries = root_removed = 0
+
+            for dir_id, rel_dir in directories:
+                cursor.execute("SELECT name FROM file_cache WHERE dir_id = ?", (dir_id,))
+                names = [row['name'] for row in cursor.fetchall()]
+                root_entries += len(names)
+
+                directory = _directory_path(root_path, rel_dir)
+                try:
+                    listing = set(os.listdir(directory))
+                except (FileNotFoundError, NotADirectoryError):
+                    if not _is_populated_dir(os.path.dirname(directory)):
+                        continue  # Parent unreachable too (unmounted?) - keep entries
+                    listing = set()
+                except OSError:
+                    continue  # Unknown - keep entries
+
+                stale = [(dir_id, name) for name in names if name not in listing]
+                cursor.executemany("DELETE FROM file_cache WHERE dir_id = ? AND name = ?", stale)
+                root_removed += len(stale)
+
+                if len(stale) == len(names):
+                    cursor.execute("DELETE FROM directories WHERE dir_id = ?", (dir_id,))
+
+            stats['entries_checked'] += root_entries
+            stats['entries_removed'] += root_removed
+
+            if unscoped and root_removed == root_entries:
+                # Empty unscoped roots are recreated on demand
+                cursor.execute("DELETE FROM directories WHERE root_id = ?", (root_id,))
+                cursor.execute("DELETE FROM cache_roots WHERE root_id = ?", (root_id,))
+                self._unscoped_roots = {
+                    folder: root for folder, root in self._unscoped_roots.items() if root[0] != root_id
+                }
+
+        self.conn.commit()
+        self._forget_directories()
+        return stats
+
+    def optimize(self):
+        """
+        Refresh query planner statistics (ANALYZE) and rebuild the
+        database file (VACUUM) to return free pages to the filesystem.
+        """
+        self._flush_writers()
+        self.conn.commit()
+
+        cursor = self.conn.cursor()
+        cursor.execute("ANALYZE")
+        self.conn.commit()
+        cursor.execute("VACUUM")
+        # Fold the WAL back into the database so the file actually shrinks
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
     def get_size_groups(self, folder: str, min_group_size: int = 2) -> Dict[int, List[str]]:
         """
         Group files by size (for metadata-first optimization).
@@ -402,31 +1421,158 @@ class HashCache:
         Returns:
             Dict mapping file_size -> list of file_paths
         """
+        return dict(self.iter_size_groups(folder, min_group_size))
+
+    def iter_size_groups(
+        self,
+        folder: str,
+        min_group_size: int = 2,
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Stream size groups in size order (see get_size_groups).
+
+        Only one group is held in memory at a time.
+
+        Args:
+            folder: 'input' or 'output'
+            min_group_size: Minimum files in group to include (default 2)
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            Tuples of (file_size, file_paths)
+        """
+        self._flush_writers()
         cursor = self.conn.cursor()
 
-        # Get all files grouped by size
+        # Rows come out of idx_size_grouping already ordered by size
+        root_id = self._folder_root_id(folder)
         cursor.execute("""
-            SELECT file_size, file_path FROM file_cache
-            WHERE folder = ?
+            SELECT file_size, dir_id, name FROM file_cache
+            WHERE root_id = ?
             ORDER BY file_size
-        """, (folder,))
+        """, (root_id,))
 
-        # Build size groups
-        size_groups = {}
-        for row in cursor.fetchall():
-            size = row['file_size']
-            path = row['file_path']
+        for size, rows in groupby(_fetch_rows(cursor, batch_size), key=lambda row: row['file_size']):
+            paths = [self._path(row['dir_id'], row['name']) for row in rows]
+            if len(paths) >= min_group_size:
+                yield size, paths
 
-            if size not in size_groups:
-                size_groups[size] = []
-            size_groups[size].append(path)
+    def count_files(self, folder: str) -> int:
+        """
+        Count cached files for a folder (without loading them).
 
-        # Filter to only collision groups (2+ files)
-        return {
-            size: paths
-            for size, paths in size_groups.items()
-            if len(paths) >= min_group_size
-        }
+        Args:
+            folder: 'input' or 'output'
+
+        Returns:
+            Number of entries under the folder's root
+        """
+        self._flush_writers()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) as count FROM file_cache WHERE root_id = ?",
+            (self._folder_root_id(folder),)
+        )
+        return cursor.fetchone()['count']
+
+    def iter_cross_folder_size_groups(
+        self,
+        folder_a: str = 'input',
+        folder_b: str = 'output',
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[int, List[CachedFile]]]:
+        """
+        Stream files whose size occurs in both folders, one size at a time.
+
+        The sizes present in both roots are found in SQLite (INTERSECT over
+        idx_size_grouping); only those rows are ever turned into CachedFile
+        objects.
+
+        Args:
+            folder_a: First folder label
+            folder_b: Second folder label
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            Tuples of (file_size, files of that size from both folders)
+        """
+        self._flush_writers()
+        root_a, root_b = self._folder_root_id(folder_a), self._folder_root_id(folder_b)
+        labels = {root_a: folder_a, root_b: folder_b}
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT * FROM file_cache
+            WHERE root_id IN (?, ?) AND file_size IN (
+                SELECT file_size FROM file_cache WHERE root_id = ?
+                INTERSECT
+                SELECT file_size FROM file_cache WHERE root_id = ?
+            )
+            ORDER BY file_size
+        """, (root_a, root_b, root_a, root_b))
+
+        for file_size, rows in groupby(_fetch_rows(cursor, batch_size), key=lambda row: row['file_size']):
+            yield file_size, self._cached_files(rows, labels)
+
+    def iter_cross_folder_hash_groups(
+        self,
+        folder_a: str = 'input',
+        folder_b: str = 'output',
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[str, List[CachedFile]]]:
+        """
+        Stream files whose full hash occurs in both folders, one hash at a time.
+
+        Candidate hashes are taken only from sizes present in both roots
+        (idx_size_grouping), intersected in SQLite, and their files fetched
+        through idx_hash_lookup. Sample hashes are never matched.
+
+        Args:
+            folder_a: First folder label
+            folder_b: Second folder label
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            Tuples of (file_hash, files with that hash from both folders)
+        """
+        self._flush_writers()
+        root_a, root_b = self._folder_root_id(folder_a), self._folder_root_id(folder_b)
+        labels = {root_a: folder_a, root_b: folder_b}
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            WITH cross_sizes AS (
+                SELECT file_size FROM file_cache WHERE root_id = ?
+                INTERSECT
+                SELECT file_size FROM file_cache WHERE root_id = ?
+            ),
+            full_hashes AS (
+                SELECT root_id, file_hash FROM file_cache
+                WHERE root_id IN (?, ?)
+                  AND file_size IN (SELECT file_size FROM cross_sizes)
+                  AND file_hash IS NOT NULL AND hash_type IS NOT ?
+            )
+            SELECT * FROM file_cache
+            WHERE file_hash IN (
+                SELECT file_hash FROM full_hashes WHERE root_id = ?
+                INTERSECT
+                SELECT file_hash FROM full_hashes WHERE root_id = ?
+            )
+              AND root_id IN (?, ?) AND hash_type IS NOT ?
+            ORDER BY file_hash
+        """, (root_a, root_b, root_a, root_b, HASH_TYPE_SAMPLED,
+              root_a, root_b, root_a, root_b, HASH_TYPE_SAMPLED))
+
+        for file_hash, rows in groupby(_fetch_rows(cursor, batch_size), key=lambda row: row['file_hash']):
+            yield _decode_hash(file_hash), self._cached_files(rows, labels)
+
+    def _cached_files(self, rows: Iterable[sqlite3.Row], labels: Dict[int, str]) -> List[CachedFile]:
+        """CachedFile objects for rows from the roots in labels (root_id -> folder)."""
+        return [
+            _cached_file_from_row(row, self._path(row['dir_id'], row['name']), labels[row['root_id']])
+            for row in rows
+        ]
 
     def get_files_by_hash(self, file_hash: str, folder: Optional[str] = None) -> List[str]:
         """
@@ -434,30 +1580,58 @@ class HashCache:
 
         Args:
             file_hash: Hash to search for
-            folder: Optional folder filter ('input' or 'output')
+            folder: Optional folder filter ('input' or 'output'); without it,
+                    every root used in this session is searched
 
         Returns:
             List of file paths with matching hash
         """
+        return list(self.iter_files_by_hash(file_hash, folder))
+
+    def iter_files_by_hash(
+        self,
+        file_hash: str,
+        folder: Optional[str] = None,
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[str]:
+        """
+        Stream paths of files with a specific hash (see get_files_by_hash).
+
+        Args:
+            file_hash: Hash to search for
+            folder: Optional folder filter ('input' or 'output')
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            File paths with matching hash
+        """
+        self._flush_writers()
         cursor = self.conn.cursor()
 
         if folder:
-            cursor.execute("""
-                SELECT file_path FROM file_cache
-                WHERE file_hash = ? AND folder = ?
-            """, (file_hash, folder))
+            root_ids = [self._folder_root_id(folder)]
         else:
-            cursor.execute("""
-                SELECT file_path FROM file_cache
-                WHERE file_hash = ?
-            """, (file_hash,))
+            root_ids = list(self._session_roots())
+            if not root_ids:
+                return
 
-        return [row['file_path'] for row in cursor.fetchall()]
+        placeholders = ','.join('?' * len(root_ids))
+        cursor.execute("""
+            SELECT dir_id, name FROM file_cache
+            WHERE file_hash = ? AND root_id IN ({})
+        """.format(placeholders), (_encode_hash(file_hash), *root_ids))
+
+        for row in _fetch_rows(cursor, batch_size):
+            yield self._path(row['dir_id'], row['name'])
 
     def get_files_by_paths(self, file_paths: List[str], folder: str) -> Dict[str, CachedFile]:
         """
         Get cached files for specific paths (batch query, much faster than loading all).
 
+        Short lists are joined to VALUES lists sized to the connection's
+        parameter limit; lists longer than PATH_JOIN_MIN are joined once through a
+        TEMP table of their keys.
+
         Args:
             file_paths: List of file paths to look up
             folder: 'input' or 'output'
@@ -465,50 +1639,177 @@ class HashCache:
         Returns:
             Dictionary mapping file_path -> CachedFile (only includes found entries)
         """
+        return dict(self.iter_files_by_paths(file_paths, folder))
+
+    def iter_files_by_paths(
+        self,
+        file_paths: List[str],
+        folder: str,
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[str, CachedFile]]:
+        """
+        Stream cached entries for specific paths (see get_files_by_paths).
+
+        Args:
+            file_paths: List of file paths to look up
+            folder: 'input' or 'output'
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            Tuples of (file_path, CachedFile) for paths found in the cache
+        """
+        self._flush_writers()
         if not file_paths:
-            return {}
+            return
+
+        if len(file_paths) > PATH_JOIN_MIN:
+            yield from self._join_files_by_paths(file_paths, folder, batch_size)
+            return
 
         cursor = self.conn.cursor()
-        
-        # Use batch query with IN clause (SQLite supports up to 999 parameters)
-        # For large lists, split into chunks
-        BATCH_SIZE = 999
-        result_dict = {}
 
-        for i in range(0, len(file_paths), BATCH_SIZE):
-            batch_paths = file_paths[i:i + BATCH_SIZE]
-            placeholders = ','.join('?' * len(batch_paths))
+        # Paths in directories without a row cannot be cached
+        keys = []
+        for file_path in file_paths:
+            _, dir_id, name = self._key(file_path, folder)
+            if dir_id is not None:
+                keys.extend((dir_id, name))
+
+        # Batch query joined to a VALUES list, split into chunks for the parameter limit
+        chunk_size = self.max_variables // 2 * 2  # Two parameters per key
+
+        for i in range(0, len(keys), chunk_size):
+            batch_keys = keys[i:i + chunk_size]
+            placeholders = ','.join(['(?, ?)'] * (len(batch_keys) // 2))
 
-            # Build query without f-string to follow SQL injection prevention best practices
+            # Build query without f-string to follow SQL injection prevention best practices.
+            # A join (not a row-value IN) so every key is one primary key probe
             query = """
-                SELECT * FROM file_cache
-                WHERE folder = ? AND file_path IN ({})
+                SELECT f.* FROM (VALUES {}) k
+                JOIN file_cache f ON f.dir_id = k.column1 AND f.name = k.column2
             """.format(placeholders)
 
-            cursor.execute(query, (folder, *batch_paths))
-
-            for row in cursor.fetchall():
-                cached = CachedFile(
-                    file_path=row['file_path'],
-                    folder=row['folder'],
-                    file_hash=row['file_hash'],
-                    hash_type=row['hash_type'],
-                    sample_size=row['sample_size'],
-                    file_size=row['file_size'],
-                    file_mtime=row['file_mtime'],
-                    video_duration=row['video_duration'],
-                    video_codec=row['video_codec'],
-                    video_resolution=row['video_resolution'],
-                    last_checked=row['last_checked']
-                )
-                result_dict[cached.file_path] = cached
+            cursor.execute(query, batch_keys)
+
+            for row in _fetch_rows(cursor, batch_size):
+                file_path = self._path(row['dir_id'], row['name'])
+                yield file_path, _cached_file_from_row(row, file_path, folder)
+
+    def _join_files_by_paths(
+        self,
+        file_paths: Iterable[str],
+        folder: str,
+        batch_size: int
+    ) -> Iterator[Tuple[str, CachedFile]]:
+        """
+        Look up many paths with one join against a TEMP table of their keys.
+
+        The keys are inserted with executemany() (a single prepared
+        statement), then one SELECT walks them in primary key order.
+        """
+        self._lookup_tables += 1
+        table = f"temp.path_lookup_{self._lookup_tables}"
+        cursor = self.conn.cursor()
+
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                dir_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (dir_id, name)
+            ) WITHOUT ROWID
+        """)
+        try:
+            # Directory rows are resolved before executemany() starts stepping
+            keys = []
+            for file_path in file_paths:
+                _, dir_id, name = self._key(file_path, folder)
+                if dir_id is not None:
+                    keys.append((dir_id, name))
+
+            cursor.executemany(f"INSERT OR IGNORE INTO {table} (dir_id, name) VALUES (?, ?)", keys)
+            self.conn.commit()
+
+            cursor.execute(f"""
+                SELECT f.* FROM {table} k
+                JOIN file_cache f ON f.dir_id = k.dir_id AND f.name = k.name
+            """)
+            for row in _fetch_rows(cursor, batch_size):
+                file_path = self._path(row['dir_id'], row['name'])
+                yield file_path, _cached_file_from_row(row, file_path, folder)
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.commit()
 
-        return result_dict
+    def iter_files_by_identity(
+        self,
+        identities: Iterable[Tuple[int, int, int, int]],
+        batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[Tuple[int, int, int, int], CachedFile]]:
+        """
+        Stream hashed entries of files with a given inode identity.
+
+        Finds the entries of files that were moved or renamed since they
+        were cached: a rename keeps the inode, size and st_mtime_ns. Only
+        roots used in this session are searched; entries written before
+        nanosecond times were stored never match.
+
+        The identities are joined once through a TEMP table; each one is a
+        probe of idx_size_grouping per searched root.
+
+        Args:
+            identities: (file_size, st_mtime_ns, st_dev, st_ino) tuples
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            Tuples of (identity, CachedFile) for every matching entry
+        """
+        self._flush_writers()
+        folders = self._session_roots()
+        if not folders:
+            return
+
+        self._lookup_tables += 1
+        table = f"temp.identity_lookup_{self._lookup_tables}"
+        placeholders = ','.join('?' * len(folders))
+        cursor = self.conn.cursor()
+
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                file_size INTEGER NOT NULL,
+                file_mtime_ns INTEGER NOT NULL,
+                file_dev INTEGER NOT NULL,
+                file_ino INTEGER NOT NULL,
+                PRIMARY KEY (file_size, file_mtime_ns, file_dev, file_ino)
+            ) WITHOUT ROWID
+        """)
+        try:
+            cursor.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?, ?, ?, ?)", identities)
+            self.conn.commit()
+
+            # CROSS JOIN keeps the (usually small) identity table as the outer loop
+            cursor.execute(f"""
+                SELECT f.* FROM {table} k
+                CROSS JOIN file_cache f
+                  ON f.root_id IN ({placeholders}) AND f.file_size = k.file_size
+                 AND f.file_mtime_ns = k.file_mtime_ns
+                 AND f.file_dev = k.file_dev AND f.file_ino = k.file_ino
+                WHERE f.file_hash IS NOT NULL
+            """, tuple(folders))
+            for row in _fetch_rows(cursor, batch_size):
+                identity = (row['file_size'], row['file_mtime_ns'], row['file_dev'], row['file_ino'])
+                file_path = self._path(row['dir_id'], row['name'])
+                yield identity, _cached_file_from_row(row, file_path, folders[row['root_id']])
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.commit()
 
     def get_all_files(self, folder: str) -> List[CachedFile]:
         """
         Get all cached files for a folder.
 
+        Only the folder's registered root is loaded (not every tree that
+        was ever cached under the same label).
+
         WARNING: This loads ALL cached files into memory. For performance,
         use get_files_by_paths() if you only need specific files.
 
@@ -518,34 +1819,67 @@ class HashCache:
         Returns:
             List of CachedFile objects
         """
+        return list(self.iter_all_files(folder))
+
+    def iter_all_files(self, folder: str, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[CachedFile]:
+        """
+        Stream all cached files for a folder (see get_all_files).
+
+        Rows are read batch_size at a time, so memory stays bounded and the
+        first entries arrive before the whole root has been read.
+
+        Args:
+            folder: 'input' or 'output'
+            batch_size: Rows per fetchmany() call
+
+        Yields:
+            CachedFile objects
+        """
+        self._flush_writers()
+        root_id = self._folder_root_id(folder)
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT * FROM file_cache WHERE folder = ?
-        """, (folder,))
-
-        files = []
-        for row in cursor.fetchall():
-            files.append(CachedFile(
-                file_path=row['file_path'],
-                folder=row['folder'],
-                file_hash=row['file_hash'],
-                hash_type=row['hash_type'],
-                sample_size=row['sample_size'],
-                file_size=row['file_size'],
-                file_mtime=row['file_mtime'],
-                video_duration=row['video_duration'],
-                video_codec=row['video_codec'],
-                video_resolution=row['video_resolution'],
-                last_checked=row['last_checked']
-            ))
+            SELECT * FROM file_cache WHERE root_id = ?
+        """, (root_id,))
+
+        for row in _fetch_rows(cursor, batch_size):
+            file_path = self._path(row['dir_id'], row['name'])
+            yield _cached_file_from_row(row, file_path, folder)
+
+    def writer(
+        self,
+        batch_size: int = WRITER_BATCH_SIZE,
+        flush_interval: float = WRITER_FLUSH_INTERVAL
+    ) -> CacheWriter:
+        """
+        Create a write-behind writer that batches entries into few transactions.
+
+        Args:
+            batch_size: Flush once this many entries are pending
+            flush_interval: Flush once this many seconds have passed since the last flush
+
+        Returns:
+            CacheWriter (use as a context manager so it is always flushed)
+        """
+        writer = CacheWriter(self, batch_size=batch_size, flush_interval=flush_interval)
+        self._writers.add(writer)
+        return writer
 
-        return files
+    def _flush_writers(self):
+        """Flush all open writers so database reads see their entries."""
+        for writer in list(self._writers):
+            writer.flush()
 
     def clear_cache(self):
         """Clear all cache entries (useful for testing or cache corruption)."""
+        for writer in self._writers:
+            writer.pending.clear()
+
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM file_cache")
+        cursor.execute("DELETE FROM directories")
         self.conn.commit()
+        self._forget_directories()
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """
@@ -554,6 +1888,7 @@ class HashCache:
         Returns:
             Dictionary with cache statistics
         """
+        self._flush_writers()
         cursor = self.conn.cursor()
 
         # Total files
@@ -578,11 +1913,16 @@ class HashCache:
         """)
         collision_groups = cursor.fetchone()['count']
 
+        # Registered roots (directories ever scanned)
+        cursor.execute("SELECT COUNT(*) as count FROM cache_roots WHERE root_path NOT LIKE '<%'")
+        roots = cursor.fetchone()['count']
+
         # Database size
         db_size = self.db_path.stat().st_size if self.db_path.exists() else 0
 
         return {
             'total_files': total_files,
+            'roots': roots,
             'hashed_files': hashed_files,
             'unhashed_files': total_files - hashed_files,
             'unique_sizes': unique_sizes,
@@ -591,9 +1931,47 @@ class HashCache:
             'db_size_mb': round(db_size / (1024 * 1024), 2)
         }
 
+    def get_tuning_report(self) -> Dict[str, Any]:
+        """
+        Get effective SQLite settings for this connection.
+
+        Returns:
+            Dictionary with configured and effective PRAGMA values
+        """
+        cursor = self.conn.cursor()
+
+        def pragma(name: str):
+            return cursor.execute(f"PRAGMA {name}").fetchone()[0]
+
+        page_size = pragma('page_size')
+        page_count = pragma('page_count')
+        cache_size = pragma('cache_size')
+        # Positive cache_size is in pages, negative in KB
+        cache_bytes = cache_size * page_size if cache_size >= 0 else -cache_size * 1024
+
+        synchronous_names = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+        temp_store_names = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+        return {
+            'db_path': str(self.db_path),
+            'db_size_bytes': page_size * page_count,
+            'page_size': page_size,
+            'page_count': page_count,
+            'journal_mode': pragma('journal_mode'),
+            'synchronous': synchronous_names.get(pragma('synchronous'), 'UNKNOWN'),
+            'temp_store': temp_store_names.get(pragma('temp_store'), 'UNKNOWN'),
+            'cache_size_bytes': cache_bytes,
+            'mmap_size_bytes': pragma('mmap_size'),
+            'configured_cache_size_mb': self.cache_size_mb,
+            'configured_mmap_size_mb': self.mmap_size_mb,
+            'sqlite_version': sqlite3.sqlite_version
+        }
+
     def close(self):
-        """Close database connection."""
+        """Flush open writers and close database connection."""
         if self.conn:
+            for writer in list(self._writers):
+                writer.close()
             self.conn.close()
             self.conn = None
 
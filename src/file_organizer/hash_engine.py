@@ -0,0 +1,205 @@
+"""
+Parallel file hashing engine for duplicate detection.
+
+Hashes files on a bounded worker pool while results are consumed on the
+calling thread, so the SQLite cache keeps a single writer:
+- Thread pool (default): xxhash releases the GIL while hashing a chunk
+- Process pool (optional): for hosts where Python overhead dominates
+- Bounded in-flight window (memory stays flat on 100k+ file runs)
+- Jobs read per device in disk order, devices in parallel (see hash_scheduler)
+- Sample hashes (head + middle + tail) for cheap first-tier comparison
+"""
+
+from collections import deque
+from concurrent.futures import (
+    ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+)
+from typing import Iterable, Iterator, Tuple, TypeVar
+
+import xxhash
+
+from .hash_scheduler import HashScheduler, ORDER_PHYSICAL
+
+
+# Read size per hasher.update() call (1MB keeps per-chunk overhead negligible)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Bytes read from each of the head, middle and tail of a sampled file
+SAMPLE_SEGMENT_SIZE = 1024 * 1024
+
+# Files smaller than this are always hashed in full (sampling saves too little)
+SAMPLE_MIN_FILE_SIZE = 8 * SAMPLE_SEGMENT_SIZE
+
+# Supported executor types
+EXECUTOR_TYPES = ('thread', 'process')
+
+# Jobs kept in flight per worker (bounds memory and queued futures)
+IN_FLIGHT_PER_WORKER = 4
+
+T = TypeVar('T')
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Compute xxHash (xxh64) of a whole file.
+
+    Module-level so it can be shipped to a process pool.
+
+    Args:
+        file_path: Path to file
+
+    Returns:
+        xxHash hex digest, or empty string on read errors
+    """
+    hasher = xxhash.xxh64()
+
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+
+        return hasher.hexdigest()
+    except OSError:
+        # Return empty string on error (will be skipped)
+        return ""
+
+
+def hash_file_sample(file_path: str, file_size: int, segment_size: int = SAMPLE_SEGMENT_SIZE) -> str:
+    """
+    Compute xxHash (xxh64) of a head + middle + tail sample of a file.
+
+    Two files with different sample hashes are guaranteed to differ; equal
+    sample hashes only mean the files *might* be identical.
+
+    Args:
+        file_path: Path to file
+        file_size: File size in bytes (used to place the middle/tail segments)
+        segment_size: Bytes read at each of the three offsets
+
+    Returns:
+        xxHash hex digest of the sample, or empty string on read errors
+    """
+    hasher = xxhash.xxh64()
+    offsets = (0, max(0, (file_size - segment_size) // 2), max(0, file_size - segment_size))
+
+    try:
+        with open(file_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                hasher.update(f.read(segment_size))
+
+        return hasher.hexdigest()
+    except OSError:
+        return ""
+
+
+class HashEngine:
+    """
+    Bounded worker pool for hashing files.
+
+    Results are yielded back to the caller's thread in completion order.
+    Callers write them to the cache themselves, which keeps SQLite
+    single-writer no matter how many workers are reading files.
+
+    Jobs are split into per-device lanes in disk order. The in-flight
+    window is shared round-robin between devices, and a finished job is
+    replaced by the next one from the same device, so each disk keeps its
+    share of the workers and is read front to back.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        executor: str = 'thread',
+        sample_segment_size: int = SAMPLE_SEGMENT_SIZE,
+        order: str = ORDER_PHYSICAL
+    ):
+        """
+        Initialize hashing engine.
+
+        Args:
+            workers: Number of concurrent hash workers (1 = hash inline)
+            executor: 'thread' or 'process'
+            sample_segment_size: Bytes per head/middle/tail segment for sample hashes
+            order: Read order within a device: 'physical', 'inode' or 'none'
+        """
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(
+                f"Invalid hash executor '{executor}', must be one of {EXECUTOR_TYPES}"
+            )
+
+        self.workers = max(1, int(workers))
+        self.executor = executor
+        self.sample_segment_size = sample_segment_size
+        self.scheduler = HashScheduler(order=order)
+
+    @property
+    def sample_size(self) -> int:
+        """Total bytes read for one sample hash (stored as sample_size in the cache)."""
+        return 3 * self.sample_segment_size
+
+    def hash_files(self, jobs: Iterable[T], sampled: bool = False) -> Iterator[Tuple[T, str]]:
+        """
+        Hash files on the worker pool.
+
+        Args:
+            jobs: Objects with ``path``, ``size``, ``dev`` and ``ino`` attributes
+                  (e.g. FileMetadata)
+            sampled: Compute head/middle/tail sample hashes instead of full hashes
+
+        Yields:
+            Tuples of (job, hex digest); digest is '' if the file could not be read
+        """
+        if sampled:
+            def task_args(job):
+                return hash_file_sample, job.path, job.size, self.sample_segment_size
+        else:
+            def task_args(job):
+                return hash_file, job.path
+
+        lanes = self.scheduler.lanes(jobs)
+
+        if self.workers == 1:
+            # No pool overhead for the sequential case (one device after another)
+            for lane in lanes:
+                for job in lane:
+                    func, *args = task_args(job)
+                    yield job, func(*args)
+            return
+
+        pool_class = ThreadPoolExecutor if self.executor == 'thread' else ProcessPoolExecutor
+        max_in_flight = self.workers * IN_FLIGHT_PER_WORKER
+
+        with pool_class(max_workers=self.workers) as pool:
+            in_flight = {}  # future -> (job, lane iterator)
+            open_lanes = deque(iter(lane) for lane in lanes)
+
+            def submit(lane) -> bool:
+                job = next(lane, None)
+                if job is None:
+                    return False
+                in_flight[pool.submit(*task_args(job))] = (job, lane)
+                return True
+
+            def submit_any():
+                # Hand a free slot to the next device that still has work
+                while open_lanes:
+                    lane = open_lanes.popleft()
+                    if submit(lane):
+                        open_lanes.append(lane)
+                        return
+
+            # Fill the window one job per device at a time
+            while open_lanes and len(in_flight) < max_in_flight:
+                submit_any()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, lane = in_flight.pop(future)
+                    if not submit(lane):
+                        submit_any()
+                    yield job, future.result()
@@ -0,0 +1,170 @@
+"""
+Parallel work-stealing directory walker.
+
+On high-latency filesystems (NFS/SMB/NAS) every readdir and stat is a
+network round-trip of several milliseconds, so a single-threaded walk is
+latency-bound. ParallelWalker keeps several directory listings in
+flight at once:
+
+- Each worker thread owns a deque of pending directories
+- New subdirectories go on the owner's deque (depth-first, LIFO)
+- Idle workers steal the oldest entry from another worker's deque (FIFO),
+  which tends to be a large, shallow subtree
+- Results are handed back to the calling thread, which does all merging
+
+The walker only decides *when* directories are listed; the caller's
+visit function does the listing. Callers that need an ordering (e.g.
+bottom-up for Stage 1 renames) build a tree from the results and walk
+that, so parallel scanning never changes the order they see.
+"""
+
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+# Default number of scan threads (1 = sequential walk in the calling thread)
+DEFAULT_SCAN_THREADS = 1
+
+# Maximum scan threads accepted from configuration
+MAX_SCAN_THREADS = 64
+
+# How long an idle worker waits before retrying a steal (seconds)
+_IDLE_WAIT = 0.01
+
+# visit(item) -> (child items to visit, result for the caller)
+VisitFunc = Callable[[Any], Tuple[Iterable[Any], Any]]
+
+
+class ParallelWalker:
+    """
+    Walk a tree of work items with a pool of work-stealing threads.
+
+    Usage:
+        def visit(path):
+            subdirs, files = list_one_directory(path)
+            return subdirs, files
+
+        walker = ParallelWalker(threads=8)
+        for files in walker.run(top, visit):
+            ...
+
+    visit() runs on worker threads and must only touch state belonging
+    to its own item. Results are yielded on the calling thread in
+    completion order. Exceptions raised by visit() are re-raised there.
+    """
+
+    def __init__(self, threads: int = DEFAULT_SCAN_THREADS):
+        """
+        Initialize walker.
+
+        Args:
+            threads: Number of worker threads (1 = sequential, no threads)
+        """
+        if threads < 1:
+            raise ValueError(f"threads must be >= 1, got {threads}")
+        self.threads = threads
+
+    def run(self, root: Any, visit: VisitFunc) -> Iterator[Any]:
+        """
+        Visit root and every item reachable from it.
+
+        Args:
+            root: First work item (usually a directory path)
+            visit: Function returning (children, result) for one item
+
+        Yields:
+            visit() results
+        """
+        if self.threads == 1:
+            yield from self._run_sequential(root, visit)
+        else:
+            yield from self._run_parallel(root, visit)
+
+    def _run_sequential(self, root: Any, visit: VisitFunc) -> Iterator[Any]:
+        """Depth-first walk in the calling thread (children in listing order)."""
+        stack = [root]
+        while stack:
+            children, result = visit(stack.pop())
+            yield result
+            stack.extend(reversed(list(children)))
+
+    def _run_parallel(self, root: Any, visit: VisitFunc) -> Iterator[Any]:
+        """Work-stealing walk on worker threads."""
+        deques: List[deque] = [deque() for _ in range(self.threads)]
+        deques[0].append(root)
+
+        # Items queued or in progress; the walk ends when it drops to 0
+        state = {'pending': 1}
+        cond = threading.Condition()
+        stop = threading.Event()
+        results: queue.Queue = queue.Queue()
+        done_marker = object()
+
+        def next_item(own: int) -> Any:
+            """Pop local work, or steal from another worker; None if there's none."""
+            try:
+                return deques[own].pop()
+            except IndexError:
+                pass
+            for offset in range(1, self.threads):
+                try:
+                    return deques[(own + offset) % self.threads].popleft()
+                except IndexError:
+                    continue
+            return None
+
+        def worker(own: int):
+            try:
+                while not stop.is_set():
+                    item = next_item(own)
+                    if item is None:
+                        with cond:
+                            if state['pending'] == 0:
+                                return
+                            cond.wait(_IDLE_WAIT)
+                        continue
+
+                    try:
+                        children, result = visit(item)
+                        children = list(children)
+                    except BaseException as e:
+                        results.put((False, e))
+                        stop.set()
+                        return
+
+                    # Count children before publishing them, so pending
+                    # never drops to 0 while work is still queued
+                    with cond:
+                        state['pending'] += len(children) - 1
+                        deques[own].extend(children)
+                        if children or state['pending'] == 0:
+                            cond.notify_all()
+                    results.put((True, result))
+            finally:
+                results.put((True, done_marker))
+
+        workers = [
+            threading.Thread(target=worker, args=(i,), name=f"scan-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+
+        try:
+            running = len(workers)
+            while running:
+                ok, value = results.get()
+                if value is done_marker:
+                    running -= 1
+                    continue
+                if not ok:
+                    raise value
+                yield value
+        finally:
+            # Also reached when the caller stops iterating early
+            stop.set()
+            with cond:
+                cond.notify_all()
+            for thread in workers:
+                thread.join()
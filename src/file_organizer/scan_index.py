@@ -0,0 +1,493 @@
+"""
+Shared in-memory filesystem index for all processing stages.
+
+One directory tree scan per run instead of one per stage:
+- Built lazily the first time a stage walks a root folder
+- Holds entry type, size, mtime/mtime_ns/ctime_ns, inode and children per entry
+- os.walk-compatible walk() (top-down or bottom-up)
+- Optional parallel indexing (ParallelWalker) for high-latency filesystems;
+  walk() order is the same for any thread count
+- Updated in place when stages rename, move or delete entries, so later
+  stages see the current tree without re-walking the filesystem
+
+The index is only as fresh as its last update: it is built once per
+cli.main() run and assumes nothing else modifies the tree meanwhile.
+"""
+
+import os
+import stat
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .parallel_walker import ParallelWalker, DEFAULT_SCAN_THREADS
+
+PathLike = Union[str, Path]
+
+
+class IndexEntry:
+    """
+    One indexed filesystem entry.
+
+    ``children`` is a dict (name -> IndexEntry) for real directories and
+    None for files and symlinks. ``is_dir`` follows symlinks (like
+    os.walk, which lists a symlink to a directory under dirnames but
+    never descends into it).
+    """
+
+    __slots__ = ('is_dir', 'is_symlink', 'size', 'mtime', 'mtime_ns', 'ctime_ns', 'ino', 'dev', 'children')
+
+    def __init__(
+        self,
+        is_dir: bool,
+        is_symlink: bool,
+        size: int,
+        mtime: float,
+        mtime_ns: int,
+        ctime_ns: int,
+        ino: int,
+        dev: int,
+        children: Optional[Dict[str, 'IndexEntry']] = None
+    ):
+        self.is_dir = is_dir
+        self.is_symlink = is_symlink
+        self.size = size
+        self.mtime = mtime  # Same float as os.stat().st_mtime (cache key)
+        self.mtime_ns = mtime_ns
+        self.ctime_ns = ctime_ns
+        self.ino = ino
+        self.dev = dev
+        self.children = children
+
+    @property
+    def is_file(self) -> bool:
+        """True for regular files (and symlinks to files)."""
+        return not self.is_dir
+
+    def __repr__(self) -> str:
+        kind = 'dir' if self.is_dir else 'file'
+        return f"IndexEntry({kind}, size={self.size}, ino={self.ino})"
+
+
+def _entry_from_stat(st: Optional[os.stat_result], is_dir: bool, is_symlink: bool) -> IndexEntry:
+    """Build an IndexEntry from a stat result (None if the entry could not be stat'ed)."""
+    children = {} if is_dir and not is_symlink else None
+    if st is None:
+        return IndexEntry(is_dir, is_symlink, 0, 0.0, 0, 0, 0, 0, children)
+
+    return IndexEntry(
+        is_dir=is_dir,
+        is_symlink=is_symlink,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        mtime_ns=st.st_mtime_ns,
+        ctime_ns=st.st_ctime_ns,
+        ino=st.st_ino,
+        dev=st.st_dev,
+        children=children
+    )
+
+
+def _entry_from_dirent(dirent: os.DirEntry) -> IndexEntry:
+    """Build an IndexEntry from a scandir entry (one stat per entry)."""
+    try:
+        is_symlink = dirent.is_symlink()
+        is_dir = dirent.is_dir()
+    except OSError:
+        is_symlink, is_dir = False, False
+
+    try:
+        st = dirent.stat()
+    except OSError:
+        # Broken symlink or vanished entry - fall back to the link itself
+        try:
+            st = dirent.stat(follow_symlinks=False)
+        except OSError:
+            st = None
+
+    return _entry_from_stat(st, is_dir, is_symlink)
+
+
+def _entry_from_path(path: str) -> Optional[IndexEntry]:
+    """Build an IndexEntry for a single path, or None if it doesn't exist."""
+    try:
+        lst = os.lstat(path)
+    except OSError:
+        return None
+
+    is_symlink = os.path.islink(path)
+    try:
+        st = os.stat(path) if is_symlink else lst
+    except OSError:
+        st = lst
+
+    is_dir = stat.S_ISDIR(st.st_mode)
+    return _entry_from_stat(st, is_dir, is_symlink)
+
+
+def _scan_dir(item: Tuple[IndexEntry, str]) -> Tuple[List[Tuple[IndexEntry, str]], Tuple[int, int, int]]:
+    """
+    List one directory into its entry (ParallelWalker visit function).
+
+    Only touches the given node, so several directories can be listed at
+    once. Children keep scandir order.
+
+    Returns:
+        (subdirectories to visit, (dirs scanned, entries indexed, errors))
+    """
+    node, node_path = item
+    subdirs = []
+    try:
+        with os.scandir(node_path) as it:
+            for dirent in it:
+                child = _entry_from_dirent(dirent)
+                node.children[dirent.name] = child
+                if child.children is not None:
+                    subdirs.append((child, dirent.path))
+    except OSError:
+        # Unreadable directory - indexed as empty (os.walk skips it too)
+        return subdirs, (1, len(node.children), 1)
+    return subdirs, (1, len(node.children), 0)
+
+
+class ScanIndex:
+    """
+    In-memory index of one or more directory trees.
+
+    Usage:
+        index = ScanIndex()
+        for dirpath, dirnames, filenames in index.walk(root, topdown=False):
+            ...
+        index.rename(old_path, new_path)   # after a successful rename/move
+        index.refresh(path)                # after chmod/chown (st_ctime changed)
+        index.remove(path)                 # after a successful delete
+
+    Paths are absolute; callers pass resolved paths (as all stages do).
+    Queries outside any indexed root build a new root (walk, listdir) or
+    fall back to the filesystem (exists, get returns None).
+    """
+
+    def __init__(self, verbose: bool = False, scan_threads: int = DEFAULT_SCAN_THREADS):
+        """
+        Initialize an empty index.
+
+        Args:
+            verbose: Print a line when a root is indexed
+            scan_threads: Directories listed concurrently while indexing (default 1)
+        """
+        self.verbose = verbose
+        self.scan_threads = scan_threads
+        self._roots: Dict[str, IndexEntry] = {}  # root path -> root entry
+
+        # Statistics
+        self.stats = {
+            'roots_indexed': 0,
+            'dirs_scanned': 0,
+            'entries_indexed': 0,
+            'scan_errors': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def index_root(self, root: PathLike) -> Optional[IndexEntry]:
+        """
+        Index a directory tree (re-scanning it if already indexed).
+
+        Args:
+            root: Directory to index
+
+        Returns:
+            Root IndexEntry, or None if root is not a directory
+        """
+        root = os.path.abspath(os.fspath(root))
+        entry = _entry_from_path(root)
+        if entry is None or entry.children is None:
+            return None
+
+        # A new root replaces any indexed roots nested inside it
+        for existing in list(self._roots):
+            if existing.startswith(root + os.sep):
+                del self._roots[existing]
+
+        self._scan_tree(entry, root)
+        self._roots[root] = entry
+        self.stats['roots_indexed'] += 1
+
+        if self.verbose:
+            print(f"  Indexed {root} ({self.stats['entries_indexed']:,} entries)", flush=True)
+
+        return entry
+
+    def _scan_tree(self, entry: IndexEntry, path: str):
+        """Fill in the children of a directory entry recursively."""
+        walker = ParallelWalker(threads=self.scan_threads)
+        for dirs, entries, errors in walker.run((entry, path), _scan_dir):
+            self.stats['dirs_scanned'] += dirs
+            self.stats['entries_indexed'] += entries
+            self.stats['scan_errors'] += errors
+
+    def _find_root(self, path: str) -> Optional[str]:
+        """Return the indexed root containing path, if any."""
+        for root in self._roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def _lookup(self, path: str) -> Optional[IndexEntry]:
+        """Find the entry for an absolute path (None if not indexed)."""
+        root = self._find_root(path)
+        if root is None:
+            return None
+
+        node = self._roots[root]
+        if path == root:
+            return node
+
+        for part in path[len(root) + 1:].split(os.sep):
+            if not part:
+                continue
+            if node.children is None:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _ensure_indexed(self, path: str) -> Optional[IndexEntry]:
+        """Find the entry for path, indexing it as a new root if it's outside all roots."""
+        if self._find_root(path) is not None:
+            return self._lookup(path)
+        return self.index_root(path)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def is_indexed(self, path: PathLike) -> bool:
+        """True if path lies inside an indexed root."""
+        return self._find_root(os.path.abspath(os.fspath(path))) is not None
+
+    def get(self, path: PathLike) -> Optional[IndexEntry]:
+        """
+        Get the entry for a path.
+
+        Returns:
+            IndexEntry, or None if the path doesn't exist or isn't indexed
+        """
+        return self._lookup(os.path.abspath(os.fspath(path)))
+
+    def exists(self, path: PathLike) -> bool:
+        """Check existence via the index (filesystem fallback outside indexed roots)."""
+        path = os.path.abspath(os.fspath(path))
+        if self._find_root(path) is None:
+            return os.path.lexists(path)
+        return self._lookup(path) is not None
+
+    def listdir(self, path: PathLike) -> List[str]:
+        """
+        List names in a directory (like os.listdir).
+
+        Raises:
+            FileNotFoundError: If the directory doesn't exist
+            NotADirectoryError: If path is not a directory
+        """
+        path = os.path.abspath(os.fspath(path))
+        if self._find_root(path) is None:
+            return os.listdir(path)
+
+        entry = self._lookup(path)
+        if entry is None:
+            raise FileNotFoundError(f"No such directory: {path}")
+        if entry.children is None:
+            raise NotADirectoryError(f"Not a directory: {path}")
+        return list(entry.children)
+
+    def children(self, path: PathLike) -> List[Tuple[str, IndexEntry]]:
+        """
+        List (name, entry) pairs of a directory, indexing it if needed.
+
+        Returns:
+            List of (name, IndexEntry); empty if path is not a directory
+        """
+        entry = self._ensure_indexed(os.path.abspath(os.fspath(path)))
+        if entry is None or entry.children is None:
+            return []
+        return list(entry.children.items())
+
+    def walk(
+        self,
+        top: PathLike,
+        topdown: bool = True
+    ) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Walk an indexed tree like os.walk (followlinks=False).
+
+        Name lists are snapshots taken when a directory is reached, so
+        callers may mutate the tree (and the index) while walking. With
+        topdown=True, pruning dirnames in place skips those subtrees.
+
+        Args:
+            top: Directory to walk (indexed on first use)
+            topdown: Yield parents before children (default True)
+
+        Yields:
+            Tuples of (dirpath, dirnames, filenames)
+        """
+        top_str = os.fspath(top)
+        entry = self._ensure_indexed(os.path.abspath(top_str))
+        if entry is None or entry.children is None:
+            return
+
+        stack: List[Tuple[str, IndexEntry, Optional[Tuple[List[str], List[str]]]]] = [
+            (top_str, entry, None)
+        ]
+
+        while stack:
+            dirpath, node, listing = stack.pop()
+
+            if listing is not None:
+                # Bottom-up: all children done, now yield this directory
+                yield dirpath, listing[0], listing[1]
+                continue
+
+            dirnames = []
+            filenames = []
+            for name, child in node.children.items():
+                (dirnames if child.is_dir else filenames).append(name)
+
+            if topdown:
+                yield dirpath, dirnames, filenames
+            else:
+                stack.append((dirpath, node, (dirnames, filenames)))
+
+            # Push subdirectories in reverse so they're visited in listing order
+            for name in reversed(dirnames):
+                child = node.children.get(name)
+                if child is not None and child.children is not None:
+                    stack.append((os.path.join(dirpath, name), child, None))
+
+    def iter_files(self, top: PathLike) -> Iterator[Tuple[str, IndexEntry]]:
+        """
+        Iterate over all files below a directory (top-down order).
+
+        Yields:
+            Tuples of (file_path, IndexEntry)
+        """
+        for dirpath, dirnames, filenames in self.walk(top):
+            node = self._lookup(os.path.abspath(dirpath))
+            if node is None or node.children is None:
+                continue
+            for filename in filenames:
+                entry = node.children.get(filename)
+                if entry is not None:
+                    yield os.path.join(dirpath, filename), entry
+
+    # ------------------------------------------------------------------
+    # In-place updates (call after the filesystem operation succeeded)
+    # ------------------------------------------------------------------
+
+    def _parent_of(self, path: str) -> Tuple[Optional[IndexEntry], str]:
+        """Return (parent directory entry, name) for a path."""
+        parent_path, name = os.path.split(path)
+        parent = self._lookup(parent_path)
+        if parent is None or parent.children is None:
+            return None, name
+        return parent, name
+
+    def add(self, path: PathLike) -> Optional[IndexEntry]:
+        """
+        Index a new path (file or directory subtree) from the filesystem.
+
+        Missing ancestor directories inside an indexed root are added too.
+        No-op outside indexed roots or if the path is already indexed.
+
+        Returns:
+            The entry, or None if not indexed
+        """
+        path = os.path.abspath(os.fspath(path))
+        root = self._find_root(path)
+        if root is None or path == root:
+            return self._lookup(path)
+
+        existing = self._lookup(path)
+        if existing is not None:
+            return existing
+
+        parent, name = self._parent_of(path)
+        if parent is None:
+            parent = self.add(os.path.dirname(path))
+            if parent is None or parent.children is None:
+                return None
+
+        entry = _entry_from_path(path)
+        if entry is None:
+            return None
+
+        if entry.children is not None:
+            self._scan_tree(entry, path)
+        parent.children[name] = entry
+        self.stats['entries_indexed'] += 1
+        return entry
+
+    def remove(self, path: PathLike):
+        """Drop a path (and its subtree) from the index."""
+        path = os.path.abspath(os.fspath(path))
+        if path in self._roots:
+            del self._roots[path]
+            return
+
+        parent, name = self._parent_of(path)
+        if parent is not None:
+            parent.children.pop(name, None)
+
+    def refresh(self, path: PathLike) -> Optional[IndexEntry]:
+        """
+        Re-stat an indexed path in place (its subtree is kept).
+
+        Renames, chmod and chown change st_ctime, which the hash cache
+        validates against; without this the next run would see every
+        touched file as modified.
+
+        Returns:
+            The entry, or None if not indexed
+        """
+        path = os.path.abspath(os.fspath(path))
+        entry = self._lookup(path)
+        if entry is None:
+            return None
+
+        fresh = _entry_from_path(path)
+        if fresh is not None:
+            entry.size = fresh.size
+            entry.mtime = fresh.mtime
+            entry.mtime_ns = fresh.mtime_ns
+            entry.ctime_ns = fresh.ctime_ns
+            entry.ino = fresh.ino
+            entry.dev = fresh.dev
+        return entry
+
+    def rename(self, old_path: PathLike, new_path: PathLike):
+        """
+        Record a rename or move (the subtree moves with a directory).
+
+        The moved entry is re-stat'ed (a rename changes its st_ctime).
+        Moves out of indexed roots drop the entry; moves into an indexed
+        root from outside index the destination from the filesystem.
+        """
+        old_path = os.path.abspath(os.fspath(old_path))
+        new_path = os.path.abspath(os.fspath(new_path))
+
+        old_parent, old_name = self._parent_of(old_path)
+        entry = old_parent.children.pop(old_name, None) if old_parent is not None else None
+
+        if self._find_root(new_path) is None:
+            return
+
+        new_parent, new_name = self._parent_of(new_path)
+        if entry is None or new_parent is None:
+            self.add(new_path)
+            return
+
+        new_parent.children[new_name] = entry
+        self.refresh(new_path)
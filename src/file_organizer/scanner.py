@@ -0,0 +1,147 @@
+"""
+os.scandir-based file scanner for duplicate detection.
+
+Replaces os.walk + Path.stat() (two stat calls per file) with:
+- Extension filter applied to the entry name before any syscall
+- At most one stat per candidate file, via DirEntry.stat()
+- Compact FileRecord tuples instead of Path objects
+
+On network filesystems (NFS/SMB) stat round-trips dominate scan time,
+so halving them roughly halves the scan.
+"""
+
+import os
+from pathlib import Path
+from typing import Collection, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+from .parallel_walker import ParallelWalker, DEFAULT_SCAN_THREADS
+
+PathLike = Union[str, Path]
+
+
+class FileRecord(NamedTuple):
+    """One scanned file: absolute path plus the stat fields we use."""
+    path: str
+    size: int
+    mtime: float
+    mtime_ns: int
+    ino: int
+    dev: int
+    ctime_ns: int
+
+
+class FileScanner:
+    """
+    Walk a directory tree and yield records for candidate files.
+
+    Traversal matches os.walk(top) (symlinked directories not followed,
+    unreadable directories skipped). Symlinks to files are stat'ed
+    through the link like Path.stat(). With threads > 1, directories are
+    listed in parallel and records arrive in completion order.
+
+    Usage:
+        scanner = FileScanner(skip_extensions={'.jpg'}, min_size=10240)
+        for record in scanner.scan(directory):
+            ...
+        scanner.stats['skipped_extension']
+    """
+
+    def __init__(
+        self,
+        skip_extensions: Collection[str] = (),
+        min_size: int = 0,
+        threads: int = DEFAULT_SCAN_THREADS
+    ):
+        """
+        Initialize scanner.
+
+        Args:
+            skip_extensions: Lowercase extensions (with dot) to skip without a stat
+            min_size: Skip files smaller than this many bytes
+            threads: Directories listed concurrently (default 1)
+        """
+        self.skip_extensions = frozenset(skip_extensions)
+        self.min_size = min_size
+        self.threads = threads
+
+        # Statistics
+        self.stats = {
+            'files_seen': 0,
+            'files_stated': 0,
+            'skipped_extension': 0,
+            'skipped_small': 0,
+            'errors': 0,
+        }
+
+    def scan(self, top: PathLike) -> Iterator[FileRecord]:
+        """
+        Scan a directory tree.
+
+        Args:
+            top: Root directory to scan
+
+        Yields:
+            FileRecord for every file that passes the filters
+        """
+        walker = ParallelWalker(threads=self.threads)
+        for records, counts in walker.run(os.path.abspath(os.fspath(top)), self._scan_dir):
+            for key, count in counts.items():
+                self.stats[key] += count
+            yield from records
+
+    def _scan_dir(self, dirpath: str) -> Tuple[List[str], Tuple[List[FileRecord], Dict[str, int]]]:
+        """
+        List one directory (ParallelWalker visit function).
+
+        Returns:
+            (subdirectories to visit, (records, stat counters for this directory))
+        """
+        skip_extensions = self.skip_extensions
+        min_size = self.min_size
+        counts = dict.fromkeys(self.stats, 0)
+        subdirs = []
+        records = []
+
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    # Directory check uses d_type (no syscall on most filesystems)
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+
+                    counts['files_seen'] += 1
+
+                    # Extension filter: name only, no syscall
+                    if skip_extensions:
+                        ext = os.path.splitext(entry.name)[1].lower()
+                        if ext in skip_extensions:
+                            counts['skipped_extension'] += 1
+                            continue
+
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        # Broken symlink, vanished file or permission error
+                        counts['errors'] += 1
+                        continue
+                    counts['files_stated'] += 1
+
+                    if st.st_size < min_size:
+                        counts['skipped_small'] += 1
+                        continue
+
+                    records.append(FileRecord(
+                        entry.path, st.st_size, st.st_mtime,
+                        st.st_mtime_ns, st.st_ino, st.st_dev, st.st_ctime_ns
+                    ))
+        except OSError:
+            # Unreadable directory - skipped, like os.walk
+            counts['errors'] += 1
+
+        return subdirs, (records, counts)
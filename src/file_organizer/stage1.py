@@ -8,6 +8,8 @@ Implements the complete Stage 1 workflow:
 - Hidden file deletion  
 - Symlink handling
 - Dry-run preview mode
+- Optional parallel file renames, sharded by parent directory
+- Renames and deletions relative to open parent directory fds (fsops)
 - Comprehensive logging
 """
 
@@ -16,12 +18,16 @@ import sys
 import time
 import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 from datetime import datetime
 
-from .filename_cleaner import FilenameCleaner
+from .filename_cleaner import FilenameCleaner, CollisionAllocator
+from .fsops import DirFdOps
 from .progress_bar import ProgressBar, SimpleProgress
+from .scan_index import ScanIndex
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +35,8 @@ logger = logging.getLogger(__name__)
 class Stage1Processor:
     """Stage 1: Filename Detoxification."""
     
-    def __init__(self, input_dir: Path, dry_run: bool = True, verbose: bool = True):
+    def __init__(self, input_dir: Path, dry_run: bool = True, verbose: bool = True,
+                 scan_index: Optional[ScanIndex] = None, rename_workers: int = 1):
         """
         Initialize Stage 1 processor.
 
@@ -37,11 +44,18 @@ class Stage1Processor:
             input_dir: Directory to process
             dry_run: If True, preview changes without executing
             verbose: If True, print progress messages
+            scan_index: Shared filesystem index (default: private index for this run)
+            rename_workers: Directories whose file operations run concurrently
+                (execute mode only; 1 = sequential)
         """
         self.input_dir = input_dir.resolve()
         self.dry_run = dry_run
         self.verbose = verbose
+        self.rename_workers = max(1, rename_workers)
         self.cleaner = FilenameCleaner()
+        self.index = scan_index if scan_index is not None else ScanIndex()
+        self._index_lock = threading.Lock()  # Index updates from rename workers
+        self.fs = DirFdOps()  # Sequential renames/deletions (workers open their own)
         
         # Statistics
         self.stats = {
@@ -57,8 +71,16 @@ class Stage1Processor:
             'permission_warnings': 0,
         }
         
-        # Track all target names for collision detection
-        self.used_names: Dict[str, Set[str]] = {}  # dir_path -> set of used names
+        # Collision detection: names in use in the directory being processed.
+        # Files and folders arrive grouped by parent (bottom-up walk), so only
+        # the current directory's allocator is kept; it is seeded from the
+        # scan index listing and replaced when processing moves on.
+        self._allocator_dir: Optional[str] = None
+        self._allocator: Optional[CollisionAllocator] = None
+
+        # Dry-run only: names claimed by previewed renames, per directory
+        # (the index is not updated in dry-run, so they can't be re-read from it)
+        self.pending_names: Dict[str, List[str]] = {}
         
         # Operation log (for dry-run preview)
         self.operations: List[Tuple[str, str, str]] = []  # (operation, source, dest)
@@ -83,15 +105,19 @@ class Stage1Processor:
         self.stats['files_scanned'] = len(files)
         self.stats['folders_scanned'] = len(folders)
 
-        # Phase 2: Process files (bottom-up, so we process files before their parent folders)
-        if len(files) > 0:
-            self._print("\nStage 1/4: Filename Detoxification - Processing Files")
-            self._process_files(files)
+        try:
+            # Phase 2: Process files (bottom-up, so we process files before their parent folders)
+            if len(files) > 0:
+                self._print("\nStage 1/4: Filename Detoxification - Processing Files")
+                self._process_files(files)
 
-        # Phase 3: Process folders (bottom-up)
-        if len(folders) > 0:
-            self._print("\nStage 1/4: Filename Detoxification - Processing Folders")
-            self._process_folders(folders)
+            # Phase 3: Process folders (bottom-up)
+            if len(folders) > 0:
+                self._print("\nStage 1/4: Filename Detoxification - Processing Folders")
+                self._process_folders(folders)
+        finally:
+            # Close the parent directory fds opened for renames and deletions
+            self.fs.close()
 
         # Phase 4: Show summary
         end_time = datetime.now()
@@ -142,7 +168,7 @@ class Stage1Processor:
         # Show immediate feedback (update at 0 items to display starting message)
         progress.update(0, force=True)
 
-        for root, dirs, filenames in os.walk(self.input_dir, topdown=False):
+        for root, dirs, filenames in self.index.walk(self.input_dir, topdown=False):
             root_path = Path(root)
 
             # Collect files
@@ -166,6 +192,10 @@ class Stage1Processor:
     
     def _process_files(self, files: List[Path]):
         """Process all files."""
+        if self.rename_workers > 1 and not self.dry_run:
+            self._process_files_parallel(files)
+            return
+
         total = len(files)
 
         # Track stats for progress bar
@@ -218,34 +248,136 @@ class Stage1Processor:
         }
         progress.finish(final_stats)
     
+    def _process_files_parallel(self, files: List[Path]):
+        """
+        Process all files with their operations sharded by parent directory.
+
+        Names are planned first, in walk order, so collision resolution
+        stays sequential and gives the same names as a sequential run.
+        Each directory's operations then run in order on one worker, so no
+        two workers touch the same directory. Workers count into their own
+        stats, which are merged as directories complete.
+        """
+        progress = ProgressBar(
+            total=len(files),
+            description="Processing Files",
+            verbose=self.verbose,
+            min_duration=1.0
+        )
+
+        # Plan: (operation, path, new_path) lists and file counts per directory
+        shards: Dict[Path, List[Tuple[str, Path, Optional[Path]]]] = {}
+        shard_files: Dict[Path, int] = {}
+        for file_path in files:
+            parent_dir = file_path.parent
+            shard_files[parent_dir] = shard_files.get(parent_dir, 0) + 1
+            try:
+                operation = self._plan_file(file_path)
+            except Exception as e:
+                self.stats['errors'] += 1
+                progress.message(f"ERROR: {file_path}: {e}")
+                continue
+            if operation is not None:
+                shards.setdefault(parent_dir, []).append(operation)
+
+        def progress_stats() -> Dict[str, int]:
+            return {
+                "Renamed": self.stats['files_renamed'],
+                "Deleted": self.stats['hidden_deleted'],
+                "Symlinks": self.stats['symlinks_removed'],
+                "Collisions": self.stats['collisions_resolved']
+            }
+
+        # Directories with nothing to do are complete already
+        completed = sum(count for parent_dir, count in shard_files.items() if parent_dir not in shards)
+        progress.update(completed, progress_stats())
+
+        with ThreadPoolExecutor(max_workers=self.rename_workers) as pool:
+            futures = {
+                pool.submit(self._apply_file_shard, operations): shard_files[parent_dir]
+                for parent_dir, operations in shards.items()
+            }
+            for future in as_completed(futures):
+                shard_stats, errors = future.result()
+                for key, value in shard_stats.items():
+                    self.stats[key] += value
+                for error in errors:
+                    progress.message(error)
+
+                completed += futures[future]
+                progress.update(completed, progress_stats())
+
+        progress.finish(progress_stats())
+
+    def _apply_file_shard(
+        self, operations: List[Tuple[str, Path, Optional[Path]]]
+    ) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Run one directory's planned file operations (rename worker).
+
+        Returns:
+            Tuple of (stats counted by this shard, error messages)
+        """
+        stats = dict.fromkeys(self.stats, 0)
+        errors = []
+        with DirFdOps() as fs:
+            for operation in operations:
+                try:
+                    self._apply_file_operation(operation, stats, fs)
+                except Exception as e:
+                    stats['errors'] += 1
+                    errors.append(f"ERROR: {operation[1]}: {e}")
+        return stats, errors
+
     def _process_single_file(self, file_path: Path):
         """Process a single file."""
+        operation = self._plan_file(file_path)
+        if operation is not None:
+            self._apply_file_operation(operation, self.stats)
+
+    def _plan_file(self, file_path: Path) -> Optional[Tuple[str, Path, Optional[Path]]]:
+        """
+        Decide what happens to a file (its new name is claimed here).
+
+        Returns:
+            (operation, path, new_path) with operation 'symlink', 'hidden'
+            or 'rename', or None if the file keeps its name
+        """
         filename = file_path.name
         parent_dir = file_path.parent
         
-        # Check if it's a symlink
-        if file_path.is_symlink():
-            self._handle_symlink(file_path)
-            return
+        # Check if it's a symlink (from the scan index, no extra lstat)
+        entry = self.index.get(file_path)
+        is_symlink = entry.is_symlink if entry is not None else file_path.is_symlink()
+        if is_symlink:
+            return ('symlink', file_path, None)
         
         # Check if it's a hidden file
         if self.cleaner.is_hidden_file(filename):
-            self._delete_hidden_file(file_path)
-            return
+            return ('hidden', file_path, None)
         
         # Sanitize filename
         new_filename = self.cleaner.sanitize_filename(filename, is_directory=False)
         
         # Check if rename is needed
         if new_filename == filename:
-            return  # No change needed
+            return None  # No change needed
         
         # Check for collision
         new_filename = self._resolve_collision(parent_dir, new_filename)
         
-        # Perform rename
-        new_path = parent_dir / new_filename
-        self._rename_item(file_path, new_path, is_file=True)
+        return ('rename', file_path, parent_dir / new_filename)
+
+    def _apply_file_operation(self, operation: Tuple[str, Path, Optional[Path]], stats: Dict[str, int],
+                              fs: Optional[DirFdOps] = None):
+        """Carry out a planned file operation, counting into stats."""
+        op, file_path, new_path = operation
+        if op == 'symlink':
+            self._handle_symlink(file_path, stats, fs)
+        elif op == 'hidden':
+            self._delete_hidden_file(file_path, stats, fs)
+        else:
+            self._rename_item(file_path, new_path, is_file=True, stats=stats, fs=fs)
     
     def _process_folders(self, folders: List[Path]):
         """Process all folders."""
@@ -306,29 +438,39 @@ class Stage1Processor:
         new_path = parent_dir / new_foldername
         self._rename_item(folder_path, new_path, is_file=False)
     
-    def _handle_symlink(self, symlink_path: Path):
+    def _handle_symlink(self, symlink_path: Path, stats: Optional[Dict[str, int]] = None,
+                        fs: Optional[DirFdOps] = None):
         """Handle symbolic link (break/remove it)."""
+        stats = self.stats if stats is None else stats
+        fs = self.fs if fs is None else fs
         if self.dry_run:
             self.operations.append(("DELETE SYMLINK", str(symlink_path), ""))
         else:
             try:
-                symlink_path.unlink()
-                self.stats['symlinks_removed'] += 1
+                fs.unlink(symlink_path)
+                with self._index_lock:
+                    self.index.remove(symlink_path)
+                stats['symlinks_removed'] += 1
             except Exception as e:
-                self.stats['errors'] += 1
+                stats['errors'] += 1
                 raise
     
-    def _delete_hidden_file(self, file_path: Path):
+    def _delete_hidden_file(self, file_path: Path, stats: Optional[Dict[str, int]] = None,
+                            fs: Optional[DirFdOps] = None):
         """Delete a hidden file."""
+        stats = self.stats if stats is None else stats
+        fs = self.fs if fs is None else fs
         if self.dry_run:
             self.operations.append(("DELETE HIDDEN", str(file_path), ""))
-            self.stats['hidden_deleted'] += 1
+            stats['hidden_deleted'] += 1
         else:
             try:
-                file_path.unlink()
-                self.stats['hidden_deleted'] += 1
+                fs.unlink(file_path)
+                with self._index_lock:
+                    self.index.remove(file_path)
+                stats['hidden_deleted'] += 1
             except Exception as e:
-                self.stats['errors'] += 1
+                stats['errors'] += 1
                 raise
     
     def _resolve_collision(self, parent_dir: Path, filename: str) -> str:
@@ -342,54 +484,53 @@ class Stage1Processor:
         Returns:
             Unique filename (may be modified with date stamp + counter)
         """
-        # Track used names per directory
         dir_key = str(parent_dir)
-        if dir_key not in self.used_names:
-            # Initialize with existing files in directory
-            self.used_names[dir_key] = {
-                item.name.lower() for item in parent_dir.iterdir()
-            }
+        if dir_key != self._allocator_dir:
+            # Seed from the scan's listing (renames so far are applied to it)
+            names = self.index.listdir(parent_dir)
+            if self.dry_run:
+                names += self.pending_names.get(dir_key, [])
+            self._allocator = CollisionAllocator(names)
+            self._allocator_dir = dir_key
         
-        # Check for collision (case-insensitive)
-        if filename.lower() in self.used_names[dir_key]:
-            # Generate unique name
-            original_filename = filename
-            filename = self.cleaner.generate_collision_name(filename, parent_dir)
+        # Claim the name, or the next free collision name (case-insensitive)
+        unique_name = self._allocator.allocate(filename)
+        if unique_name != filename:
             self.stats['collisions_resolved'] += 1
-            
-            # Keep trying if still collides
-            while filename.lower() in self.used_names[dir_key]:
-                filename = self.cleaner.generate_collision_name(original_filename, parent_dir)
-        
-        # Mark this name as used
-        self.used_names[dir_key].add(filename.lower())
+        if self.dry_run:
+            self.pending_names.setdefault(dir_key, []).append(unique_name)
         
-        return filename
+        return unique_name
     
-    def _rename_item(self, old_path: Path, new_path: Path, is_file: bool):
+    def _rename_item(self, old_path: Path, new_path: Path, is_file: bool,
+                     stats: Optional[Dict[str, int]] = None, fs: Optional[DirFdOps] = None):
         """Rename a file or folder."""
+        stats = self.stats if stats is None else stats
+        fs = self.fs if fs is None else fs
         if self.dry_run:
             op_type = "RENAME FILE" if is_file else "RENAME FOLDER"
             self.operations.append((op_type, str(old_path), str(new_path)))
             if is_file:
-                self.stats['files_renamed'] += 1
+                stats['files_renamed'] += 1
             else:
-                self.stats['folders_renamed'] += 1
+                stats['folders_renamed'] += 1
         else:
             try:
                 # Perform rename
-                old_path.rename(new_path)
+                fs.rename(old_path, new_path)
+                with self._index_lock:
+                    self.index.rename(old_path, new_path)
                 
                 if is_file:
-                    self.stats['files_renamed'] += 1
+                    stats['files_renamed'] += 1
                 else:
-                    self.stats['folders_renamed'] += 1
+                    stats['folders_renamed'] += 1
                     
                 # Set permissions (644 for files, 755 for folders)
                 if is_file:
-                    new_path.chmod(0o644)
+                    fs.chmod(new_path, 0o644)
                 else:
-                    new_path.chmod(0o755)
+                    fs.chmod(new_path, 0o755)
                     
                 # Attempt to change ownership (may fail without sudo)
                 try:
@@ -407,21 +548,25 @@ class Stage1Processor:
                         f"Permission denied changing ownership for {new_path}: {e}. "
                         f"File may have incorrect permissions."
                     )
-                    self.stats['permission_warnings'] += 1
+                    stats['permission_warnings'] += 1
                 except LookupError as e:
                     # User/group doesn't exist
                     logger.warning(
                         f"User 'nobody' or group 'users' not found on this system. "
                         f"Skipping ownership change for {new_path}."
                     )
-                    self.stats['permission_warnings'] += 1
+                    stats['permission_warnings'] += 1
                 except Exception as e:
                     # Unexpected error
                     logger.error(f"Unexpected error changing ownership for {new_path}: {e}")
-                    self.stats['errors'] += 1
+                    stats['errors'] += 1
+
+                # chmod/chown changed st_ctime; keep the index (and cache keys) current
+                with self._index_lock:
+                    self.index.refresh(new_path)
                     
             except Exception as e:
-                self.stats['errors'] += 1
+                stats['errors'] += 1
                 raise
     
 
@@ -3,7 +3,7 @@ Stage 2: Folder Structure Optimization Processor
 
 lImplements the complete Stage 2 workflow:
 - Folder chain flattening (< threshold items, including empty folders)
-- Iterative flattening (multiple passes)
+- Cascading flattening planned in memory, applied as one ordered move list
 - Folder name sanitization
 - Comprehensive logging
 """
@@ -13,12 +13,14 @@ import sys
 import shutil
 import logging
 from pathlib import Path
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 from datetime import datetime
 
 from .filename_cleaner import FilenameCleaner
 from .config import Config
 from .progress_bar import ProgressBar, SimpleProgress
+from .scan_index import ScanIndex
+from .flatten_planner import FlattenPlanner, FlattenPlan, OP_MOVE
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +29,8 @@ class Stage2Processor:
     """Stage 2: Folder Structure Optimization."""
     
     def __init__(self, input_dir: Path, dry_run: bool = True,
-                 flatten_threshold: int = 5, config: Config = None, verbose: bool = True):
+                 flatten_threshold: int = 5, config: Config = None, verbose: bool = True,
+                 scan_index: Optional[ScanIndex] = None):
         """
         Initialize Stage 2 processor.
 
@@ -37,6 +40,7 @@ class Stage2Processor:
             flatten_threshold: Number of items below which folders are flattened
             config: Configuration object (optional)
             verbose: If True, print progress messages
+            scan_index: Shared filesystem index (default: private index for this run)
         """
         self.input_dir = input_dir.resolve()
         self.dry_run = dry_run
@@ -44,6 +48,7 @@ class Stage2Processor:
         self.flatten_threshold = flatten_threshold
         self.config = config or Config()
         self.cleaner = FilenameCleaner()
+        self.index = scan_index if scan_index is not None else ScanIndex()
         
         # Statistics
         self.stats = {
@@ -189,69 +194,100 @@ class Stage2Processor:
     
     def _flatten_folders_iterative(self):
         """
-        Flatten folder structure iteratively.
+        Flatten folder structure.
 
         Two flattening rules:
         1. Single-child chains: If folder A contains only folder B, flatten B into A
         2. Small folders: If folder has < threshold items, move contents to parent
 
-        Process iteratively until no more flattening is possible.
+        The rules are applied to an in-memory copy of the folder tree until
+        no more flattening is possible (cascades included), then the
+        resulting moves are applied in one ordered pass. Dry-run shows the
+        same plan without touching the filesystem.
         """
-        total_flattened = 0
-        pass_num = 0
-        max_passes = 100  # Safety limit to prevent infinite loops
+        root_entry = self.index.get(self.input_dir)
+        if root_entry is None:
+            root_entry = self.index.index_root(self.input_dir)
+        if root_entry is None or root_entry.children is None:
+            self._print(f"  ERROR scanning directory: {self.input_dir} is not a directory")
+            self.stats['errors'] += 1
+            return
 
-        while pass_num < max_passes:
-            pass_num += 1
-            folders = self._scan_folders()
+        planner = FlattenPlanner(self.flatten_threshold, self.cleaner)
+        plan = planner.plan(root_entry, str(self.input_dir))
+        self.stats['collisions_resolved'] += plan.collisions
 
-            if not folders:
-                break
+        for folder, parent in plan.flattened:
+            self.operations.append(("FLATTEN FOLDER", folder, parent))
 
-            pass_flattened = 0
+        if not plan.flattened:
+            self._print(f"  ✓ No folders to flatten")
+            return
 
-            # Process bottom-up (deepest first)
-            for folder_path in folders:
-                folder_key = str(folder_path)
+        self.stats['flattening_passes'] = 1
+        self._print(f"  Planned: flatten {len(plan.flattened)} folders ({plan.moves} moves)")
 
-                # Skip root directory
-                if folder_path == self.input_dir:
-                    continue
+        if self.dry_run:
+            self.stats['folders_flattened'] = len(plan.flattened)
+            self._print(f"  ✓ Total folders flattened: {len(plan.flattened)}")
+            return
 
-                # Skip folders that previously failed or were already processed
-                if folder_key in self.failed_folders or folder_key in self.processed_folders:
-                    continue
+        flattened = self._apply_flatten_plan(plan)
+        self.stats['folders_flattened'] = flattened
+        self._print(f"  ✓ Total folders flattened: {flattened}")
 
-                # Check if folder should be flattened
-                if self._should_flatten_folder(folder_path):
-                    success = self._flatten_folder(folder_path)
-                    if success:
-                        pass_flattened += 1
-                        # In dry-run, track as processed to prevent re-scanning
-                        if self.dry_run:
-                            self.processed_folders.add(folder_key)
-                    else:
-                        # Track failed folder to prevent retrying
-                        self.failed_folders.add(folder_key)
+    def _apply_flatten_plan(self, plan: FlattenPlan) -> int:
+        """
+        Execute a flatten plan (moves, then removal of emptied folders).
 
-            if pass_flattened == 0:
-                break  # No more flattening possible
+        A folder whose contents could not all be moved out is kept, and so
+        are its flattened ancestors.
 
-            total_flattened += pass_flattened
-            # Show pass info in verbose mode
-            if self.verbose and pass_flattened > 0:
-                self._print(f"  Pass {pass_num}: Flattened {pass_flattened} folders")
+        Args:
+            plan: Plan from FlattenPlanner
 
-        if pass_num >= max_passes:
-            self._print(f"  WARNING: Reached maximum pass limit ({max_passes})")
+        Returns:
+            Number of folders flattened
+        """
+        flattened = 0
+        moved = 0
+        kept: Set[str] = set()  # Folders that will not be empty
+
+        progress = ProgressBar(
+            total=len(plan.operations),
+            description="Flattening Folders",
+            verbose=self.verbose,
+            min_duration=1.0
+        )
+
+        for i, (op, src, dest) in enumerate(plan.operations):
+            if op == OP_MOVE:
+                try:
+                    shutil.move(src, dest)
+                    self.index.rename(src, dest)
+                    moved += 1
+                except Exception as e:
+                    progress.message(f"  ERROR moving {src} to {dest}: {e}")
+                    self.stats['errors'] += 1
+                    kept.add(os.path.dirname(src))
+            elif src in kept:
+                # Still has contents; keep it (and its parent non-empty)
+                kept.add(os.path.dirname(src))
+            else:
+                try:
+                    os.rmdir(src)
+                    self.index.remove(src)
+                    flattened += 1
+                except Exception as e:
+                    progress.message(f"  ERROR removing folder {src}: {e}")
+                    self.stats['errors'] += 1
+                    kept.add(os.path.dirname(src))
+
+            progress.update(i + 1, {"Moved": moved, "Flattened": flattened})
+
+        progress.finish({"Moved": moved, "Flattened": flattened})
+        return flattened
 
-        self.stats['folders_flattened'] = total_flattened
-        self.stats['flattening_passes'] = pass_num - 1
-        if total_flattened > 0:
-            self._print(f"  ✓ Total folders flattened: {total_flattened} (in {pass_num} passes)")
-        else:
-            self._print(f"  ✓ No folders to flatten")
-    
     def _sanitize_folder_names(self):
         """Sanitize all remaining folder names using Stage 1 rules."""
         folders = self._scan_folders()
@@ -331,13 +367,13 @@ class Stage2Processor:
         progress.update(0, force=True)
 
         try:
-            for root, dirs, files in os.walk(self.input_dir, topdown=False):
+            for root, dirs, files in self.index.walk(self.input_dir, topdown=False):
                 root_path = Path(root)
 
                 # Collect folders (excluding root itself)
                 for dirname in dirs:
                     folder_path = root_path / dirname
-                    if folder_path.exists():  # May have been removed/moved
+                    if self.index.exists(folder_path):  # May have been removed/moved
                         folders.append(folder_path)
 
                         # Update progress every 50 folders (more frequent feedback)
@@ -365,120 +401,18 @@ class Stage2Processor:
         """
         try:
             # Check if folder exists
-            if not folder_path.exists() or not folder_path.is_dir():
+            entry = self.index.get(folder_path)
+            if entry is None or entry.children is None:
                 return False
             
             # Check contents
-            contents = list(folder_path.iterdir())
-            return len(contents) == 0
+            return len(entry.children) == 0
 
         except Exception as e:
             self._print(f"  ERROR checking folder {folder_path}: {e}")
             self.stats['errors'] += 1
             return False
     
-    def _should_flatten_folder(self, folder_path: Path) -> bool:
-        """
-        Check if a folder should be flattened.
-        
-        Flattening criteria:
-        1. Single-child: Folder contains only one subfolder
-        2. Small folder: Folder contains < threshold items (files + folders)
-        
-        Args:
-            folder_path: Folder to check
-            
-        Returns:
-            True if should be flattened, False otherwise
-        """
-        try:
-            # Check if folder exists
-            if not folder_path.exists() or not folder_path.is_dir():
-                return False
-            
-            # Don't flatten root directory
-            if folder_path == self.input_dir:
-                return False
-            
-            # Count contents
-            contents = list(folder_path.iterdir())
-            num_items = len(contents)
-
-            # Empty folders should be flattened (effectively removed)
-            # 0 items is less than threshold, so they get flattened
-            if num_items == 0:
-                return True
-
-            # Check if single-child chain (only one subfolder, no files)
-            if num_items == 1 and contents[0].is_dir():
-                return True
-
-            # Check if small folder (< threshold items)
-            if num_items < self.flatten_threshold:
-                return True
-
-            return False
-
-        except Exception as e:
-            self._print(f"  ERROR checking folder {folder_path}: {e}")
-            self.stats['errors'] += 1
-            return False
-    
-    def _flatten_folder(self, folder_path: Path) -> bool:
-        """
-        Flatten a folder by moving its contents to parent.
-        
-        Args:
-            folder_path: Folder to flatten
-            
-        Returns:
-            True if successful, False if failed
-        """
-        try:
-            parent_dir = folder_path.parent
-            
-            # Get all items in folder
-            contents = list(folder_path.iterdir())
-            
-            if self.dry_run:
-                self.operations.append(("FLATTEN FOLDER", str(folder_path), str(parent_dir)))
-                return True
-            else:
-                # Move each item to parent directory
-                move_failed = False
-                for item in contents:
-                    dest_name = item.name
-                    
-                    # Check for collision in parent
-                    dest_name = self._resolve_collision(parent_dir, dest_name)
-                    dest_path = parent_dir / dest_name
-                    
-                    # Move item
-                    try:
-                        shutil.move(str(item), str(dest_path))
-                    except Exception as e:
-                        self._print(f"  ERROR moving {item} to {dest_path}: {e}")
-                        self.stats['errors'] += 1
-                        move_failed = True
-
-                # If moves failed, don't try to remove folder
-                if move_failed:
-                    return False
-
-                # Remove now-empty folder
-                try:
-                    folder_path.rmdir()
-                    return True
-                except Exception as e:
-                    self._print(f"  ERROR removing folder {folder_path}: {e}")
-                    self.stats['errors'] += 1
-                    return False
-
-        except Exception as e:
-            self._print(f"  ERROR flattening folder {folder_path}: {e}")
-            self.stats['errors'] += 1
-            return False
-    
     def _remove_folder(self, folder_path: Path) -> bool:
         """
         Remove an empty folder.
@@ -495,6 +429,7 @@ class Stage2Processor:
         else:
             try:
                 folder_path.rmdir()
+                self.index.remove(folder_path)
                 return True
             except Exception as e:
                 self._print(f"  ERROR removing folder {folder_path}: {e}")
@@ -514,6 +449,7 @@ class Stage2Processor:
         else:
             try:
                 old_path.rename(new_path)
+                self.index.rename(old_path, new_path)
                 
                 # Set permissions
                 new_path.chmod(0o755)
@@ -547,6 +483,9 @@ class Stage2Processor:
                     logger.error(f"Unexpected error changing ownership for {new_path}: {e}")
                     self.stats['errors'] += 1
 
+                # chmod/chown changed st_ctime; keep the index current
+                self.index.refresh(new_path)
+
             except Exception as e:
                 self._print(f"  ERROR renaming folder {old_path} to {new_path}: {e}")
                 self.stats['errors'] += 1
@@ -568,7 +507,7 @@ class Stage2Processor:
             # Initialize with existing items in directory
             try:
                 self.used_names[dir_key] = {
-                    item.name.lower() for item in parent_dir.iterdir()
+                    name.lower() for name in self.index.listdir(parent_dir)
                 }
             except Exception:
                 self.used_names[dir_key] = set()
@@ -21,10 +21,14 @@ from pathlib import Path
 from typing import Optional, List, Dict
 from dataclasses import dataclass
 
-from .hash_cache import HashCache
+from .hash_cache import HashCache, DEFAULT_CACHE_SIZE_MB, HASH_TYPE_FULL
 from .duplicate_detector import DuplicateDetector, DuplicateGroup
 from .duplicate_resolver import DuplicateResolver
 from .progress_bar import ProgressBar, SimpleProgress
+from .scan_index import ScanIndex
+from .fsops import DirFdOps
+from .parallel_walker import DEFAULT_SCAN_THREADS
+from .hash_scheduler import ORDER_PHYSICAL
 
 
 @dataclass
@@ -57,7 +61,15 @@ class Stage3:
         min_file_size: int = 10 * 1024,
         dry_run: bool = True,
         verbose: bool = True,
-        verify_files: bool = False
+        verify_files: bool = False,
+        hash_workers: int = 1,
+        hash_executor: str = 'thread',
+        sample_hashing: bool = True,
+        hash_order: str = ORDER_PHYSICAL,
+        cache_size_mb: int = DEFAULT_CACHE_SIZE_MB,
+        cache_mmap_mb: Optional[int] = None,
+        scan_threads: int = DEFAULT_SCAN_THREADS,
+        scan_index: Optional[ScanIndex] = None
     ):
         """
         Initialize Stage 3 orchestrator.
@@ -71,6 +83,14 @@ class Stage3:
             dry_run: Dry-run mode (default True, no actual deletions)
             verbose: Print progress messages (default True)
             verify_files: Verify files exist before resolving (default False, uses cached metadata)
+            hash_workers: Number of concurrent hash workers (default 1)
+            hash_executor: Hash worker pool type, 'thread' or 'process' (default 'thread')
+            sample_hashing: Compare head/middle/tail samples before full hashes (default True)
+            hash_order: Read order within a device: 'physical', 'inode' or 'none'
+            cache_size_mb: SQLite page cache size for the hash cache (default 64)
+            cache_mmap_mb: SQLite mmap size in MB (None = scale to database size)
+            scan_threads: Directories listed concurrently when scanning without an index (default 1)
+            scan_index: Shared filesystem index (default: walk folders directly)
         """
         self.input_folder = input_folder.resolve()
         self.output_folder = output_folder.resolve() if output_folder else None
@@ -79,15 +99,34 @@ class Stage3:
         self.dry_run = dry_run
         self.verbose = verbose
         self.verify_files = verify_files
+        self.hash_workers = hash_workers
+        self.hash_executor = hash_executor
+        self.sample_hashing = sample_hashing
+        self.hash_order = hash_order
+        self.scan_threads = scan_threads
+        self.scan_index = scan_index
 
         # Initialize cache
         if cache_dir is None:
             cache_dir = Path.cwd() / '.file_organizer_cache'
-        self.cache = HashCache(cache_dir, verbose=self.verbose)
+        self.cache = HashCache(
+            cache_dir,
+            verbose=self.verbose,
+            cache_size_mb=cache_size_mb,
+            mmap_size_mb=cache_mmap_mb
+        )
+
+        # Scope the cache to the folders being compared (3B loads only these roots)
+        self.cache.register_root('input', self.input_folder)
+        if self.output_folder:
+            self.cache.register_root('output', self.output_folder)
 
         # Initialize resolver
         self.resolver = DuplicateResolver()
 
+        # Cached metadata of 3B group members (file_path -> CachedFile)
+        self._cross_folder_files = {}
+
         # Statistics
         self.stats = {
             'groups_found': 0,
@@ -143,7 +182,13 @@ class Stage3:
             skip_images=self.skip_images,
             min_file_size=self.min_file_size,
             progress_callback=self._progress_callback,
-            verbose=self.verbose
+            verbose=self.verbose,
+            hash_workers=self.hash_workers,
+            hash_executor=self.hash_executor,
+            sample_hashing=self.sample_hashing,
+            hash_order=self.hash_order,
+            scan_threads=self.scan_threads,
+            scan_index=self.scan_index
         )
 
         duplicate_groups = detector.detect_duplicates(self.input_folder, folder='input')
@@ -172,14 +217,16 @@ class Stage3:
             file_to_keep, files_to_delete = self.resolver.resolve_duplicates(group.files)
 
             if files_to_delete:
+                reclaimable = group.reclaimable_bytes(file_to_keep, files_to_delete)
                 resolution_plan.append({
                     'keep': file_to_keep,
                     'delete': files_to_delete,
                     'size': group.size,
+                    'reclaimable': reclaimable,
                     'hash': group.hash
                 })
                 total_to_delete += len(files_to_delete)
-                total_space += group.size * len(files_to_delete)
+                total_space += reclaimable
 
         self._print_result(f"Resolution complete: {total_to_delete} files to delete")
         self._print_result(f"Space to free: {self._format_bytes(total_space)}")
@@ -242,16 +289,13 @@ class Stage3:
         self._print(f"Mode: {'DRY-RUN (no deletions)' if self.dry_run else 'EXECUTE (will delete duplicates)'}")
         self._print(f"Settings: skip_images={self.skip_images}, min_size={self.min_file_size:,} bytes")
 
-        # Phase 1: Load input cache (instant - reuse from Stage 3A)
-        self._print_phase(1, 5, "Loading Input Cache (from Stage 3A)")
-        self._print("  Loading input file metadata from cache...")
+        # Phase 1: Check input cache (instant - reuse from Stage 3A)
+        self._print_phase(1, 5, "Checking Input Cache (from Stage 3A)")
         sys.stdout.flush()
 
-        input_files = self.cache.get_all_files('input')
-        # Cache for reuse in _find_cross_folder_duplicates() to avoid reloading
-        self._cached_input_files = input_files
+        input_count = self.cache.count_files('input')
 
-        if not input_files:
+        if not input_count:
             self._print("  WARNING: No input cache found. Run Stage 3A first for optimal performance.")
             self._print("  Scanning input folder...")
 
@@ -261,12 +305,18 @@ class Stage3:
                 skip_images=self.skip_images,
                 min_file_size=self.min_file_size,
                 progress_callback=self._progress_callback,
-                verbose=self.verbose
+                verbose=self.verbose,
+                hash_workers=self.hash_workers,
+                hash_executor=self.hash_executor,
+                sample_hashing=self.sample_hashing,
+                hash_order=self.hash_order,
+                scan_threads=self.scan_threads,
+                scan_index=self.scan_index
             )
             detector.detect_duplicates(self.input_folder, folder='input')
-            input_files = self.cache.get_all_files('input')
+            input_count = self.cache.count_files('input')
 
-        self._print_result(f"Loaded {len(input_files)} input files from cache")
+        self._print_result(f"Found {input_count:,} input files in cache")
 
         # Phase 2: Scan output folder
         self._print_phase(2, 5, "Scanning Output Folder")
@@ -276,7 +326,13 @@ class Stage3:
             skip_images=self.skip_images,
             min_file_size=self.min_file_size,
             progress_callback=self._progress_callback,
-            verbose=self.verbose
+            verbose=self.verbose,
+            hash_workers=self.hash_workers,
+            hash_executor=self.hash_executor,
+            sample_hashing=self.sample_hashing,
+            hash_order=self.hash_order,
+            scan_threads=self.scan_threads,
+            scan_index=self.scan_index
         )
 
         # Scan output folder (metadata-first optimization)
@@ -305,13 +361,8 @@ class Stage3:
         # Phase 4: Resolve duplicates (apply full three-tier policy)
         self._print_phase(4, 5, "Resolving Duplicates (applying three-tier policy)")
 
-        # Load output files from cache (needed for cache lookup)
-        output_files = self.cache.get_all_files('output')
-
-        # Build cache lookup dictionary for fast access (optimization)
-        file_cache_lookup = {}
-        for f in input_files + output_files:
-            file_cache_lookup[f.file_path] = f
+        # Cached metadata of every file in a group (collected while finding them)
+        file_cache_lookup = self._cross_folder_files
 
         resolution_plan = []
         total_to_delete = 0
@@ -330,14 +381,16 @@ class Stage3:
                 )
 
             if files_to_delete:
+                reclaimable = group.reclaimable_bytes(file_to_keep, files_to_delete)
                 resolution_plan.append({
                     'keep': file_to_keep,
                     'delete': files_to_delete,
                     'size': group.size,
+                    'reclaimable': reclaimable,
                     'hash': group.hash
                 })
                 total_to_delete += len(files_to_delete)
-                total_space += group.size * len(files_to_delete)
+                total_space += reclaimable
 
         self._print_result(f"Resolution complete: {total_to_delete} files to delete")
         self._print_result(f"Space to free: {self._format_bytes(total_space)}")
@@ -376,102 +429,60 @@ class Stage3:
         """
         Find duplicate files that exist in BOTH input and output folders.
 
-        Process:
-        1. Get all cached files from both folders
-        2. Group by size to find potential matches across folders
-        3. For size collisions, ensure all files are hashed
-        4. Group by hash to find actual duplicates
+        Candidates are selected in SQLite, so only files that can possibly
+        match are loaded (never every cached row of both folders):
+        1. Stream files whose size occurs in both folders
+        2. Hash the ones in those size groups that lack a full hash
+        3. Stream files whose full hash occurs in both folders
+
+        The CachedFile of every file in a returned group is kept in
+        self._cross_folder_files for resolution.
 
         Returns:
             List of DuplicateGroup objects containing files from both folders
         """
-        from collections import defaultdict
-
-        # Get all cached files from both folders
-        # NOTE: For Stage 3B, we need ALL files from both folders to find cross-folder duplicates
-        # This is different from Stage 3A where we only need scanned files
-        # However, if we've already loaded input_files in Phase 1, we can reuse it
-        self._print("  Loading cached file metadata...")
-        
-        # Reuse input_files if already loaded (from Phase 1)
-        if not hasattr(self, '_cached_input_files'):
-            input_files = self.cache.get_all_files('input')
-            self._cached_input_files = input_files  # Cache for reuse
-        else:
-            input_files = self._cached_input_files
-        
-        output_files = self.cache.get_all_files('output')
-        self._print(f"  ✓ Loaded {len(input_files):,} input files and {len(output_files):,} output files from cache")
-
-        # Phase 1: Group by size to find cross-folder size collisions
-        self._print("  Phase 1/4: Building size index for cross-folder comparison")
-
-        size_groups = defaultdict(lambda: {'input': [], 'output': []})
-        total_files = len(input_files) + len(output_files)
+        self._cross_folder_files = {}
 
-        progress = ProgressBar(
-            total=total_files,
-            description="Building size index",
-            verbose=self.verbose,
-            min_duration=1.0
-        )
-
-        # Process input files
-        for i, file_info in enumerate(input_files, 1):
-            size_groups[file_info.file_size]['input'].append(file_info)
-            stats = {"Input": i, "Output": 0}
-            progress.update(i, stats)
-
-        # Process output files
-        for i, file_info in enumerate(output_files, 1):
-            size_groups[file_info.file_size]['output'].append(file_info)
-            stats = {"Input": len(input_files), "Output": i}
-            progress.update(len(input_files) + i, stats)
-
-        final_stats = {"Input": len(input_files), "Output": len(output_files)}
-        progress.finish(final_stats)
-
-        # Phase 2: Identify cross-folder size collisions (need hashing)
-        self._print("\n  Phase 2/4: Identifying files that need hashing")
+        # Phase 1: Size groups present in both folders, those needing hashes kept
+        self._print("  Phase 1/3: Finding sizes present in both folders")
 
         files_to_hash = []
+        groups_to_hash = []
         collision_count = 0
 
         # Use SimpleProgress since we don't know total in advance
         simple_progress = SimpleProgress("Analyzing size groups", verbose=self.verbose)
 
-        for i, (size, folders) in enumerate(size_groups.items(), 1):
-            if folders['input'] and folders['output']:
-                collision_count += 1
-                # This size exists in both folders - need to hash all files of this size
-                for file_info in folders['input']:
-                    if not file_info.file_hash:
-                        files_to_hash.append((file_info, 'input'))
+        for file_size, files in self.cache.iter_cross_folder_size_groups('input', 'output'):
+            collision_count += 1
+            # This size exists in both folders - need a full hash for every file of this size
+            members = [(file_info, file_info.folder) for file_info in files]
+            missing = [(file_info, folder) for file_info, folder in members if not file_info.full_hash]
 
-                for file_info in folders['output']:
-                    if not file_info.file_hash:
-                        files_to_hash.append((file_info, 'output'))
+            if missing:
+                files_to_hash.extend(missing)
+                groups_to_hash.append(members)
 
             # Update every 1000 groups
-            if i % 1000 == 0:
-                simple_progress.update(i)
+            if collision_count % 1000 == 0:
+                simple_progress.update(collision_count)
 
-        simple_progress.count = len(size_groups)
+        simple_progress.count = collision_count
         simple_progress.finish()
 
         if files_to_hash:
             self._print(f"  ✓ Found {collision_count:,} size collisions, {len(files_to_hash):,} files need hashing")
         else:
-            self._print(f"  ✓ All {len(size_groups):,} size groups analyzed - files already hashed")
+            self._print(f"  ✓ Found {collision_count:,} size collisions - files already hashed")
 
-        # Hash files that need hashing
+        # Phase 2: Hash files that need hashing
         if files_to_hash:
-            self._print(f"\n  Phase 2.5/4: Computing file hashes for size collisions")
+            self._print(f"\n  Phase 2/3: Computing file hashes for size collisions")
 
             from .duplicate_detector import FileMetadata
 
             hash_progress = ProgressBar(
-                total=len(files_to_hash),
+                total=sum(len(members) for members in groups_to_hash),
                 description="Computing hashes",
                 verbose=self.verbose,
                 min_duration=1.0
@@ -485,134 +496,134 @@ class Stage3:
                 cache=self.cache,
                 skip_images=self.skip_images,
                 min_file_size=self.min_file_size,
-                verbose=False  # Disable verbose to avoid spam during loop
+                verbose=False,  # Disable verbose to avoid spam during loop
+                hash_workers=self.hash_workers,
+                hash_executor=self.hash_executor,
+                sample_hashing=self.sample_hashing,
+                hash_order=self.hash_order,
+                scan_threads=self.scan_threads,
+                scan_index=self.scan_index
             )
 
             hashed_count = 0
             skipped_count = 0
-
-            for idx, (file_info, folder) in enumerate(files_to_hash, 1):
-                # Create FileMetadata object for hashing
-                file_path = Path(file_info.file_path)
-                if not file_path.exists():
+            idx = 0
+
+            # Build FileMetadata groups; files without a full hash must still exist.
+            # Hard links are hashed once per inode and share the result.
+            size_collision_groups = []
+            cached_by_key = {}
+            links = []  # (file_info, folder, representative path)
+            missing_paths = []
+            for members in groups_to_hash:
+                group = []
+                by_inode = {}
+                for file_info, folder in members:
+                    file_path = Path(file_info.file_path)
+                    if not file_info.full_hash and not self._exists(file_path):
+                        missing_paths.append(file_info.file_path)
+                        idx += 1
+                        skipped_count += 1
+                        hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
+                        continue
+
+                    file_meta = FileMetadata(
+                        path=str(file_path.absolute()),  # Convert to absolute string path
+                        size=file_info.file_size,
+                        mtime=file_info.file_mtime,
+                        dev=file_info.file_dev or 0,
+                        ino=file_info.file_ino or 0,
+                        mtime_ns=file_info.file_mtime_ns or 0,
+                        ctime_ns=file_info.file_ctime_ns or 0
+                    )
+                    key = file_meta.inode_key
+                    if key is not None and key in by_inode:
+                        links.append((file_info, folder, by_inode[key]))
+                        continue
+                    if key is not None:
+                        by_inode[key] = file_meta.path
+
+                    group.append((file_meta, folder))
+                    cached_by_key[(file_meta.path, folder)] = file_info
+                size_collision_groups.append(group)
+
+            # Sample first, full hash only on sample collisions; results are cached from this thread
+            full_hashes = {}
+            for file_meta, folder, file_hash in detector.hash_size_groups(size_collision_groups, cached_by_key):
+                idx += 1
+                if file_hash:
+                    hashed_count += 1
+                    full_hashes[file_meta.path] = file_hash
+                else:
                     skipped_count += 1
-                    hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
-                    continue
-
-                file_meta = FileMetadata(
-                    path=str(file_path.absolute()),  # Convert to absolute string path
-                    size=file_info.file_size,
-                    mtime=file_info.file_mtime
-                )
 
-                # Hash and cache the file
-                detector.hash_file_with_cache(file_meta, folder)
-                hashed_count += 1
+                hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
 
+            link_entries = []
+            for file_info, folder, rep_path in links:
+                idx += 1
+                file_hash = full_hashes.get(rep_path)
+                if file_hash and file_info.full_hash != file_hash:
+                    link_entries.append({
+                        'file_path': file_info.file_path,
+                        'folder': folder,
+                        'file_size': file_info.file_size,
+                        'file_mtime': file_info.file_mtime,
+                        'file_mtime_ns': file_info.file_mtime_ns,
+                        'file_ctime_ns': file_info.file_ctime_ns,
+                        'file_hash': file_hash,
+                        'hash_type': HASH_TYPE_FULL,
+                        'file_dev': file_info.file_dev,
+                        'file_ino': file_info.file_ino
+                    })
+                if file_hash:
+                    hashed_count += 1
+                else:
+                    skipped_count += 1
                 hash_progress.update(idx, {"Hashed": hashed_count, "Skipped": skipped_count})
+            self.cache.save_batch(link_entries)
+            # Files that vanished since they were cached
+            self._forget_files(missing_paths)
 
             hash_progress.finish({"Hashed": hashed_count, "Skipped": skipped_count})
 
-            # Reload cached files to get updated hashes
-            # Only reload files that were hashed, not all files (optimization)
-            self._print("\n  Reloading cache with updated hashes...")
-            
-            # Get paths of files that were hashed, separated by folder
-            hashed_input_paths = [f[0].file_path for f in files_to_hash if f[1] == 'input']
-            hashed_output_paths = [f[0].file_path for f in files_to_hash if f[1] == 'output']
-            
-            # Batch query only the files that were updated
-            updated_input = self.cache.get_files_by_paths(hashed_input_paths, 'input') if hashed_input_paths else {}
-            updated_output = self.cache.get_files_by_paths(hashed_output_paths, 'output') if hashed_output_paths else {}
-            
-            # Update in-memory lists with new hashes
-            input_dict = {f.file_path: f for f in input_files}
-            output_dict = {f.file_path: f for f in output_files}
-            
-            input_dict.update(updated_input)
-            output_dict.update(updated_output)
-            
-            input_files = list(input_dict.values())
-            output_files = list(output_dict.values())
-            
-            # Update cached input files for reuse
-            self._cached_input_files = input_files
-            
-            self._print(f"  ✓ Cache reloaded ({len(input_files):,} input, {len(output_files):,} output)")
-
-        # Phase 3: Group by hash to find duplicates
-        self._print("\n  Phase 3/4: Building hash index from cached data")
-
-        hash_groups = defaultdict(list)
-        all_files = input_files + output_files
-
-        progress = ProgressBar(
-            total=len(all_files),
-            description="Building hash index",
-            verbose=self.verbose,
-            min_duration=1.0
-        )
-
-        hashed_count = 0
-        for i, file_info in enumerate(all_files, 1):
-            file_hash = file_info.file_hash
-            if file_hash:
-                hash_groups[file_hash].append(file_info)
-                hashed_count += 1
-
-            stats = {"Hashed": hashed_count}
-            progress.update(i, stats)
-
-        final_stats = {"Hashed": hashed_count}
-        progress.finish(final_stats)
-
-        # Phase 4: Find groups that have files from BOTH folders
-        self._print("\n  Phase 4/4: Finding cross-folder duplicates")
+        # Phase 3: Hash groups with files from BOTH folders (hard links skipped)
+        self._print("\n  Phase 3/3: Finding cross-folder duplicates")
 
         cross_folder_groups = []
-
-        # Create progress bar for analyzing hash groups
-        if len(hash_groups) > 0:
-            analyze_progress = ProgressBar(
-                total=len(hash_groups),
-                description="Analyzing duplicates",
-                verbose=self.verbose,
-                min_duration=1.0
-            )
-
-        processed_count = 0
-        cross_folder_count = 0
-
-        for i, (file_hash, files) in enumerate(hash_groups.items(), 1):
-            # Check if this hash has files from both input and output
-            folders = {f.folder for f in files}
-
-            if 'input' in folders and 'output' in folders:
-                # This is a cross-folder duplicate
-                file_paths = [f.file_path for f in files]
-                file_size = files[0].file_size  # All duplicates have same size
-
+        hash_count = 0
+        hardlink_count = 0
+        analyze_progress = SimpleProgress("Analyzing duplicates", verbose=self.verbose)
+
+        for file_hash, files in self.cache.iter_cross_folder_hash_groups('input', 'output'):
+            hash_count += 1
+            inodes = {f.file_path: f.inode_key for f in files if f.inode_key is not None}
+            distinct = len(set(inodes.values())) + (len(files) - len(inodes))
+
+            if distinct < 2:
+                # Hard links to one inode: nothing to free, reported only
+                hardlink_count += 1
+            else:
                 group = DuplicateGroup(
                     hash=file_hash,
-                    size=file_size,
-                    files=file_paths
+                    size=files[0].file_size,  # All duplicates have same size
+                    files=[f.file_path for f in files],
+                    inodes=inodes or None
                 )
                 cross_folder_groups.append(group)
-                cross_folder_count += 1
-
-            processed_count += 1
+                for f in files:
+                    self._cross_folder_files[f.file_path] = f
 
-            # Update progress bar
-            if len(hash_groups) > 0:
-                stats = {"Cross-folder": cross_folder_count, "Single-folder": processed_count - cross_folder_count}
-                analyze_progress.update(i, stats)
+            # Update every 1000 groups
+            if hash_count % 1000 == 0:
+                analyze_progress.update(hash_count)
 
-        # Finish progress bar
-        if len(hash_groups) > 0:
-            final_stats = {"Cross-folder": cross_folder_count, "Single-folder": processed_count - cross_folder_count}
-            analyze_progress.finish(final_stats)
+        analyze_progress.count = hash_count
+        analyze_progress.finish()
 
-        self._print(f"  ✓ Found {len(cross_folder_groups):,} cross-folder duplicate groups from {len(hash_groups):,} unique hashes")
+        self._print(f"  ✓ Found {len(cross_folder_groups):,} cross-folder duplicate groups from {hash_count:,} shared hashes")
+        if hardlink_count:
+            self._print(f"  ✓ Skipped {hardlink_count:,} cross-folder hard link groups (same file on disk)")
 
         return cross_folder_groups
 
@@ -626,7 +637,7 @@ class Stage3:
             self._print(f"    KEEP:   {plan['keep']}")
             for file_path in plan['delete']:
                 self._print(f"    DELETE: {file_path}")
-            self._print(f"    Space saved: {self._format_bytes(plan['size'] * len(plan['delete']))}")
+            self._print(f"    Space saved: {self._format_bytes(plan['reclaimable'])}")
             self._print("")
 
         self._print(f"  Total files that would be deleted: {self.stats['files_to_delete']}")
@@ -639,40 +650,50 @@ class Stage3:
 
         deleted_count = 0
         deleted_space = 0
+        deleted_paths = []
         errors = []
 
-        for i, plan in enumerate(resolution_plan, 1):
-            self._print_progress(f"Processing group {i}/{len(resolution_plan)}...")
+        # Parent directories are opened once; deletions are relative to them
+        with DirFdOps() as fs:
+            for i, plan in enumerate(resolution_plan, 1):
+                self._print_progress(f"Processing group {i}/{len(resolution_plan)}...")
 
-            self._print(f"  Group {i}:")
-            self._print(f"    KEEP:   {plan['keep']}")
+                self._print(f"  Group {i}:")
+                self._print(f"    KEEP:   {plan['keep']}")
 
-            for file_path in plan['delete']:
-                try:
-                    # Get file size before deletion
-                    file_size = Path(file_path).stat().st_size
+                for file_path in plan['delete']:
+                    try:
+                        # Get file size before deletion
+                        file_stat = fs.stat(file_path)
 
-                    # Delete file
-                    os.remove(file_path)
+                        # Delete file
+                        fs.unlink(file_path)
+                        if self.scan_index is not None:
+                            self.scan_index.remove(file_path)
 
-                    deleted_count += 1
-                    deleted_space += file_size
+                        deleted_count += 1
+                        deleted_paths.append(file_path)
+                        # Space is only freed when the last hard link goes
+                        if file_stat.st_nlink <= 1:
+                            deleted_space += file_stat.st_size
 
-                    self._print(f"    DELETED: {file_path}")
+                        self._print(f"    DELETED: {file_path}")
 
-                except FileNotFoundError:
-                    self._print(f"    SKIPPED (not found): {file_path}")
-                    errors.append(f"File not found: {file_path}")
+                    except FileNotFoundError:
+                        self._print(f"    SKIPPED (not found): {file_path}")
+                        errors.append(f"File not found: {file_path}")
 
-                except PermissionError:
-                    self._print(f"    ERROR (permission denied): {file_path}")
-                    errors.append(f"Permission denied: {file_path}")
+                    except PermissionError:
+                        self._print(f"    ERROR (permission denied): {file_path}")
+                        errors.append(f"Permission denied: {file_path}")
 
-                except Exception as e:
-                    self._print(f"    ERROR: {file_path} - {str(e)}")
-                    errors.append(f"{file_path}: {str(e)}")
+                    except Exception as e:
+                        self._print(f"    ERROR: {file_path} - {str(e)}")
+                        errors.append(f"{file_path}: {str(e)}")
 
-            self._print("")
+                self._print("")
+
+        self._forget_files(deleted_paths)
 
         self.stats['files_deleted'] = deleted_count
         self.stats['space_freed'] = deleted_space
@@ -685,6 +706,31 @@ class Stage3:
             for error in errors:
                 self._print(f"    - {error}")
 
+    def _folder_of(self, file_path: str) -> str:
+        """Cache folder label of a path ('output' if under the output folder)."""
+        if self.output_folder:
+            try:
+                Path(file_path).relative_to(self.output_folder)
+                return 'output'
+            except ValueError:
+                pass
+        return 'input'
+
+    def _forget_files(self, file_paths: List[str]):
+        """Drop cache entries of files that were deleted or found missing."""
+        by_folder = {}
+        for file_path in file_paths:
+            by_folder.setdefault(self._folder_of(file_path), []).append(file_path)
+
+        for folder, paths in by_folder.items():
+            self.cache.remove_from_cache(paths, folder)
+
+    def _exists(self, file_path: Path) -> bool:
+        """Check existence via the scan index when available (no syscall)."""
+        if self.scan_index is not None:
+            return self.scan_index.exists(file_path)
+        return file_path.exists()
+
     def _progress_callback(self, phase: str, current: int, total: int, message: str):
         """Callback for progress updates from detector."""
         if phase == 'scan':
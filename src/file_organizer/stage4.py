@@ -6,7 +6,7 @@ Moves organized and deduplicated files from input folder to output folder.
 Process:
 1. Validation (folders, disk space, permissions)
 2. Directory structure creation (mirror input in output)
-3. File relocation (move files preserving paths)
+3. File relocation (move files preserving paths, hash cache follows the moves)
 4. Verification (ensure all files exist in output)
 5. Cleanup (remove input contents, keep empty root)
 
@@ -17,6 +17,7 @@ Supports:
 - Execute mode (actually move files)
 - Preserve input option (keep input folder with files)
 - Partial failure recovery (continue on errors)
+- Hash cache path rewrite (moved files keep their cached hashes)
 """
 
 import os
@@ -28,7 +29,9 @@ from pathlib import Path
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
+from .hash_cache import HashCache
 from .progress_bar import ProgressBar, SimpleProgress
+from .scan_index import ScanIndex
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +74,9 @@ class Stage4Processor:
         output_folder: Path,
         preserve_input: bool = False,
         dry_run: bool = True,
-        verbose: bool = True
+        verbose: bool = True,
+        scan_index: Optional[ScanIndex] = None,
+        cache_dir: Optional[Path] = None
     ):
         """
         Initialize Stage 4 processor.
@@ -82,16 +87,24 @@ class Stage4Processor:
             preserve_input: Keep input folder with files (default: False, clean input)
             dry_run: Dry-run mode (default: True, no actual moves)
             verbose: Print progress messages (default: True)
+            scan_index: Shared filesystem index (default: private index for this run)
+            cache_dir: Hash cache directory to update with the new paths
+                       (default: None, cache not updated)
         """
         self.input_folder = input_folder.resolve()
         self.output_folder = output_folder.resolve()
         self.preserve_input = preserve_input
         self.dry_run = dry_run
         self.verbose = verbose
+        self.index = scan_index if scan_index is not None else ScanIndex()
+        self.cache_dir = cache_dir
 
         # Track moved files
         self.moved_files: List[MovedFile] = []
         self.failed_files: List[Tuple[Path, str]] = []
+        # (source, destination, st_dev, st_ino) of files actually moved
+        self.relocated_paths: List[Tuple[str, str, Optional[int], Optional[int]]] = []
+        self.cache_entries_updated = 0
         self.top_level_file_count = 0
         self.dirs_created = 0
         self.security_violations = 0  # Track path traversal attempts
@@ -128,6 +141,7 @@ class Stage4Processor:
             # Phase 3: Move files
             self._print_phase(3, 5, "Moving Files")
             self._relocate_files()
+            self._update_cache_paths()
 
             # Phase 4: Verification
             self._print_phase(4, 5, "Verification")
@@ -218,19 +232,13 @@ class Stage4Processor:
 
         progress = SimpleProgress("Calculating size", verbose=self.verbose)
 
-        for dirpath, dirnames, filenames in os.walk(folder):
-            for filename in filenames:
-                filepath = Path(dirpath) / filename
-                try:
-                    total_size += filepath.stat().st_size
-                    file_count += 1
+        for filepath, entry in self.index.iter_files(folder):
+            total_size += entry.size
+            file_count += 1
 
-                    # Update every 100 files
-                    if file_count % 100 == 0:
-                        progress.update(file_count)
-                except (OSError, FileNotFoundError):
-                    # Skip files we can't access
-                    continue
+            # Update every 100 files
+            if file_count % 100 == 0:
+                progress.update(file_count)
 
         progress.count = file_count
         progress.finish()
@@ -264,7 +272,7 @@ class Stage4Processor:
     def _create_output_structure(self) -> None:
         """Create output directory tree mirroring input structure."""
         # Walk input folder and create corresponding directories in output
-        for dirpath, dirnames, filenames in os.walk(self.input_folder):
+        for dirpath, dirnames, filenames in self.index.walk(self.input_folder):
             # Calculate relative path
             rel_path = Path(dirpath).relative_to(self.input_folder)
 
@@ -278,31 +286,35 @@ class Stage4Processor:
             if not self.dry_run:
                 output_dir.mkdir(parents=True, exist_ok=True)
                 os.chmod(output_dir, 0o755)
+                self.index.add(output_dir)
 
             self.dirs_created += 1
 
         # Always ensure misc/ folder exists if we have top-level files
-        has_top_level_files = any(item.is_file() for item in self.input_folder.iterdir())
+        has_top_level_files = any(entry.is_file for _, entry in self.index.children(self.input_folder))
         if has_top_level_files:
             misc_dir = self.output_folder / "misc"
             if not self.dry_run:
                 misc_dir.mkdir(parents=True, exist_ok=True)
                 os.chmod(misc_dir, 0o755)
+                self.index.add(misc_dir)
             self.dirs_created += 1
 
     def _relocate_files(self) -> None:
         """Move all files from input to output preserving structure."""
         # Identify top-level files (need to go to misc/)
         top_level_files = set()
-        for item in self.input_folder.iterdir():
-            if item.is_file():
-                top_level_files.add(item)
+        for name, entry in self.index.children(self.input_folder):
+            if entry.is_file:
+                top_level_files.add(self.input_folder / name)
 
-        # Walk all files in input folder
+        # Walk all files in input folder (sizes come from the scan index)
         file_list = []
-        for dirpath, dirnames, filenames in os.walk(self.input_folder):
-            for filename in filenames:
-                file_list.append(Path(dirpath) / filename)
+        file_sizes = {}
+        for file_path, entry in self.index.iter_files(self.input_folder):
+            file_path = Path(file_path)
+            file_list.append(file_path)
+            file_sizes[file_path] = entry.size
 
         total_files = len(file_list)
 
@@ -341,10 +353,11 @@ class Stage4Processor:
 
             # Move file (or simulate in dry-run)
             try:
-                file_size = file_path.stat().st_size
+                file_size = file_sizes[file_path]
 
-                if not self.dry_run:
-                    self._move_file(file_path, dest_path)
+                if not self.dry_run and self._move_file(file_path, dest_path):
+                    dev, ino = self._file_identity(dest_path)
+                    self.relocated_paths.append((str(file_path), str(dest_path), dev, ino))
 
                 self.moved_files.append(MovedFile(
                     source=file_path,
@@ -374,7 +387,7 @@ class Stage4Processor:
         }
         progress.finish(final_stats)
 
-    def _move_file(self, source: Path, dest: Path) -> None:
+    def _move_file(self, source: Path, dest: Path) -> bool:
         """
         Move a single file from source to destination.
 
@@ -386,19 +399,23 @@ class Stage4Processor:
             source: Source file path
             dest: Destination file path
 
+        Returns:
+            True if the file was moved, False if the destination already existed
+
         Raises:
             Exception: If move fails
         """
         # Handle collision (shouldn't happen after Stage 3B)
         if dest.exists():
             logger.warning(f"Destination exists, skipping: {dest}")
-            return
+            return False
 
         # Ensure parent directory exists
         dest.parent.mkdir(parents=True, exist_ok=True)
 
         # Move file
         shutil.move(str(source), str(dest))
+        self.index.rename(source, dest)
 
         # Preserve timestamps
         try:
@@ -407,6 +424,55 @@ class Stage4Processor:
             # Not critical if timestamps can't be preserved
             logger.debug(f"Could not preserve timestamps for {dest}: {e}")
 
+        return True
+
+    def _file_identity(self, path: Path) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Return (st_dev, st_ino) of a moved file.
+
+        A move across filesystems copies the file, so the destination has
+        a new device and inode; the hash cache must store those or the
+        entry no longer matches. The index entry (re-stat'ed by rename)
+        is used when available.
+        """
+        entry = self.index.get(path)
+        if entry is not None and entry.ino:
+            return entry.dev, entry.ino
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return None, None
+        return st.st_dev, st.st_ino
+
+    def _update_cache_paths(self) -> None:
+        """
+        Point hash cache entries of moved files at their new paths.
+
+        Without this the next Stage 3B run sees every relocated file as a
+        new output file and hashes it again. All moves are applied in one
+        transaction; the cache is never created here.
+        """
+        if self.dry_run or not self.relocated_paths or self.cache_dir is None:
+            return
+
+        if not (self.cache_dir / 'hashes.db').exists():
+            return
+
+        try:
+            with HashCache(self.cache_dir) as cache:
+                cache.register_root('input', self.input_folder)
+                cache.register_root('output', self.output_folder)
+                self.cache_entries_updated = cache.update_cache_paths(
+                    self.relocated_paths, 'input', 'output'
+                )
+        except Exception as e:
+            # Files are already moved; a stale cache only costs re-hashing
+            logger.warning(f"Could not update hash cache paths: {e}")
+            self._print(f"  ⚠️  Could not update hash cache: {e}")
+            return
+
+        self._print(f"  ✓ Updated {self.cache_entries_updated:,} hash cache entries")
+
     def _validate_destination_path(self, dest_path: Path) -> bool:
         """
         Validate that destination path is within output folder.
@@ -457,7 +523,7 @@ class Stage4Processor:
         """Remove files and subdirs from input, keep empty root folder."""
         try:
             # Count items to remove
-            items = list(self.input_folder.iterdir())
+            items = [self.input_folder / name for name in self.index.listdir(self.input_folder)]
             total_items = len(items)
 
             if total_items == 0:
@@ -478,10 +544,12 @@ class Stage4Processor:
             for i, item in enumerate(items, 1):
                 if item.is_dir():
                     shutil.rmtree(item)
+                    self.index.remove(item)
                     dirs_removed += 1
                     logger.debug(f"Removed directory: {item}")
                 elif item.is_file():
                     item.unlink()
+                    self.index.remove(item)
                     files_removed += 1
                     logger.debug(f"Removed file: {item}")
 
@@ -0,0 +1,544 @@
+"""
+Tests for duplicate detection hashing.
+
+Tests:
+1. Parallel hashing engine (bounded worker pool, single cache writer)
+2. Progressive hashing (sample hash tier before full hash)
+3. Single-stat scandir scanner
+4. Hard links (hashed once per inode, reported apart from duplicates)
+5. Device- and layout-aware hash scheduling
+6. Pruning cache entries of files that disappeared between scans
+7. Exact cache validation on nanosecond stat times
+8. Move-aware cache reuse (moved files matched to cached hashes by inode)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.file_organizer.config import Config
+from src.file_organizer.hash_cache import HashCache
+from src.file_organizer.hash_engine import HashEngine, hash_file, hash_file_sample
+from src.file_organizer.hash_scheduler import HashScheduler
+from src.file_organizer.duplicate_detector import DuplicateDetector, FileMetadata, IMAGE_EXTENSIONS
+from src.file_organizer.scanner import FileScanner
+from src.file_organizer.stage3 import Stage3
+
+
+def _write_test_tree(root: Path):
+    """Create 3 duplicate pairs plus same-size unique files (all > 10KB)."""
+    for i in range(3):
+        content = f'duplicate content {i}'.encode() * 1000
+        (root / f'dup{i}_a.bin').write_bytes(content)
+        (root / f'dup{i}_b.bin').write_bytes(content)
+
+    # Same size as each other, different content (size collision, no duplicate)
+    (root / 'unique_x.bin').write_bytes(b'X' * 20000)
+    (root / 'unique_y.bin').write_bytes(b'Y' * 20000)
+
+
+class TestHashEngine:
+    """Test the parallel hashing engine."""
+
+    def test_parallel_matches_sequential(self):
+        """Test that pooled hashing returns the same digests as inline hashing."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_test_tree(root)
+            jobs = [
+                FileMetadata(path=str(p), size=p.stat().st_size, mtime=p.stat().st_mtime)
+                for p in sorted(root.iterdir())
+            ]
+
+            sequential = {job.path: digest for job, digest in HashEngine(workers=1).hash_files(jobs)}
+            parallel = {job.path: digest for job, digest in HashEngine(workers=4).hash_files(jobs)}
+
+            assert parallel == sequential
+            assert len(parallel) == len(jobs)
+            assert all(parallel.values())
+
+    def test_unreadable_file_returns_empty_digest(self):
+        """Test that read errors surface as an empty digest, not an exception."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            missing = FileMetadata(path=str(Path(tmpdir) / 'missing.bin'), size=0, mtime=0.0)
+
+            results = list(HashEngine(workers=2).hash_files([missing]))
+
+            assert results == [(missing, "")]
+            assert hash_file(missing.path) == ""
+
+    def test_invalid_executor_rejected(self):
+        """Test that unknown executor types raise ValueError."""
+        with pytest.raises(ValueError):
+            HashEngine(workers=2, executor='fiber')
+
+
+class TestParallelDetection:
+    """Test DuplicateDetector with a worker pool."""
+
+    def test_detect_duplicates_with_workers(self):
+        """Test that parallel hashing finds the same groups and caches every hash."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            test_dir = Path(tmpdir) / 'test_data'
+            test_dir.mkdir()
+            _write_test_tree(test_dir)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = DuplicateDetector(
+                    cache=cache,
+                    skip_images=False,
+                    min_file_size=1024,
+                    verbose=False,
+                    hash_workers=4
+                )
+                groups = detector.detect_duplicates(test_dir, folder='input')
+
+                assert len(groups) == 3
+                assert all(len(group.files) == 2 for group in groups)
+                assert detector.stats['files_hashed'] == 8
+
+                # Every hashed file was written back through the single writer
+                cached = cache.get_all_files('input')
+                assert len(cached) == 8
+                assert all(entry.file_hash for entry in cached)
+
+                # Second run is served entirely from cache
+                rerun = DuplicateDetector(
+                    cache=cache,
+                    skip_images=False,
+                    min_file_size=1024,
+                    verbose=False,
+                    hash_workers=4
+                )
+                assert len(rerun.detect_duplicates(test_dir, folder='input')) == 3
+                assert rerun.stats['files_hashed'] == 0
+                assert rerun.stats['cache_hits'] == 8
+
+    def test_hash_workers_config_validation(self):
+        """Test hash_workers config defaults, overrides and clamping."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config = Config(Path(tmpdir) / 'missing.yaml')
+
+            assert config.get_hash_workers() == 4
+            assert config.get_hash_workers(cli_override=8) == 8
+            assert config.get_hash_workers(cli_override=0) == 1
+            assert config.get_hash_workers(cli_override=500) == 64
+            assert config.get_hash_executor() == 'thread'
+
+
+def _write_sampled_tree(root: Path, size: int = 64 * 1024):
+    """Create same-size files: one duplicate pair, one differing only mid-file, two unique."""
+    base = bytes(range(256)) * (size // 256)
+    (root / 'video_a.mkv').write_bytes(base)
+    (root / 'video_b.mkv').write_bytes(base)
+
+    # Same head/middle/tail as the pair, differs outside the sampled ranges
+    near = bytearray(base)
+    near[size // 4] ^= 0xFF
+    (root / 'video_near.mkv').write_bytes(bytes(near))
+
+    (root / 'other_1.mkv').write_bytes(b'1' + base[1:])
+    (root / 'other_2.mkv').write_bytes(b'2' + base[1:])
+
+
+def _sampling_detector(cache: HashCache, **kwargs) -> DuplicateDetector:
+    """Detector that samples 1KB segments of any file >= 16KB."""
+    detector = DuplicateDetector(
+        cache=cache,
+        skip_images=False,
+        min_file_size=1024,
+        verbose=False,
+        sample_min_size=16 * 1024,
+        **kwargs
+    )
+    detector.engine.sample_segment_size = 1024
+    return detector
+
+
+class TestProgressiveHashing:
+    """Test the sample hash tier in front of full hashing."""
+
+    def test_sample_hash_reads_head_middle_tail(self):
+        """Test that sample hashes ignore bytes outside the sampled segments."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_sampled_tree(root)
+            size = (root / 'video_a.mkv').stat().st_size
+
+            sample_a = hash_file_sample(str(root / 'video_a.mkv'), size, 1024)
+            assert sample_a == hash_file_sample(str(root / 'video_near.mkv'), size, 1024)
+            assert sample_a != hash_file_sample(str(root / 'other_1.mkv'), size, 1024)
+            assert hash_file(str(root / 'video_a.mkv')) != hash_file(str(root / 'video_near.mkv'))
+            assert hash_file_sample(str(root / 'missing.mkv'), size, 1024) == ""
+
+    def test_only_sample_collisions_get_full_hash(self):
+        """Test that files with unique samples are never hashed in full."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            test_dir = Path(tmpdir) / 'test_data'
+            test_dir.mkdir()
+            _write_sampled_tree(test_dir)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = _sampling_detector(cache, hash_workers=2)
+                groups = detector.detect_duplicates(test_dir, folder='input')
+
+                assert len(groups) == 1
+                assert sorted(Path(p).name for p in groups[0].files) == ['video_a.mkv', 'video_b.mkv']
+                assert detector.stats['samples_hashed'] == 5
+                assert detector.stats['sample_unique'] == 2
+                assert detector.stats['files_hashed'] == 3
+
+                # Both tiers are cached with their hash_type
+                cached = {Path(e.file_path).name: e for e in cache.get_all_files('input')}
+                assert cached['other_1.mkv'].hash_type == 'sampled'
+                assert cached['other_1.mkv'].sample_size == 3 * 1024
+                assert cached['other_1.mkv'].full_hash is None
+                assert cached['video_near.mkv'].hash_type == 'full'
+                assert cached['video_near.mkv'].full_hash == hash_file(str(test_dir / 'video_near.mkv'))
+
+                # Second run reuses both tiers; only fully-hashed files are
+                # re-sampled so the cached samples have something to compare to
+                rerun = _sampling_detector(cache)
+                assert len(rerun.detect_duplicates(test_dir, folder='input')) == 1
+                assert rerun.stats['files_hashed'] == 0
+                assert rerun.stats['samples_hashed'] == 3
+                assert rerun.stats['bytes_hashed'] == 3 * 3 * 1024
+
+    def test_sample_hashing_disabled(self):
+        """Test that disabling sampling hashes every colliding file in full."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            test_dir = Path(tmpdir) / 'test_data'
+            test_dir.mkdir()
+            _write_sampled_tree(test_dir)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = _sampling_detector(cache, sample_hashing=False)
+                assert len(detector.detect_duplicates(test_dir, folder='input')) == 1
+                assert detector.stats['samples_hashed'] == 0
+                assert detector.stats['files_hashed'] == 5
+
+    def test_sample_hashing_config(self):
+        """Test sample_hashing config default and parsing."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / 'config.yaml'
+            assert Config(config_path).get_sample_hashing() is True
+
+            config_path.write_text("duplicate_detection:\n  sample_hashing: off\n")
+            assert Config(config_path).get_sample_hashing() is False
+
+
+class TestFileScanner:
+    """Test the scandir-based scanner."""
+
+    def test_scan_matches_os_walk(self):
+        """Test that scanning finds the same files as os.walk + stat."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / 'sub' / 'deeper').mkdir(parents=True)
+            _write_test_tree(root / 'sub')
+            (root / 'sub' / 'deeper' / 'big.bin').write_bytes(b'D' * 50000)
+            (root / 'small.bin').write_bytes(b'S' * 100)
+            os.symlink(root / 'sub', root / 'dir_link')
+            os.symlink(root / 'missing', root / 'broken_link')
+
+            expected = []
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    if path.exists() and path.stat().st_size >= 10240:
+                        st = path.stat()
+                        expected.append((str(path), st.st_size, st.st_mtime))
+
+            scanner = FileScanner(min_size=10240)
+            records = list(scanner.scan(root))
+
+            assert sorted((r.path, r.size, r.mtime) for r in records) == sorted(expected)
+            assert scanner.stats['skipped_small'] == 1
+            assert scanner.stats['errors'] == 1  # broken symlink
+
+    def test_extension_filter_skips_stat(self):
+        """Test that filtered extensions are never stat'ed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            _write_test_tree(root)
+            (root / 'photo.JPG').write_bytes(b'P' * 20000)
+            (root / 'icon.png').write_bytes(b'I' * 20000)
+
+            scanner = FileScanner(skip_extensions=IMAGE_EXTENSIONS, min_size=10240)
+            records = list(scanner.scan(root))
+
+            assert len(records) == 8
+            assert scanner.stats['skipped_extension'] == 2
+            assert scanner.stats['files_seen'] == 10
+            assert scanner.stats['files_stated'] == 8
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = DuplicateDetector(cache=cache, verbose=False)
+                assert len(detector.scan_directory(root, 'input')) == 8
+                assert detector.stats['skipped_images'] == 2
+
+
+class TestHardLinks:
+    """Test inode-aware duplicate detection."""
+
+    def test_links_hashed_once_and_not_duplicates(self):
+        """Test that hard links are collapsed before hashing and reported separately."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            content = b'L' * 20000
+            (root / 'original.bin').write_bytes(content)
+            os.link(root / 'original.bin', root / 'link.bin')
+            (root / 'other.bin').write_bytes(b'O' * 20000)  # Same size, no duplicate
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = DuplicateDetector(cache=cache, verbose=False, sample_hashing=False)
+                groups = detector.detect_duplicates(root, 'input')
+
+                assert groups == []
+                assert detector.stats['files_hashed'] == 2
+                assert detector.stats['hardlink_groups'] == 1
+                assert detector.stats['bytes_saved'] == 0
+                assert sorted(detector.hardlink_groups[0].files) == [
+                    str(root / 'link.bin'), str(root / 'original.bin')
+                ]
+
+                # The link gets its inode's hash without being read
+                link = cache.get_from_cache(str(root / 'link.bin'), 'input')
+                original = cache.get_from_cache(str(root / 'original.bin'), 'input')
+                assert link.full_hash == original.full_hash
+                assert link.inode_key == original.inode_key
+
+    def test_bytes_saved_counts_distinct_inodes(self):
+        """Test that a copy plus two links of one file frees one file's worth."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            content = b'C' * 20000
+            (root / 'a.bin').write_bytes(content)
+            os.link(root / 'a.bin', root / 'a_link.bin')
+            (root / 'copy.bin').write_bytes(content)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                detector = DuplicateDetector(cache=cache, verbose=False)
+                groups = detector.detect_duplicates(root, 'input')
+
+                assert len(groups) == 1
+                group = groups[0]
+                assert len(group.files) == 3
+                assert detector.stats['files_hashed'] == 2
+                assert detector.stats['bytes_saved'] == 20000
+                # The link is not a duplicate of its own inode
+                assert detector.stats['duplicates_found'] == 1
+                assert detector.stats['hardlinks'] == 1
+
+                # Keeping the copy frees the linked inode once; keeping a link frees the copy
+                assert group.reclaimable_bytes(
+                    str(root / 'copy.bin'), [str(root / 'a.bin'), str(root / 'a_link.bin')]
+                ) == 20000
+                assert group.reclaimable_bytes(
+                    str(root / 'a.bin'), [str(root / 'a_link.bin'), str(root / 'copy.bin')]
+                ) == 20000
+
+    def test_dry_run_report_counts_distinct_inodes(self, capsys):
+        """Test that the per-group dry-run saving matches the distinct-inode total."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            content = b'C' * 20000
+            (root / 'a.bin').write_bytes(content)
+            os.link(root / 'a.bin', root / 'a_link.bin')
+            (root / 'copy.bin').write_bytes(content)
+
+            stage3 = Stage3(root, cache_dir=Path(tmpdir) / 'cache', dry_run=True, verbose=True)
+            try:
+                stage3.run_stage3a()
+            finally:
+                stage3.close()
+
+            report = capsys.readouterr().out
+            assert stage3.stats['files_to_delete'] == 2
+            assert stage3.stats['space_to_free'] == 20000
+            assert f"Space saved: {stage3._format_bytes(20000)}\n" in report
+            assert f"Space saved: {stage3._format_bytes(40000)}\n" not in report
+
+    def test_cross_folder_links_not_deleted(self):
+        """Test that Stage 3B treats an input/output hard link pair as one file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_dir = Path(tmpdir) / 'input'
+            output_dir = Path(tmpdir) / 'output'
+            input_dir.mkdir()
+            output_dir.mkdir()
+            (input_dir / 'shared.bin').write_bytes(b'S' * 20000)
+            os.link(input_dir / 'shared.bin', output_dir / 'shared.bin')
+
+            stage3 = Stage3(input_dir, output_dir, cache_dir=Path(tmpdir) / 'cache',
+                            dry_run=True, verbose=False)
+            try:
+                stage3.run_stage3a()
+                results = stage3.run_stage3b()
+            finally:
+                stage3.close()
+
+            assert results.duplicate_groups == []
+
+
+class TestHashScheduler:
+    """Test per-device, disk-order scheduling of hash jobs."""
+
+    def test_lanes_per_device_in_inode_order(self):
+        """Test that jobs are split by device and sorted by inode within each."""
+        jobs = [
+            FileMetadata(path=f'/dev{dev}/f{ino}', size=1, mtime=0.0, dev=dev, ino=ino)
+            for dev, ino in [(1, 30), (2, 5), (1, 10), (1, 20), (2, 1)]
+        ]
+
+        lanes = HashScheduler(order='inode').lanes(jobs)
+
+        assert [[(job.dev, job.ino) for job in lane] for lane in lanes] == [
+            [(1, 10), (1, 20), (1, 30)],
+            [(2, 1), (2, 5)],
+        ]
+        assert HashScheduler(order='none').lanes(jobs) == [jobs]
+        with pytest.raises(ValueError):
+            HashScheduler(order='random')
+
+    def test_physical_order_falls_back_to_inode(self):
+        """Test that devices without FIEMAP answers are ordered by inode."""
+        jobs = [
+            FileMetadata(path=f'/nonexistent/f{ino}', size=1, mtime=0.0, dev=7, ino=ino)
+            for ino in (3, 1, 2)
+        ]
+
+        scheduler = HashScheduler(order='physical')
+        lanes = scheduler.lanes(jobs)
+
+        assert [job.ino for job in lanes[0]] == [1, 2, 3]
+        assert scheduler.stats['inode_ordered'] == 3
+        assert scheduler.stats['physical_ordered'] == 0
+
+    def test_engine_hashes_every_device_lane(self):
+        """Test that pooled hashing across several devices returns every job once."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_test_tree(root)
+            jobs = []
+            for idx, path in enumerate(sorted(root.iterdir())):
+                st = path.stat()
+                # Pretend the files live on three different disks
+                jobs.append(FileMetadata(path=str(path), size=st.st_size, mtime=st.st_mtime,
+                                         dev=idx % 3, ino=st.st_ino))
+
+            engine = HashEngine(workers=2)
+            results = {job.path: digest for job, digest in engine.hash_files(jobs)}
+
+            assert results == {job.path: hash_file(job.path) for job in jobs}
+            assert engine.scheduler.stats['devices'] == 3
+
+    def test_hash_order_config(self):
+        """Test hash_order config default and validation."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / 'config.yaml'
+            assert Config(config_path).get_hash_order() == 'physical'
+
+            config_path.write_text("duplicate_detection:\n  hash_order: Inode\n")
+            assert Config(config_path).get_hash_order() == 'inode'
+
+            config_path.write_text("duplicate_detection:\n  hash_order: elevator\n")
+            assert Config(config_path).get_hash_order() == 'physical'
+
+
+class TestStaleEntryPruning:
+    """Test that detection drops cache entries of deleted files."""
+
+    def test_deleted_files_pruned_on_rescan(self):
+        """Test that a rescan removes entries for files no longer on disk."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            _write_test_tree(root)
+            photo = root / 'photo.jpg'
+            photo.write_bytes(b'P' * 20000)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                cache.register_root('input', str(root))
+                # Cached while images were still being hashed
+                DuplicateDetector(cache=cache, verbose=False, skip_images=False,
+                                  sample_hashing=False).detect_duplicates(root, 'input')
+                assert cache.get_from_cache(str(photo), 'input') is not None
+
+                victim = next(f.file_path for f in cache.get_all_files('input')
+                              if not f.file_path.endswith('.jpg'))
+                os.unlink(victim)
+
+                detector = DuplicateDetector(cache=cache, verbose=False, sample_hashing=False)
+                detector.detect_duplicates(root, 'input')
+
+                assert detector.stats['cache_pruned'] == 1
+                assert cache.get_from_cache(victim, 'input') is None
+                # Skipped by this scan's filters, but the file still exists
+                assert cache.get_from_cache(str(photo), 'input') is not None
+
+
+class TestExactCacheValidation:
+    """Test that cached hashes are validated on st_mtime_ns/st_ino/st_ctime_ns."""
+
+    def test_sub_microsecond_change_rehashes_and_rescan_hits(self):
+        """Test that unchanged files always hit and a 1ns mtime change is a miss."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            _write_test_tree(root)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                cache.register_root('input', str(root))
+                DuplicateDetector(cache=cache, verbose=False,
+                                  sample_hashing=False).detect_duplicates(root, 'input')
+
+                # Float mtimes cannot tell these two times apart
+                touched = root / 'dup0_a.bin'
+                st = touched.stat()
+                os.utime(touched, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+                assert touched.stat().st_mtime == st.st_mtime
+
+                detector = DuplicateDetector(cache=cache, verbose=False, sample_hashing=False)
+                groups = detector.detect_duplicates(root, 'input')
+
+                assert len(groups) == 3
+                assert detector.stats['files_hashed'] == 1
+                assert detector.stats['cache_hits'] == 7
+                assert cache.get_from_cache(str(touched), 'input').file_mtime_ns == st.st_mtime_ns + 1
+
+
+class TestMovedFileReuse:
+    """Test that files moved between runs keep their cached hashes."""
+
+    def test_reshuffled_files_not_rehashed(self):
+        """Test that moved and renamed files adopt their old entries' hashes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / 'test_data'
+            root.mkdir()
+            _write_test_tree(root)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                cache.register_root('input', str(root))
+                DuplicateDetector(cache=cache, verbose=False,
+                                  sample_hashing=False).detect_duplicates(root, 'input')
+
+                # Reorganize by hand: every file moves, some are renamed too
+                (root / 'sorted').mkdir()
+                for path in sorted(root.glob('*.bin')):
+                    os.rename(path, root / 'sorted' / f'renamed_{path.name}')
+
+                detector = DuplicateDetector(cache=cache, verbose=False, sample_hashing=False)
+                groups = detector.detect_duplicates(root, 'input')
+
+                assert len(groups) == 3
+                assert detector.stats['cache_moved'] == 8
+                assert detector.stats['files_hashed'] == 0
+                assert detector.stats['cache_pruned'] == 8
+                moved = cache.get_from_cache(str(root / 'sorted' / 'renamed_dup0_a.bin'), 'input')
+                assert moved.full_hash == hash_file(str(root / 'sorted' / 'renamed_dup0_a.bin'))
@@ -0,0 +1,345 @@
+"""
+Tests for Stage 1 filename sanitization.
+
+Tests:
+1. Fast path equivalence with the reference rules (clean, ASCII, non-ASCII names)
+2. Bounded memo of sanitized names
+3. Microbenchmark against the reference implementation
+4. Per-directory collision allocation (Stage 1)
+5. Stage 1 collision state seeded from the scan
+6. Parallel per-directory file renames (Stage 1)
+"""
+
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from unidecode import unidecode
+
+from src.file_organizer.config import Config
+from src.file_organizer.filename_cleaner import FilenameCleaner, CollisionAllocator
+from src.file_organizer.fsops import DirFdOps
+from src.file_organizer.stage1 import Stage1Processor
+
+
+def _reference_sanitize(cleaner: FilenameCleaner, filename: str, is_directory: bool = False) -> str:
+    """The original rule-by-rule implementation of sanitize_filename()."""
+    if not filename or filename in ('.', '..'):
+        return filename
+    if is_directory:
+        base, ext = filename, ""
+    else:
+        base, ext = cleaner._split_extension(filename)
+    base = unidecode(base)
+    if ext:
+        ext = unidecode(ext)
+    base = base.lower()
+    if ext:
+        ext = ext.lower()
+    base = base.replace(' ', '_').replace('.', '_')
+    base = re.sub(r'[^a-z0-9_]', '', base)
+    base = re.sub(r'_+', '_', base)
+    base = base.strip('_')
+    if not base:
+        base = "unnamed"
+    sanitized = f"{base}.{ext}" if ext else base
+    return cleaner._truncate_if_needed(sanitized, ext)
+
+
+NAMES = [
+    'my_file.txt', 'report_2020.pdf', 'photos', 'a', 'x.y',
+    'My File.TXT', 'IMG 0001 (1).JPG', 'archive.tar.gz', 'file___name.txt',
+    '___file___.txt', '.hidden', 'trailing.', 'no_ext_', '_lead', 'NO EXTENSION',
+    'file@#$name.txt', 'name.with spaces', 'name.Ext!', 'snake__case', '...',
+    'café menu.pdf', 'Über File — Test.docx', '東京.jpg', 'naïve.tXt', 'movie.mkvé',
+    'emoji 😀 clip.mp4', 'ß', 'x' * 250 + '.txt', 'y' * 199, 'z' * 201, 'q' * 195 + '.' + 'e' * 10,
+]
+
+
+class TestSanitizeFastPath:
+    """Test the tiered fast path against the reference rules."""
+
+    @pytest.mark.parametrize('is_directory', [False, True])
+    def test_matches_reference(self, is_directory):
+        """Clean, dirty ASCII and non-ASCII names sanitize exactly as before."""
+        cleaner = FilenameCleaner()
+        for name in NAMES:
+            expected = _reference_sanitize(cleaner, name, is_directory)
+            assert cleaner.sanitize_filename(name, is_directory) == expected, name
+            # Second call is served from the memo (or the clean check)
+            assert cleaner.sanitize_filename(name, is_directory) == expected, name
+
+    def test_ascii_names_skip_transliteration(self, monkeypatch):
+        """Pure-ASCII names never call unidecode."""
+        from src.file_organizer import filename_cleaner as module
+        calls = []
+        monkeypatch.setattr(module, 'unidecode', lambda text: calls.append(text) or unidecode(text))
+        cleaner = FilenameCleaner()
+        assert cleaner.sanitize_filename('IMG 0001 (1).JPG') == 'img_0001_1.jpg'
+        assert calls == []
+        assert cleaner.sanitize_filename('café.pdf') == 'cafe.pdf'
+        assert calls == ['café']
+
+
+class TestSanitizeMemo:
+    """Test the bounded memo of sanitized names."""
+
+    def test_memo_is_bounded(self):
+        """Dirty names are memoized; the memo never grows past MEMO_SIZE."""
+        cleaner = FilenameCleaner()
+        maxsize = cleaner._sanitize_memo.cache_info().maxsize
+        assert maxsize == FilenameCleaner.MEMO_SIZE
+
+        for _ in range(3):
+            cleaner.sanitize_filename('Holiday Photos', is_directory=True)
+        info = cleaner._sanitize_memo.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+
+        # Clean names bypass the memo entirely
+        cleaner.sanitize_filename('holiday_photos', is_directory=True)
+        assert cleaner._sanitize_memo.cache_info().currsize == 1
+
+        for i in range(maxsize + 100):
+            cleaner.sanitize_filename(f'Dir {i}', is_directory=True)
+        assert cleaner._sanitize_memo.cache_info().currsize == maxsize
+
+
+class TestSanitizeBenchmark:
+    """Microbenchmark the fast path against the reference implementation."""
+
+    def test_sanitize_throughput(self):
+        """Mostly-clean names with repeating directories sanitize faster."""
+        names = []
+        for i in range(20000):
+            if i % 10 == 0:
+                names.append(f'IMG {i % 500:04d} (1).JPG')
+            elif i % 10 == 1:
+                names.append(f'Café {i % 50}.mp4')
+            else:
+                names.append(f'clip_{i}.mp4')
+
+        reference = FilenameCleaner()
+        start = time.perf_counter()
+        expected = [_reference_sanitize(reference, name) for name in names]
+        reference_time = time.perf_counter() - start
+
+        cleaner = FilenameCleaner()
+        start = time.perf_counter()
+        result = [cleaner.sanitize_filename(name) for name in names]
+        fast_time = time.perf_counter() - start
+
+        print(f"\nsanitize_filename (20k names, 90% clean):")
+        print(f"  reference: {reference_time:.4f}s")
+        print(f"  fast path: {fast_time:.4f}s")
+        print(f"  Speedup: {reference_time / fast_time:.2f}x")
+
+        assert result == expected
+        assert fast_time < reference_time
+
+
+class TestCollisionAllocator:
+    """Test per-directory collision allocation."""
+
+    def test_allocates_generate_collision_name_format(self):
+        """Free names are claimed as-is; taken names get base_YYYYMMDD_N.ext."""
+        allocator = CollisionAllocator(['Photo.jpg', 'notes'], date_stamp='20240101')
+        assert allocator.allocate('clip.mp4') == 'clip.mp4'
+        assert allocator.allocate('photo.jpg') == 'photo_20240101_1.jpg'
+        assert allocator.allocate('photo.jpg') == 'photo_20240101_2.jpg'
+        assert allocator.allocate('notes') == 'notes_20240101_1'
+        assert 'PHOTO_20240101_2.JPG' in allocator
+        assert len(allocator) == 6
+
+    def test_seeded_counters_skip_existing_collision_names(self):
+        """Counters start past collision names already in the listing."""
+        existing = ['img_0001.jpg'] + [f'img_0001_20240101_{n}.jpg' for n in range(1, 5001)]
+        allocator = CollisionAllocator(existing, date_stamp='20240101')
+        assert allocator.next_counters[('img_0001', '.jpg')] == 5001
+        assert allocator.allocate('img_0001.jpg') == 'img_0001_20240101_5001.jpg'
+
+        # A proposed name that is itself a collision name moves its stem's counter
+        assert allocator.allocate('img_0001_20240101_5003.jpg') == 'img_0001_20240101_5003.jpg'
+        assert allocator.allocate('img_0001.jpg') == 'img_0001_20240101_5004.jpg'
+
+        # Other date stamps are ordinary names
+        allocator = CollisionAllocator(['a.txt', 'a_20231231_7.txt'], date_stamp='20240101')
+        assert allocator.allocate('a.txt') == 'a_20240101_1.txt'
+
+    def test_stage1_crowded_directory(self):
+        """Many names sanitizing identically get unique, sequential names."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            raw_names = [f"IMG{'!' * i} 0001.JPG" for i in range(200)]
+            for name in raw_names:
+                (root / name).write_text(name)
+
+            processor = Stage1Processor(root, dry_run=False, verbose=False)
+            processor.process()
+
+            names = sorted(p.name for p in root.iterdir())
+            assert len(names) == 200
+            stamped = [name for name in names if name != 'img_0001.jpg']
+            assert len(stamped) == 199
+            counters = sorted(int(name.rsplit('_', 1)[1].split('.')[0]) for name in stamped)
+            assert counters == list(range(1, 200))
+            assert processor.stats['collisions_resolved'] == 199
+
+
+def _make_colliding_tree(root: Path):
+    """Folders holding a file and a folder that sanitize to the same name."""
+    for i in range(20):
+        folder = root / f'Folder {i}'
+        folder.mkdir()
+        (folder / 'Notes!').write_text('file')
+        (folder / 'NOTES?').mkdir()
+        (folder / 'My Clip.MP4').write_text('clip')
+
+
+class TestStage1CollisionSeeding:
+    """Test Stage 1 collision state seeded from the scan."""
+
+    def test_no_directory_rereads(self, monkeypatch):
+        """Collision sets come from the scan index, not a second readdir."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _make_colliding_tree(root)
+
+            processor = Stage1Processor(root, dry_run=False, verbose=False)
+            processor.index.walk(root)  # Build the index up front
+            list_calls = []
+            real_listdir = os.listdir
+            monkeypatch.setattr(os, 'listdir', lambda path='.': list_calls.append(path) or real_listdir(path))
+            monkeypatch.setattr(Path, 'iterdir', lambda self: pytest.fail('iterdir called'))
+            processor.process()
+            monkeypatch.undo()
+
+            assert list_calls == []
+            assert processor.stats['collisions_resolved'] == 20
+            for i in range(20):
+                names = sorted(p.name for p in (root / f'folder_{i}').iterdir())
+                assert names[:2] == ['my_clip.mp4', 'notes']
+                assert names[2].startswith('notes_') and (root / f'folder_{i}' / names[2]).is_dir()
+
+    def test_collision_state_is_per_directory(self):
+        """Only the current directory's names are held; dry-run matches execute."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            previews = {}
+            for dry_run in (True, False):
+                root = Path(tmpdir) / ('dry' if dry_run else 'live')
+                root.mkdir()
+                _make_colliding_tree(root)
+
+                processor = Stage1Processor(root, dry_run=dry_run, verbose=False)
+                processor.process()
+                assert processor.stats['collisions_resolved'] == 20
+                # Only the last directory processed (the root) is still held
+                assert processor._allocator_dir == str(root.resolve())
+                assert bool(processor.pending_names) == dry_run
+
+                previews[dry_run] = sorted(
+                    os.path.basename(dest) for op, src, dest in processor.operations
+                    if op.startswith('RENAME')
+                )
+
+            # Every entry is renamed; the preview names exactly what the real run made
+            live_root = Path(tmpdir) / 'live'
+            live = sorted(
+                name
+                for dirpath, dirnames, filenames in os.walk(live_root)
+                for name in dirnames + filenames
+            )
+            assert len(live) == 80
+            assert previews[True] == live
+
+
+def _tree_names(root: Path):
+    """All relative paths below root."""
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root)
+        for dirpath, dirnames, filenames in os.walk(root)
+        for name in dirnames + filenames
+    )
+
+
+class TestParallelRenames:
+    """Test parallel per-directory file renames."""
+
+    def _make_tree(self, root: Path):
+        for i in range(12):
+            folder = root / f'Album {i}' / 'Disc 1'
+            folder.mkdir(parents=True)
+            for j in range(15):
+                (folder / f"Track{'!' * (j % 3)} {j // 3}.MP3").write_text(f'{i}-{j}')
+            (folder / '.DS_Store').write_text('junk')
+            os.symlink(folder / 'Track 0.MP3', folder / 'Link.mp3')
+        (root / 'Top File.TXT').write_text('top')
+
+    def test_matches_sequential_run(self):
+        """Sharded renames give the same tree and stats as a sequential run."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = {}
+            for workers in (1, 8):
+                root = Path(tmpdir) / f'run{workers}'
+                root.mkdir()
+                self._make_tree(root)
+
+                processor = Stage1Processor(root, dry_run=False, verbose=False, rename_workers=workers)
+                processor.process()
+                results[workers] = (_tree_names(root), processor.stats)
+
+                # The shared index saw every worker's update
+                assert _tree_names(root) == sorted(
+                    os.path.relpath(os.path.join(dirpath, name), root)
+                    for dirpath, dirnames, filenames in processor.index.walk(root.resolve())
+                    for name in dirnames + filenames
+                )
+
+            assert results[8] == results[1]
+            stats = results[8][1]
+            assert stats['files_renamed'] == 12 * 15 + 1
+            assert stats['collisions_resolved'] == 12 * 10
+            assert stats['hidden_deleted'] == 12
+            assert stats['symlinks_removed'] == 12
+            assert stats['errors'] == 0
+
+    def test_worker_errors_merged(self, monkeypatch):
+        """Failures in one directory are counted without stopping the others."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            self._make_tree(root)
+
+            real_rename = DirFdOps.rename
+
+            def rename(self, src, dst):
+                if Path(src).parent.parent.name == 'Album 3':
+                    raise PermissionError('read-only share')
+                return real_rename(self, src, dst)
+
+            monkeypatch.setattr(DirFdOps, 'rename', rename)
+            processor = Stage1Processor(root, dry_run=False, verbose=False, rename_workers=4)
+            processor.process()
+
+            # Each failed rename counts in the helper and in the shard (as sequentially)
+            assert processor.stats['errors'] == 2 * 15
+            assert processor.stats['files_renamed'] == 11 * 15 + 1
+            assert sorted(p.name for p in (root / 'album_3' / 'disc_1').iterdir())[0] == 'Track 0.MP3'
+
+    def test_rename_workers_config(self):
+        """Test rename_workers default, CLI override and range clamping."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / '.file_organizer.yaml'
+            assert Config(config_path).get_rename_workers() == 1
+
+            config_path.write_text("rename_workers: 8\n")
+            config = Config(config_path)
+            assert config.get_rename_workers() == 8
+            assert config.get_rename_workers(cli_override=2) == 2
+            assert config.get_rename_workers(cli_override=0) == 1
+            assert config.get_rename_workers(cli_override=500) == 64
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
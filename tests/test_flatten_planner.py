@@ -0,0 +1,145 @@
+"""
+Tests for the Stage 2 flatten planner.
+
+Tests:
+1. Cascading flattening planned in one pass
+2. Minimal moves (each item moves once, straight to its final folder)
+3. Dry-run preview matches execute mode
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from src.file_organizer.filename_cleaner import FilenameCleaner
+from src.file_organizer.flatten_planner import FlattenPlanner, OP_MOVE, OP_RMDIR
+from src.file_organizer.scan_index import ScanIndex
+from src.file_organizer.stage2 import Stage2Processor
+
+
+def _write(path: Path, text: str = 'x'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _make_cascade_tree(root: Path):
+    """
+    Create a tree where flattening cascades upward.
+
+    keep/ has 5 items so it survives on its own; a/b/c/d is a chain of
+    small folders that collapses completely into the root.
+    """
+    for i in range(5):
+        _write(root / 'keep' / f'k{i}.txt')
+    _write(root / 'a' / 'b' / 'c' / 'd' / 'deep.txt')
+    _write(root / 'a' / 'b' / 'mid.txt')
+    _write(root / 'a' / 'top.txt')
+    (root / 'a' / 'b' / 'c' / 'empty').mkdir()
+
+
+def _tree(root: Path):
+    """Relative paths of everything under root."""
+    return sorted(str(p.relative_to(root)) for p in root.rglob('*'))
+
+
+def _plan(root: Path, threshold: int = 5):
+    index = ScanIndex()
+    return FlattenPlanner(threshold, FilenameCleaner()).plan(index.index_root(root), str(root))
+
+
+class TestFlattenPlanner:
+    """Test flatten planning."""
+
+    def test_cascade_in_single_plan(self):
+        """Test that folders emptied by flattening their children are flattened too."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_cascade_tree(root)
+
+            plan = _plan(root)
+
+            flattened = [os.path.relpath(folder, root) for folder, _ in plan.flattened]
+            # Siblings come in listing order; every folder after its children
+            assert sorted(flattened[:2]) == ['a/b/c/d', 'a/b/c/empty']
+            assert flattened[2:] == ['a/b/c', 'a/b', 'a']
+
+    def test_each_item_moves_once(self):
+        """Test that items move straight to their final folder."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_cascade_tree(root)
+
+            plan = _plan(root)
+            moves = [(os.path.relpath(src, root), os.path.relpath(dest, root))
+                     for op, src, dest in plan.operations if op == OP_MOVE]
+
+            assert sorted(moves) == [
+                ('a/b/c/d/deep.txt', 'deep.txt'),
+                ('a/b/mid.txt', 'mid.txt'),
+                ('a/top.txt', 'top.txt'),
+            ]
+            assert plan.moves == 3
+            assert sum(1 for op, _, _ in plan.operations if op == OP_RMDIR) == 5
+
+    def test_collision_names_reserved(self):
+        """Test that moved items never take a name that is still in use."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            for i in range(5):
+                _write(root / f'r{i}.txt')
+            _write(root / 'dup' / 'r0.txt', 'inner')
+            _write(root / 'dup' / 'dup', 'file named like its folder')
+
+            plan = _plan(root)
+            dests = [os.path.basename(dest) for op, _, dest in plan.operations if op == OP_MOVE]
+
+            assert plan.collisions == 2
+            assert len(set(dests)) == 2
+            assert not set(dests) & {'r0.txt', 'dup'}
+
+
+class TestStage2Flattening:
+    """Test Stage 2 applying flatten plans."""
+
+    def test_execute_matches_plan(self):
+        """Test that executing the plan produces the flattened tree."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve() / 'input'
+            _make_cascade_tree(root)
+            index = ScanIndex()
+
+            processor = Stage2Processor(root, dry_run=False, flatten_threshold=5,
+                                        verbose=False, scan_index=index)
+            processor.process()
+
+            assert _tree(root) == ['deep.txt', 'keep', 'keep/k0.txt', 'keep/k1.txt',
+                                   'keep/k2.txt', 'keep/k3.txt', 'keep/k4.txt',
+                                   'mid.txt', 'top.txt']
+            assert processor.stats['folders_flattened'] == 5
+            assert processor.stats['errors'] == 0
+
+    def test_dry_run_preview_matches_execute(self):
+        """Test that dry-run reports the cascade without touching the disk."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dry_root = Path(tmpdir).resolve() / 'dry'
+            exec_root = Path(tmpdir).resolve() / 'exec'
+            for root in (dry_root, exec_root):
+                _make_cascade_tree(root)
+                # 5 items, so only small once its empty subfolder is gone
+                for i in range(4):
+                    _write(root / 'p' / f'p{i}.txt')
+                (root / 'p' / 'empty').mkdir()
+            before = _tree(dry_root)
+
+            dry = Stage2Processor(dry_root, dry_run=True, flatten_threshold=5, verbose=False)
+            dry.process()
+            executed = Stage2Processor(exec_root, dry_run=False, flatten_threshold=5, verbose=False)
+            executed.process()
+
+            assert _tree(dry_root) == before
+            assert dry.stats['folders_flattened'] == executed.stats['folders_flattened'] == 7
+            flatten_ops = [(os.path.relpath(src, dry_root), os.path.relpath(dest, dry_root))
+                           for op, src, dest in dry.operations if op == 'FLATTEN FOLDER']
+            assert ('a', '.') in flatten_ops
+            assert ('p', '.') in flatten_ops
+            assert not (exec_root / 'p').exists()
@@ -0,0 +1,135 @@
+"""
+Tests for directory-fd relative filesystem mutations.
+
+Tests:
+1. Relative rename/unlink/chmod/stat, one open per parent directory
+2. Symlinked parents refused (O_NOFOLLOW) and bounded descriptor cache
+3. Stage 1 and Stage 3 mutations through DirFdOps
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.file_organizer.fsops import DirFdOps, DIR_FD_SUPPORTED
+from src.file_organizer.hash_cache import HashCache
+from src.file_organizer.stage1 import Stage1Processor
+from src.file_organizer.stage3 import Stage3
+
+requires_dir_fd = pytest.mark.skipif(not DIR_FD_SUPPORTED, reason="no dir_fd support on this platform")
+
+
+class TestDirFdOps:
+    """Test relative syscalls and the absolute-path fallback."""
+
+    @pytest.mark.parametrize('use_dir_fd', [None, False])
+    def test_operations(self, use_dir_fd):
+        """rename/unlink/chmod/stat behave like their os counterparts."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / 'a').mkdir()
+            (root / 'b').mkdir()
+            for i in range(5):
+                (root / 'a' / f'File {i}').write_text(str(i))
+
+            with DirFdOps(use_dir_fd=use_dir_fd) as fs:
+                for i in range(5):
+                    fs.rename(root / 'a' / f'File {i}', root / 'a' / f'file_{i}')
+                    fs.chmod(root / 'a' / f'file_{i}', 0o600)
+                fs.rename(root / 'a' / 'file_0', root / 'b' / 'moved')
+                assert fs.stat(root / 'b' / 'moved').st_size == 1
+                fs.unlink(root / 'a' / 'file_1')
+                with pytest.raises(FileNotFoundError):
+                    fs.unlink(root / 'a' / 'file_1')
+
+                # Each parent directory opened once (none without dir_fd)
+                expected_opens = 2 if fs.use_dir_fd else 0
+                assert fs.stats['dirs_opened'] == expected_opens
+
+            assert sorted(os.listdir(root / 'a')) == ['file_2', 'file_3', 'file_4']
+            assert stat.S_IMODE(os.stat(root / 'a' / 'file_2').st_mode) == 0o600
+            assert (root / 'b' / 'moved').read_text() == '0'
+
+
+@requires_dir_fd
+class TestDirFdSafety:
+    """Test symlinked parents and the descriptor cache."""
+
+    def test_symlinked_parent_refused(self):
+        """A parent swapped for a symlink fails instead of being followed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / 'elsewhere').mkdir()
+            (root / 'elsewhere' / 'victim').write_text('keep')
+            os.symlink(root / 'elsewhere', root / 'scanned')
+
+            with DirFdOps() as fs:
+                with pytest.raises(OSError):
+                    fs.unlink(root / 'scanned' / 'victim')
+            assert (root / 'elsewhere' / 'victim').exists()
+
+    def test_descriptor_cache_bounded(self):
+        """At most max_open_dirs stay open; renamed directories are forgotten."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for i in range(10):
+                (root / f'd{i}' / 'sub').mkdir(parents=True)
+                (root / f'd{i}' / 'sub' / 'f').write_text('x')
+
+            fs = DirFdOps(max_open_dirs=4)
+            for i in range(10):
+                fs.chmod(root / f'd{i}' / 'sub' / 'f', 0o644)
+            assert len(fs._fds) == 4
+
+            fs.stat(root / 'd9' / 'sub' / 'f')
+            fs.rename(root / 'd9', root / 'renamed')
+            assert not any(d.startswith(str(root / 'd9')) for d in fs._fds)
+            assert fs.stat(root / 'renamed' / 'sub' / 'f').st_size == 1
+
+            fs.close()
+            assert fs._fds == {}
+
+
+class TestStageMutations:
+    """Test Stage 1 and Stage 3 mutations through DirFdOps."""
+
+    def test_stage1_uses_dir_fds(self):
+        """Stage 1 opens each touched directory once and closes them after."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for i in range(3):
+                folder = root / f'dir{i}'
+                folder.mkdir()
+                for j in range(10):
+                    (folder / f'File {j}.TXT').write_text('x')
+                (folder / '.hidden').write_text('x')
+
+            processor = Stage1Processor(root, dry_run=False, verbose=False)
+            processor.process()
+
+            if DIR_FD_SUPPORTED:
+                # Only the three directories with renames and deletions (folder names are clean)
+                assert processor.fs.stats['dirs_opened'] == 3
+            assert processor.fs._fds == {}
+            assert sorted(os.listdir(root / 'dir0')) == [f'file_{j}.txt' for j in range(10)]
+            assert processor.stats['hidden_deleted'] == 3
+
+    def test_stage3_deletions(self):
+        """Stage 3A deletes duplicates relative to their parent directories."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_dir = Path(tmpdir) / 'input'
+            for i in range(3):
+                folder = input_dir / f'album{i}'
+                folder.mkdir(parents=True)
+                (folder / 'song.mp3').write_bytes(b'S' * 20000)
+
+            with Stage3(input_folder=input_dir, cache_dir=Path(tmpdir) / 'cache',
+                        dry_run=False, verbose=False) as stage3:
+                results = stage3.run_stage3a()
+
+            assert results.files_deleted == 2
+            assert results.space_freed == 2 * 20000
+            assert len(list(input_dir.rglob('*.mp3'))) == 1
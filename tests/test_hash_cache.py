@@ -0,0 +1,654 @@
+"""
+Tests for HashCache storage.
+
+Tests:
+1. Write-behind CacheWriter (batched transactions, flush on close/exception)
+2. Per-connection SQLite tuning (applied on every open)
+3. Schema migration (older layouts rewritten into the versioned schema)
+4. Root-scoped keys (bulk loads limited to the registered roots)
+5. Stale entry cleanup (remove_from_cache, collect_garbage)
+6. Bulk path updates (Stage 4 relocation keeps cached hashes)
+7. Cross-folder candidate queries (sizes and hashes shared by both folders)
+8. Compact records (slotted CachedFile, columnar bulk loader)
+9. Streaming readers (iter_* variants of the bulk queries)
+10. Exact validation keys (st_mtime_ns, st_ino, st_ctime_ns)
+"""
+
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.file_organizer.config import Config
+from src.file_organizer.hash_cache import HashCache, MMAP_MIN_MB, SCHEMA_VERSION
+from src.file_organizer.stage4 import Stage4Processor
+
+
+def _entry(i: int, folder: str = 'input') -> dict:
+    """Build a cache entry for a fake file."""
+    return {
+        'file_path': f'/test/file{i}.bin',
+        'folder': folder,
+        'file_size': 1024,
+        'file_mtime': 1234567890.0,
+        'file_hash': f'hash{i}',
+        'hash_type': 'full'
+    }
+
+
+def _count_on_disk(db_path: Path) -> int:
+    """Count rows visible to a separate connection (i.e. committed rows)."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM file_cache").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestCacheWriter:
+    """Test write-behind batching of cache entries."""
+
+    def test_flushes_at_batch_size(self):
+        """Test that entries are committed in batches, not per file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                with cache.writer(batch_size=10, flush_interval=3600) as writer:
+                    for i in range(25):
+                        writer.add(**_entry(i))
+
+                    assert _count_on_disk(cache.db_path) == 20
+                    assert writer.flushes == 2
+                    assert len(writer.pending) == 5
+
+                assert _count_on_disk(cache.db_path) == 25
+                assert writer.entries_written == 25
+
+    def test_pending_entries_visible_to_reads(self):
+        """Test that lookups see buffered entries before they are flushed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                with cache.writer(batch_size=100, flush_interval=3600) as writer:
+                    writer.add(**_entry(1))
+
+                    assert cache.get_from_cache('/test/file1.bin', 'input').file_hash == 'hash1'
+                    assert _count_on_disk(cache.db_path) == 0
+
+                    # Bulk reads flush first
+                    assert len(cache.get_all_files('input')) == 1
+                    assert not writer.pending
+
+    def test_flushes_on_exception(self):
+        """Test that pending entries are written when the block raises."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                with pytest.raises(RuntimeError):
+                    with cache.writer(batch_size=100, flush_interval=3600) as writer:
+                        writer.add(**_entry(1))
+                        writer.add(**_entry(2))
+                        raise RuntimeError("hashing interrupted")
+
+                assert _count_on_disk(cache.db_path) == 2
+
+    def test_flushes_on_cache_close(self):
+        """Test that closing the cache flushes writers that were never closed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HashCache(Path(tmpdir))
+            writer = cache.writer(batch_size=100, flush_interval=3600)
+            writer.add(**_entry(1))
+            cache.close()
+
+            assert _count_on_disk(Path(tmpdir) / 'hashes.db') == 1
+
+
+class TestConnectionTuning:
+    """Test that connection PRAGMAs are applied on every open."""
+
+    def test_tuning_applied_when_reopening(self):
+        """Test that an existing database gets the tuned settings, not SQLite defaults."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.save_to_cache(**_entry(1))
+
+            # Second open skips schema creation but must still be tuned
+            with HashCache(Path(tmpdir), cache_size_mb=32, mmap_size_mb=16) as cache:
+                report = cache.get_tuning_report()
+
+            assert report['cache_size_bytes'] == 32 * 1024 * 1024
+            assert report['mmap_size_bytes'] == 16 * 1024 * 1024
+            assert report['synchronous'] == 'NORMAL'
+            assert report['temp_store'] == 'MEMORY'
+            assert report['journal_mode'] == 'wal'
+
+    def test_auto_mmap_scales_with_database(self):
+        """Test that auto mmap covers the database with a floor of MMAP_MIN_MB."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                assert cache.get_tuning_report()['mmap_size_bytes'] == MMAP_MIN_MB * 1024 * 1024
+
+            with HashCache(Path(tmpdir), mmap_size_mb=0) as cache:
+                assert cache.get_tuning_report()['mmap_size_bytes'] == 0
+
+    def test_tuning_config(self):
+        """Test cache tuning config defaults, 'auto' and clamping."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / 'config.yaml'
+            config = Config(config_path)
+            assert config.get_cache_size_mb() == 64
+            assert config.get_cache_mmap_mb() is None
+
+            config_path.write_text(
+                "duplicate_detection:\n  cache_size_mb: 1\n  cache_mmap_mb: 512\n"
+            )
+            config = Config(config_path)
+            assert config.get_cache_size_mb() == 2
+            assert config.get_cache_mmap_mb() == 512
+
+
+class TestSchemaMigration:
+    """Test upgrading databases created by older versions."""
+
+    def test_inode_columns_added(self):
+        """Test that an old database gains file_dev/file_ino and keeps its rows."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / 'hashes.db'
+            conn = sqlite3.connect(str(db_path))
+            conn.execute("""
+                CREATE TABLE file_cache (
+                    file_path TEXT NOT NULL, folder TEXT NOT NULL,
+                    file_hash TEXT, hash_type TEXT, sample_size INTEGER,
+                    file_size INTEGER NOT NULL, file_mtime REAL NOT NULL,
+                    video_duration REAL, video_codec TEXT, video_resolution TEXT,
+                    last_checked REAL NOT NULL,
+                    PRIMARY KEY (file_path, folder)
+                )
+            """)
+            conn.execute(
+                "INSERT INTO file_cache (file_path, folder, file_hash, hash_type, "
+                "file_size, file_mtime, last_checked) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ('/test/old.bin', 'input', 'oldhash', 'full', 1024, 1.0, 1.0)
+            )
+            conn.commit()
+            conn.close()
+
+            with HashCache(Path(tmpdir)) as cache:
+                old = cache.get_from_cache('/test/old.bin', 'input')
+                assert old.full_hash == 'oldhash'
+                assert old.inode_key is None
+
+                cache.save_to_cache(**_entry(1), file_dev=5, file_ino=42)
+                assert cache.get_from_cache('/test/file1.bin', 'input').inode_key == (5, 42)
+
+                # Registering the directory adopts the migrated entries
+                cache.register_root('input', '/test')
+                assert cache.get_from_cache('/test/old.bin', 'input').full_hash == 'oldhash'
+                assert len(cache.get_all_files('input')) == 2
+
+
+    def test_root_scoped_layout_migrated(self):
+        """Test that (root_id, rel_path) rows move to directory rows with binary hashes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / 'hashes.db'
+            conn = sqlite3.connect(str(db_path))
+            conn.executescript("""
+                CREATE TABLE cache_roots (
+                    root_id INTEGER PRIMARY KEY, root_path TEXT NOT NULL UNIQUE,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE file_cache (
+                    root_id INTEGER NOT NULL, rel_path TEXT NOT NULL,
+                    file_hash TEXT, hash_type TEXT, sample_size INTEGER,
+                    file_size INTEGER NOT NULL, file_mtime REAL NOT NULL,
+                    file_dev INTEGER, file_ino INTEGER,
+                    video_duration REAL, video_codec TEXT, video_resolution TEXT,
+                    last_checked REAL NOT NULL,
+                    PRIMARY KEY (root_id, rel_path)
+                );
+                CREATE INDEX idx_hash_lookup ON file_cache(file_hash);
+                INSERT INTO cache_roots VALUES (1, '/data', 1.0);
+            """)
+            conn.executemany(
+                "INSERT INTO file_cache (root_id, rel_path, file_hash, hash_type, "
+                "file_size, file_mtime, file_dev, file_ino, last_checked) "
+                "VALUES (1, ?, ?, 'full', 1024, 1.0, 5, ?, 1.0)",
+                [('top.bin', '00ff00ff00ff00ff', 1), ('a/b/deep.bin', 'oldhash', 2),
+                 ('a/b/other.bin', None, 3)]
+            )
+            conn.commit()
+            conn.close()
+
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/data')
+                assert cache.get_from_cache('/data/top.bin', 'input').file_hash == '00ff00ff00ff00ff'
+                assert cache.get_from_cache('/data/a/b/deep.bin', 'input').inode_key == (5, 2)
+                assert cache.get_files_by_hash('00ff00ff00ff00ff') == ['/data/top.bin']
+                assert len(cache.load_columns('input', '/data/a')) == 2
+
+            conn = sqlite3.connect(str(db_path))
+            try:
+                assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+                assert conn.execute("SELECT rel_dir FROM directories ORDER BY rel_dir").fetchall() == [('',), ('a/b',)]
+                stored = dict(conn.execute("SELECT name, typeof(file_hash) FROM file_cache"))
+            finally:
+                conn.close()
+            # Hex digests become 8-byte BLOBs; other values are kept as text
+            assert stored == {'top.bin': 'blob', 'deep.bin': 'text', 'other.bin': 'null'}
+
+    def test_legacy_layout_shrinks(self):
+        """Test that absolute-path rows are migrated into a much smaller database."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / 'hashes.db'
+            conn = sqlite3.connect(str(db_path))
+            conn.executescript("""
+                CREATE TABLE file_cache (
+                    file_path TEXT NOT NULL, folder TEXT NOT NULL,
+                    file_hash TEXT, hash_type TEXT, sample_size INTEGER,
+                    file_size INTEGER NOT NULL, file_mtime REAL NOT NULL,
+                    file_dev INTEGER, file_ino INTEGER,
+                    video_duration REAL, video_codec TEXT, video_resolution TEXT,
+                    last_checked REAL NOT NULL,
+                    PRIMARY KEY (file_path, folder)
+                );
+                CREATE INDEX idx_file_identity ON file_cache(file_size, file_mtime, file_hash);
+                CREATE INDEX idx_hash_lookup ON file_cache(file_hash);
+                CREATE INDEX idx_folder ON file_cache(folder);
+                CREATE INDEX idx_size_grouping ON file_cache(file_size);
+            """)
+            conn.executemany(
+                "INSERT INTO file_cache (file_path, folder, file_hash, hash_type, "
+                "file_size, file_mtime, last_checked) VALUES (?, 'input', ?, 'full', ?, 1.0, 1.0)",
+                [(f'/mnt/archive/photos/{i % 20:02d}/IMG_{i:05d}.jpg', f'{i:016x}', i)
+                 for i in range(5000)]
+            )
+            conn.commit()
+            conn.close()
+            legacy_size = db_path.stat().st_size
+
+            with HashCache(Path(tmpdir)) as cache:
+                assert cache.get_from_cache('/mnt/archive/photos/07/IMG_00007.jpg', 'input').file_hash == f'{7:016x}'
+                assert cache.get_cache_stats()['hashed_files'] == 5000
+                assert cache.get_tuning_report()['db_size_bytes'] * 3 < legacy_size * 2
+
+
+class TestRootScopedKeys:
+    """Test that cache entries are keyed by registered root."""
+
+    def test_entries_stored_relative_to_root(self):
+        """Test that paths under a root are stored relative and returned absolute."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/data/ingest1')
+                cache.save_to_cache(**dict(_entry(1), file_path='/data/ingest1/a/b.bin'))
+
+                assert cache.get_from_cache('/data/ingest1/a/b.bin', 'input').file_hash == 'hash1'
+                assert [f.file_path for f in cache.get_all_files('input')] == ['/data/ingest1/a/b.bin']
+
+            conn = sqlite3.connect(str(Path(tmpdir) / 'hashes.db'))
+            try:
+                keys = conn.execute("""
+                    SELECT d.rel_dir, f.name FROM file_cache f
+                    JOIN directories d ON d.dir_id = f.dir_id
+                """).fetchall()
+            finally:
+                conn.close()
+            assert keys == [('a', 'b.bin')]
+
+    def test_loads_limited_to_registered_root(self):
+        """Test that entries from other roots sharing the cache are not loaded."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, root in enumerate(['/data/ingest1', '/data/ingest2', '/data/ingest1']):
+                with HashCache(Path(tmpdir)) as cache:
+                    cache.register_root('input', root)
+                    cache.save_to_cache(**dict(_entry(i), file_path=f'{root}/file{i}.bin'))
+                    loaded = sorted(f.file_path for f in cache.get_all_files('input'))
+
+            # Third session (ingest1 again) sees its own entries only
+            assert loaded == ['/data/ingest1/file0.bin', '/data/ingest1/file2.bin']
+
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/data/ingest2')
+                cache.register_root('output', '/data/ingest1')
+                assert [f.file_path for f in cache.get_all_files('input')] == ['/data/ingest2/file1.bin']
+                assert len(cache.get_all_files('output')) == 2
+                assert cache.get_cache_stats()['roots'] == 2
+
+
+class TestCacheGarbageCollection:
+    """Test removal of entries for files that no longer exist."""
+
+    def test_remove_from_cache_drops_pending_and_stored(self):
+        """Test that removed paths are gone whether or not they were flushed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.save_to_cache(**_entry(1))
+                with cache.writer(batch_size=100) as writer:
+                    writer.add(**_entry(2))
+                    writer.add(**_entry(3))
+
+                    removed = cache.remove_from_cache(
+                        ['/test/file1.bin', '/test/file2.bin'], 'input'
+                    )
+
+                assert removed == 1
+                assert cache.get_from_cache('/test/file1.bin', 'input') is None
+                assert cache.get_from_cache('/test/file2.bin', 'input') is None
+                assert cache.get_from_cache('/test/file3.bin', 'input') is not None
+
+    def test_collect_garbage_removes_missing_files(self):
+        """Test that entries of deleted files and directories are dropped."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            live = Path(tmpdir) / 'live'
+            (live / 'album').mkdir(parents=True)
+            (live / 'orphaned' / 'deep').mkdir(parents=True)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                cache.register_root('input', str(live))
+                for name in ('kept.bin', 'deleted.bin', 'album/song.bin', 'orphaned/deep/a.bin'):
+                    (live / name).write_bytes(b'x')
+                    cache.save_to_cache(**dict(_entry(1), file_path=str(live / name)))
+
+            (live / 'deleted.bin').unlink()
+            shutil.rmtree(live / 'album')
+            shutil.rmtree(live / 'orphaned')
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                stats = cache.collect_garbage()
+                cache.optimize()
+
+                # orphaned/deep is gone but so is its parent: kept (could be a lost mount)
+                assert stats == {'entries_checked': 4, 'entries_removed': 2, 'unreachable_roots': []}
+                cache.register_root('input', str(live))
+                assert sorted(f.file_path for f in cache.get_all_files('input')) == [
+                    str(live / 'kept.bin'), str(live / 'orphaned' / 'deep' / 'a.bin')
+                ]
+
+    def test_collect_garbage_keeps_unreachable_roots(self):
+        """Test that missing or empty (unmounted) roots keep their entries."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            gone = Path(tmpdir) / 'gone'
+            mountpoint = Path(tmpdir) / 'nas'
+            for root in (gone, mountpoint):
+                (root / 'sub').mkdir(parents=True)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                cache.register_root('input', str(gone))
+                cache.register_root('output', str(mountpoint))
+                cache.save_to_cache(**dict(_entry(1), file_path=str(gone / 'a.bin')))
+                cache.save_to_cache(**dict(_entry(2), file_path=str(mountpoint / 'sub' / 'b.bin'),
+                                           folder='output'))
+
+            shutil.rmtree(gone)
+            shutil.rmtree(mountpoint / 'sub')  # Share unmounted: empty mountpoint left
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                stats = cache.collect_garbage()
+
+                assert stats == {'entries_checked': 0, 'entries_removed': 0,
+                                 'unreachable_roots': sorted([str(gone), str(mountpoint)])}
+                assert cache.get_cache_stats()['roots'] == 2
+                cache.register_root('output', str(mountpoint))
+                assert len(cache.get_all_files('output')) == 1
+
+
+class TestBulkPathUpdate:
+    """Test rewriting cache paths for moved files."""
+
+    def test_update_cache_paths_across_roots(self):
+        """Test that moved entries keep their hash under the new root."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/data/in')
+                cache.register_root('output', '/data/out')
+                cache.save_to_cache(**dict(_entry(1), file_path='/data/in/a/one.bin'))
+                cache.save_to_cache(**dict(_entry(2), file_path='/data/in/two.bin'))
+                # Stale entry at a destination is replaced
+                cache.save_to_cache(**dict(_entry(3), file_path='/data/out/misc/two.bin',
+                                           folder='output'))
+
+                updated = cache.update_cache_paths([
+                    ('/data/in/a/one.bin', '/data/out/a/one.bin'),
+                    ('/data/in/two.bin', '/data/out/misc/two.bin'),
+                    ('/data/in/never_cached.bin', '/data/out/never_cached.bin'),
+                ], 'input', 'output')
+
+                assert updated == 2
+                assert cache.get_all_files('input') == []
+                moved = {f.file_path: f.file_hash for f in cache.get_all_files('output')}
+                assert moved == {'/data/out/a/one.bin': 'hash1', '/data/out/misc/two.bin': 'hash2'}
+
+    def test_stage4_moves_cache_entries(self):
+        """Test that Stage 4 leaves relocated files cached under the output root."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_dir = Path(tmpdir).resolve() / 'input'
+            output_dir = Path(tmpdir).resolve() / 'output'
+            cache_dir = Path(tmpdir) / 'cache'
+            (input_dir / 'docs').mkdir(parents=True)
+            output_dir.mkdir()
+            (input_dir / 'docs' / 'report.bin').write_bytes(b'r' * 100)
+            (input_dir / 'top.bin').write_bytes(b't' * 100)
+
+            with HashCache(cache_dir) as cache:
+                cache.register_root('input', input_dir)
+                for i, path in enumerate([input_dir / 'docs' / 'report.bin', input_dir / 'top.bin']):
+                    cache.save_to_cache(**dict(_entry(i), file_path=str(path)))
+
+            processor = Stage4Processor(input_dir, output_dir, dry_run=False,
+                                        verbose=False, cache_dir=cache_dir)
+            processor.process()
+
+            assert processor.cache_entries_updated == 2
+            with HashCache(cache_dir) as cache:
+                cache.register_root('output', output_dir)
+                moved = {f.file_path: f.file_hash for f in cache.get_all_files('output')}
+            assert moved == {
+                str(output_dir / 'docs' / 'report.bin'): 'hash0',
+                str(output_dir / 'misc' / 'top.bin'): 'hash1',
+            }
+
+    def test_stage4_cross_filesystem_move_stays_cached(self, monkeypatch):
+        """Test that a move giving the file a new inode still hits the cache."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_dir = Path(tmpdir).resolve() / 'input'
+            output_dir = Path(tmpdir).resolve() / 'output'
+            cache_dir = Path(tmpdir) / 'cache'
+            (input_dir / 'docs').mkdir(parents=True)
+            output_dir.mkdir()
+            source = input_dir / 'docs' / 'report.bin'
+            source.write_bytes(b'r' * 100)
+            st = source.stat()
+
+            with HashCache(cache_dir) as cache:
+                cache.register_root('input', input_dir)
+                cache.save_to_cache(**dict(_entry(0), file_path=str(source), file_size=100,
+                                           file_mtime=st.st_mtime, file_mtime_ns=st.st_mtime_ns,
+                                           file_ctime_ns=st.st_ctime_ns, file_dev=st.st_dev,
+                                           file_ino=st.st_ino))
+
+            # What shutil.move does across filesystems: copy, then delete the source
+            def copy_and_delete(src, dst):
+                shutil.copy2(src, dst)
+                Path(src).unlink()
+            monkeypatch.setattr('src.file_organizer.stage4.shutil.move', copy_and_delete)
+
+            processor = Stage4Processor(input_dir, output_dir, dry_run=False,
+                                        verbose=False, cache_dir=cache_dir)
+            processor.process()
+
+            dest = output_dir / 'docs' / 'report.bin'
+            dest_st = dest.stat()
+            assert dest_st.st_ino != st.st_ino
+            with HashCache(cache_dir) as cache:
+                cache.register_root('output', output_dir)
+                cached = cache.get_from_cache(str(dest), 'output')
+            assert (cached.file_dev, cached.file_ino) == (dest_st.st_dev, dest_st.st_ino)
+            assert cached.matches(dest_st.st_size, dest_st.st_mtime, dest_st.st_mtime_ns,
+                                  dest_st.st_ino, dest_st.st_ctime_ns)
+
+
+class TestCrossFolderQueries:
+    """Test SQL-side selection of Stage 3B candidates."""
+
+    def test_only_shared_sizes_and_full_hashes_streamed(self):
+        """Test that only sizes/hashes present in both folders come back."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/in')
+                cache.register_root('output', '/out')
+                rows = [
+                    ('/in/a', 'input', 100, 'h1', 'full'),
+                    ('/out/a', 'output', 100, 'h1', 'full'),
+                    ('/out/a2', 'output', 100, 'h1', 'full'),
+                    ('/in/b', 'input', 200, 's2', 'sampled'),   # Sample hashes never match
+                    ('/out/b', 'output', 200, 's2', 'sampled'),
+                    ('/in/c', 'input', 300, None, None),
+                    ('/out/c', 'output', 300, 'h3', 'full'),
+                    ('/in/only', 'input', 400, 'h4', 'full'),   # Size only in input
+                    ('/in/dup', 'input', 100, 'h5', 'full'),    # Shared size, hash only in input
+                ]
+                for path, folder, size, file_hash, hash_type in rows:
+                    cache.save_to_cache(file_path=path, folder=folder, file_size=size,
+                                        file_mtime=1.0, file_hash=file_hash, hash_type=hash_type)
+
+                size_groups = {size: sorted(f.file_path for f in files)
+                               for size, files in cache.iter_cross_folder_size_groups('input', 'output')}
+                assert size_groups == {
+                    100: ['/in/a', '/in/dup', '/out/a', '/out/a2'],
+                    200: ['/in/b', '/out/b'],
+                    300: ['/in/c', '/out/c'],
+                }
+
+                hash_groups = [(file_hash, sorted((f.folder, f.file_path) for f in files))
+                               for file_hash, files in cache.iter_cross_folder_hash_groups('input', 'output')]
+                assert hash_groups == [
+                    ('h1', [('input', '/in/a'), ('output', '/out/a'), ('output', '/out/a2')])
+                ]
+                assert cache.count_files('input') == 5
+
+
+class TestCompactRecords:
+    """Test the memory-compact cache record types."""
+
+    def test_cached_file_is_slotted(self):
+        """Test that CachedFile has no per-instance dict and shares hash_type strings."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.save_to_cache(**_entry(1))
+                cache.save_to_cache(**_entry(2))
+                first, second = cache.get_all_files('input')
+
+                assert not hasattr(first, '__dict__')
+                assert first.hash_type is second.hash_type
+
+    def test_load_columns_matches_records(self):
+        """Test that the columnar loader returns the same data as get_all_files."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.register_root('input', '/test')
+                for i in range(5):
+                    cache.save_to_cache(**dict(_entry(i), file_size=100 + i), file_dev=3, file_ino=10 + i,
+                                        file_mtime_ns=1_700_000_000_123_456_789 + i,
+                                        file_ctime_ns=1_700_000_001_000_000_000 + i)
+                cache.save_to_cache(**dict(_entry(9), file_path='/test/sub/deep.bin'))
+
+                columns = cache.load_columns('input', batch_size=2)
+                records = {f.file_path: f for f in cache.get_all_files('input')}
+
+                assert len(columns) == 6
+                for i in range(len(columns)):
+                    loaded = columns.record(i)
+                    expected = records[loaded.file_path]
+                    assert (loaded.file_size, loaded.file_mtime, loaded.full_hash, loaded.inode_key) == \
+                        (expected.file_size, expected.file_mtime, expected.full_hash, expected.inode_key)
+                    # Nanosecond validation keys survive the columnar round trip
+                    assert (loaded.file_mtime_ns, loaded.file_ctime_ns) == \
+                        (expected.file_mtime_ns, expected.file_ctime_ns)
+
+                first = columns.record(columns.names.index('file0.bin'))
+                assert first.file_mtime_ns == 1_700_000_000_123_456_789
+                assert first.matches(100, first.file_mtime, 1_700_000_000_123_456_789, 10, 1_700_000_001_000_000_000)
+                assert not first.matches(100, first.file_mtime, 1_700_000_000_123_456_789, 10, 1_700_000_001_000_000_001)
+
+                under_sub = list(cache.load_columns('input', '/test/sub').iter_paths())
+                assert under_sub == [('/test/sub/deep.bin', 1024)]
+
+
+class TestStreamingReaders:
+    """Test the fetchmany-based iter_* query variants."""
+
+    def test_iterators_match_list_queries(self):
+        """Test that each iterator yields what its list counterpart returns."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                for i in range(7):
+                    cache.save_to_cache(**dict(_entry(i), file_size=100 * (i % 3),
+                                               file_hash='same' if i < 2 else f'hash{i}'))
+                paths = [f'/test/file{i}.bin' for i in range(7)]
+
+                assert [f.file_path for f in cache.iter_all_files('input', batch_size=2)] == \
+                    [f.file_path for f in cache.get_all_files('input')]
+                assert dict(cache.iter_size_groups('input', batch_size=2)) == cache.get_size_groups('input')
+                assert sorted(cache.iter_files_by_hash('same', 'input', batch_size=1)) == \
+                    ['/test/file0.bin', '/test/file1.bin']
+                assert sorted(path for path, _ in cache.iter_files_by_paths(paths[:3], 'input', batch_size=2)) == \
+                    paths[:3]
+
+    def test_size_groups_stream_in_size_order(self):
+        """Test that size groups arrive one at a time, smallest size first."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                for i, size in enumerate([300, 100, 300, 200, 100, 400]):
+                    cache.save_to_cache(**dict(_entry(i), file_size=size))
+
+                groups = cache.iter_size_groups('input', batch_size=1)
+                size, first = next(groups)
+                assert (size, sorted(first)) == (100, ['/test/file1.bin', '/test/file4.bin'])
+                assert [size for size, _ in groups] == [300]
+
+
+class TestValidationKey:
+    """Test the nanosecond stat key used to validate cached entries."""
+
+    def test_nanosecond_key_compared_exactly(self):
+        """Test that mtime_ns, inode and ctime_ns must all match when recorded."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.save_to_cache(**_entry(1), file_ino=7,
+                                    file_mtime_ns=1234567890000000001, file_ctime_ns=99)
+                cached = cache.get_from_cache('/test/file1.bin', 'input')
+
+                assert cached.matches(1024, 0.0, 1234567890000000001, 7, 99)
+                assert not cached.matches(1024, 1234567890.0, 1234567890000000002, 7, 99)
+                assert not cached.matches(1024, 1234567890.0, 1234567890000000001, 8, 99)
+                assert not cached.matches(1024, 1234567890.0, 1234567890000000001, 7, 100)
+                # Without nanosecond times the float mtime decides
+                assert cached.matches(1024, 1234567890.0)
+
+                # A move clears ctime (renames change it); the rest still has to match
+                cache.update_cache_paths([('/test/file1.bin', '/test/moved.bin')], 'input', 'input')
+                moved = cache.get_from_cache('/test/moved.bin', 'input')
+                assert moved.file_ctime_ns is None
+                assert moved.matches(1024, 0.0, 1234567890000000001, 7, 12345)
+
+    def test_version_2_database_gains_columns(self):
+        """Test that a schema version 2 database is upgraded in place."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with HashCache(Path(tmpdir)) as cache:
+                cache.save_to_cache(**_entry(1))
+
+            conn = sqlite3.connect(str(Path(tmpdir) / 'hashes.db'))
+            conn.execute("ALTER TABLE file_cache DROP COLUMN file_mtime_ns")
+            conn.execute("ALTER TABLE file_cache DROP COLUMN file_ctime_ns")
+            conn.execute("PRAGMA user_version = 2")
+            conn.commit()
+            conn.close()
+
+            with HashCache(Path(tmpdir)) as cache:
+                old = cache.get_from_cache('/test/file1.bin', 'input')
+                assert old.file_hash == 'hash1'
+                assert old.file_mtime_ns is None
+                assert old.matches(1024, 1234567890.0, 1234567890000000000)
+
+                cache.save_to_cache(**_entry(2), file_mtime_ns=5, file_ctime_ns=6)
+                assert cache.get_from_cache('/test/file2.bin', 'input').file_ctime_ns == 6
+                assert cache.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
@@ -0,0 +1,319 @@
+"""
+Tests for the shared filesystem scan index.
+
+Tests:
+1. Index contents and os.walk-compatible walking
+2. In-place updates (rename, move, remove, add)
+3. Stages sharing one index across a run
+4. Parallel work-stealing walker
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.file_organizer.config import Config
+from src.file_organizer.scan_index import ScanIndex
+from src.file_organizer.parallel_walker import ParallelWalker
+from src.file_organizer.scanner import FileScanner
+from src.file_organizer.stage1 import Stage1Processor
+from src.file_organizer.stage2 import Stage2Processor
+from src.file_organizer.hash_cache import HashCache
+from src.file_organizer.duplicate_detector import DuplicateDetector
+
+
+def _make_tree(root: Path):
+    """Create a small nested tree with files, folders and a symlink."""
+    (root / 'Photos' / '2020' / 'Summer').mkdir(parents=True)
+    (root / 'Docs').mkdir()
+    (root / 'Photos' / '2020' / 'Summer' / 'beach.mp4').write_bytes(b'B' * 20000)
+    (root / 'Photos' / '2020' / 'cover.mp4').write_bytes(b'C' * 30000)
+    (root / 'Docs' / 'Report Final.PDF').write_bytes(b'B' * 20000)
+    (root / 'readme.txt').write_text('hello')
+    os.symlink(root / 'readme.txt', root / 'Docs' / 'link.txt')
+
+
+def _walk_set(walker, top):
+    """Collapse a walk into comparable (dirpath, dirnames, filenames) tuples."""
+    return sorted((d, sorted(ds), sorted(fs)) for d, ds, fs in walker(top))
+
+
+def _disk_paths(root: Path):
+    """All paths below root according to the filesystem."""
+    return sorted(str(p) for p in root.rglob('*'))
+
+
+def _index_paths(index: ScanIndex, root: Path):
+    """All paths below root according to the index."""
+    return sorted(
+        os.path.join(dirpath, name)
+        for dirpath, dirnames, filenames in index.walk(root)
+        for name in dirnames + filenames
+    )
+
+
+class TestScanIndexWalk:
+    """Test index contents and walking."""
+
+    def test_walk_matches_os_walk(self):
+        """Test that walk() yields the same tree as os.walk in both orders."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+
+            assert _walk_set(index.walk, root) == _walk_set(os.walk, root)
+            bottom_up = [d for d, _, _ in index.walk(root, topdown=False)]
+            assert _walk_set(lambda t: index.walk(t, topdown=False), root) == _walk_set(os.walk, root)
+
+            # Bottom-up: every directory comes after all of its descendants
+            for i, dirpath in enumerate(bottom_up):
+                assert not any(d.startswith(dirpath + os.sep) for d in bottom_up[i + 1:])
+
+            assert index.stats['roots_indexed'] == 1
+
+    def test_entries_hold_stat_fields(self):
+        """Test that entries carry size, mtime, inode and symlink flags."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+            index.index_root(root)
+
+            cover = root / 'Photos' / '2020' / 'cover.mp4'
+            entry = index.get(cover)
+            st = cover.stat()
+            assert entry.size == 30000
+            assert entry.mtime == st.st_mtime
+            assert entry.mtime_ns == st.st_mtime_ns
+            assert entry.ino == st.st_ino
+            assert entry.is_file and not entry.is_symlink
+
+            assert index.get(root / 'Docs' / 'link.txt').is_symlink
+            assert index.get(root / 'missing') is None
+            assert sorted(index.listdir(root / 'Docs')) == ['Report Final.PDF', 'link.txt']
+
+    def test_topdown_pruning(self):
+        """Test that removing names from dirnames skips those subtrees."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+
+            visited = []
+            for dirpath, dirnames, filenames in index.walk(root):
+                visited.append(dirpath)
+                if 'Photos' in dirnames:
+                    dirnames.remove('Photos')
+
+            assert not any('Photos' in d for d in visited)
+
+
+class TestScanIndexUpdates:
+    """Test in-place index updates."""
+
+    def test_rename_move_remove(self):
+        """Test that the index tracks renames, cross-directory moves and deletions."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+            index.index_root(root)
+
+            # Rename a directory: subtree moves with it
+            (root / 'Photos').rename(root / 'photos')
+            index.rename(root / 'Photos', root / 'photos')
+
+            # Move a file across directories
+            (root / 'readme.txt').rename(root / 'Docs' / 'readme.txt')
+            index.rename(root / 'readme.txt', root / 'Docs' / 'readme.txt')
+
+            # Delete a file
+            (root / 'Docs' / 'Report Final.PDF').unlink()
+            index.remove(root / 'Docs' / 'Report Final.PDF')
+
+            assert _index_paths(index, root) == _disk_paths(root)
+            assert index.get(root / 'photos' / '2020' / 'Summer' / 'beach.mp4').size == 20000
+
+    def test_add_creates_missing_ancestors(self):
+        """Test that add() indexes new paths and their missing parent directories."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+            index.index_root(root)
+
+            (root / 'new' / 'nested').mkdir(parents=True)
+            (root / 'new' / 'nested' / 'file.bin').write_bytes(b'N' * 10)
+            index.add(root / 'new' / 'nested' / 'file.bin')
+
+            assert index.get(root / 'new' / 'nested' / 'file.bin').size == 10
+            assert _index_paths(index, root) == _disk_paths(root)
+
+    def test_outside_roots_falls_back_to_filesystem(self):
+        """Test that queries outside indexed roots don't use stale data."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_tree(root)
+            index = ScanIndex()
+            index.index_root(root / 'Docs')
+
+            assert not index.is_indexed(root / 'Photos')
+            assert index.get(root / 'Photos') is None
+            assert index.exists(root / 'Photos')
+            assert sorted(index.listdir(root / 'Photos')) == ['2020']
+
+
+class TestSharedIndexAcrossStages:
+    """Test stages reusing one index."""
+
+    def test_stage1_and_stage2_keep_index_in_sync(self):
+        """Test that the index matches the disk after Stages 1 and 2 modify the tree."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve() / 'input'
+            root.mkdir()
+            _make_tree(root)
+            (root / '.hidden').write_text('x')
+            index = ScanIndex()
+
+            Stage1Processor(root, dry_run=False, verbose=False, scan_index=index).process()
+            assert _index_paths(index, root) == _disk_paths(root)
+
+            Stage2Processor(root, dry_run=False, flatten_threshold=5, verbose=False, scan_index=index).process()
+            assert _index_paths(index, root) == _disk_paths(root)
+
+            # Everything so far came from a single scan of the tree
+            assert index.stats['roots_indexed'] == 1
+
+    def test_detector_uses_index(self):
+        """Test that duplicate detection over the index matches a filesystem scan."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve() / 'input'
+            root.mkdir()
+            _make_tree(root)
+            index = ScanIndex()
+            index.index_root(root)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                from_disk = DuplicateDetector(cache=cache, min_file_size=1024, verbose=False)
+                from_index = DuplicateDetector(cache=cache, min_file_size=1024, verbose=False, scan_index=index)
+
+                disk_files = from_disk.scan_directory(root, 'input')
+                index_files = from_index.scan_directory(root, 'input')
+
+                assert sorted((f.path, f.size, f.mtime) for f in index_files) == \
+                    sorted((f.path, f.size, f.mtime) for f in disk_files)
+                assert len(from_index.detect_duplicates(root, 'input')) == 1
+
+    def test_renamed_files_hit_cache_next_run(self):
+        """Test that files renamed by Stage 1 are cache hits on the next run."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve() / 'input'
+            (root / 'Album One').mkdir(parents=True)
+            for i in range(4):
+                (root / 'Album One' / f'Track {i}.MP3').write_bytes(b'T' * 20000)
+
+            with HashCache(Path(tmpdir) / 'cache') as cache:
+                # This run: Stage 1 renames (and chmods) through the shared index
+                index = ScanIndex()
+                Stage1Processor(root, dry_run=False, verbose=False, scan_index=index).process()
+                first = DuplicateDetector(cache=cache, min_file_size=1024, verbose=False, scan_index=index)
+                first.detect_duplicates(root, 'input')
+                assert first.stats['files_hashed'] == 4
+
+                # Next run: a fresh scan sees the same files unchanged
+                second = DuplicateDetector(cache=cache, min_file_size=1024, verbose=False, scan_index=ScanIndex())
+                second.detect_duplicates(root, 'input')
+                assert second.stats['cache_hits'] == 4
+                assert second.stats['files_hashed'] == 0
+
+
+def _make_wide_tree(root: Path, fanout: int = 4, depth: int = 3):
+    """Create a tree with fanout subdirectories per level and two files per directory."""
+    dirs = [root]
+    for level in range(depth):
+        next_dirs = []
+        for parent in dirs:
+            for i in range(fanout):
+                child = parent / f'd{level}_{i}'
+                child.mkdir()
+                (child / 'a.bin').write_bytes(b'A' * (i + 1))
+                (child / 'b.txt').write_text(str(child))
+                next_dirs.append(child)
+        dirs = next_dirs
+
+
+class TestParallelWalker:
+    """Test the work-stealing walker and its scanners."""
+
+    def test_visits_every_item_once(self):
+        """Test that every node of a synthetic tree is visited exactly once."""
+        def visit(n):
+            children = [n * 3 + 1, n * 3 + 2, n * 3 + 3]
+            return [c for c in children if c < 1000], n
+
+        for threads in (1, 2, 8):
+            visited = list(ParallelWalker(threads=threads).run(0, visit))
+            assert sorted(visited) == list(range(1000))
+
+    def test_parallel_index_walks_in_same_order(self):
+        """Test that walk() order doesn't depend on the number of scan threads."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_wide_tree(root)
+
+            sequential = ScanIndex(scan_threads=1)
+            parallel = ScanIndex(scan_threads=8)
+
+            for topdown in (True, False):
+                assert list(parallel.walk(root, topdown=topdown)) == \
+                    list(sequential.walk(root, topdown=topdown))
+            assert parallel.stats['entries_indexed'] == sequential.stats['entries_indexed']
+            assert parallel.stats['dirs_scanned'] == 1 + 4 + 16 + 64
+
+    def test_parallel_file_scanner(self):
+        """Test that a threaded FileScanner finds the same files with the same counts."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).resolve()
+            _make_wide_tree(root)
+
+            sequential = FileScanner(skip_extensions={'.txt'}, min_size=2)
+            parallel = FileScanner(skip_extensions={'.txt'}, min_size=2, threads=8)
+
+            assert sorted(parallel.scan(root)) == sorted(sequential.scan(root))
+            assert parallel.stats == sequential.stats
+            assert parallel.stats['skipped_extension'] == 84
+
+    def test_visit_errors_propagate(self):
+        """Test that an exception in a worker is raised in the caller."""
+        def visit(n):
+            if n == 50:
+                raise RuntimeError('boom')
+            return [c for c in (n * 2 + 1, n * 2 + 2) if c < 200], n
+
+        with pytest.raises(RuntimeError, match='boom'):
+            list(ParallelWalker(threads=4).run(0, visit))
+
+    def test_early_stop(self):
+        """Test that abandoning the iteration shuts the workers down."""
+        def visit(n):
+            return [n * 2 + 1, n * 2 + 2] if n < 10000 else [], n
+
+        results = ParallelWalker(threads=4).run(0, visit)
+        assert len([next(results) for _ in range(10)]) == 10
+        results.close()
+
+    def test_scan_threads_config(self):
+        """Test scan_threads default, CLI override and range clamping."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / 'config.yaml'
+            assert Config(config_path).get_scan_threads() == 1
+
+            config_path.write_text("scan_threads: 8\n")
+            config = Config(config_path)
+            assert config.get_scan_threads() == 8
+            assert config.get_scan_threads(cli_override=2) == 2
+            assert config.get_scan_threads(cli_override=0) == 1
+            assert config.get_scan_threads(cli_override=500) == 64
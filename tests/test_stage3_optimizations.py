@@ -3,7 +3,7 @@ Tests for Stage 3 optimizations.
 
 Tests:
 1. Stage 3A: Batch query optimization (get_files_by_paths)
-2. Stage 3B: Cache load optimization (avoid duplicate loads, incremental reload)
+2. Stage 3B: Cache load optimization (SQL-side candidate selection, incremental reload)
 """
 
 import tempfile
@@ -13,6 +13,7 @@ from unittest.mock import patch
 
 import pytest
 
+from src.file_organizer import hash_cache as hash_cache_module
 from src.file_organizer.hash_cache import HashCache, CachedFile
 from src.file_organizer.duplicate_detector import DuplicateDetector, FileMetadata
 from src.file_organizer.stage3 import Stage3
@@ -69,7 +70,7 @@ class TestBatchQueryOptimization:
             test_paths = [f'/test/file{i}.mp4' for i in range(1500)]
             
             # Add all to cache
-            for path in test_paths:
+            for i, path in enumerate(test_paths):
                 cache.save_to_cache(
                     file_path=path,
                     folder='input',
@@ -84,9 +85,41 @@ class TestBatchQueryOptimization:
             
             assert len(result) == 1500
             assert all(path in result for path in test_paths)
+            assert result['/test/file7.mp4'].file_hash == 'hash7'
             
             cache.close()
 
+    def test_get_files_by_paths_temp_table_join(self):
+        """Test that the TEMP table join returns the same entries as IN chunks."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HashCache(Path(tmpdir))
+            cache.register_root('input', '/test')
+            cache.save_batch([{
+                'file_path': f'/test/file{i}.mp4',
+                'folder': 'input',
+                'file_size': 1024,
+                'file_mtime': 1234567890.0,
+                'file_hash': f'hash{i}',
+                'hash_type': 'full'
+            } for i in range(1500)])
+
+            # Root-relative, absolute (outside the root) and missing paths
+            cache.save_to_cache(file_path='/elsewhere/x.mp4', folder='input',
+                                file_size=1, file_mtime=1.0)
+            query = [f'/test/file{i}.mp4' for i in range(0, 1600, 2)] + ['/elsewhere/x.mp4']
+
+            with patch.object(hash_cache_module, 'PATH_JOIN_MIN', 10 ** 9):
+                chunked = cache.get_files_by_paths(query, 'input')
+            with patch.object(hash_cache_module, 'PATH_JOIN_MIN', 0):
+                joined = cache.get_files_by_paths(query, 'input')
+                # Temp tables are dropped, so lookups can run back to back
+                assert len(cache.get_files_by_paths(query, 'input')) == 751
+
+            assert len(joined) == 751
+            assert {p: f.file_hash for p, f in joined.items()} == {p: f.file_hash for p, f in chunked.items()}
+
+            cache.close()
+
     def test_get_files_by_paths_nonexistent_paths(self):
         """Test get_files_by_paths with non-existent paths."""
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -188,8 +221,8 @@ class TestBatchQueryOptimization:
 class TestStage3BCacheOptimization:
     """Test Stage 3B cache load optimizations."""
 
-    def test_input_files_cached_after_phase1(self):
-        """Test that input files are cached after Phase 1."""
+    def test_stage3b_never_loads_all_files(self):
+        """Test that Stage 3B finds cross-folder duplicates without loading every cached row."""
         with tempfile.TemporaryDirectory() as tmpdir:
             input_dir = Path(tmpdir) / 'input'
             output_dir = Path(tmpdir) / 'output'
@@ -220,17 +253,18 @@ class TestStage3BCacheOptimization:
             )
             detector.detect_duplicates(input_dir, folder='input')
             
-            # Now run Stage 3B Phase 1
-            stage3.run_stage3b()
-            
-            # Check that _cached_input_files was set
-            assert hasattr(stage3, '_cached_input_files')
-            assert len(stage3._cached_input_files) > 0
+            # Now run Stage 3B (candidates are selected in SQLite)
+            with patch.object(stage3.cache, 'get_all_files') as mock_get_all:
+                results = stage3.run_stage3b()
+
+                assert mock_get_all.call_count == 0
+            assert len(results.duplicate_groups) == 1
+            assert sorted(stage3._cross_folder_files) == sorted(results.duplicate_groups[0].files)
             
             stage3.close()
 
-    def test_find_cross_folder_reuses_cached_input(self):
-        """Test that _find_cross_folder_duplicates reuses cached input files."""
+    def test_find_cross_folder_streams_candidates(self):
+        """Test that _find_cross_folder_duplicates only loads size and hash candidates."""
         with tempfile.TemporaryDirectory() as tmpdir:
             input_dir = Path(tmpdir) / 'input'
             output_dir = Path(tmpdir) / 'output'
@@ -261,19 +295,20 @@ class TestStage3BCacheOptimization:
             detector.detect_duplicates(input_dir, folder='input')
             detector.detect_duplicates(output_dir, folder='output')
             
-            # Manually set cached input files (simulating Phase 1)
-            input_files = stage3.cache.get_all_files('input')
-            stage3._cached_input_files = input_files
-            
-            # Mock get_all_files to verify it's NOT called for input
+            # A file whose size only occurs in one folder is never loaded
+            (output_dir / 'unique.txt').write_bytes(b'u' * 2000)
+            detector.detect_duplicates(output_dir, folder='output')
+
+            # Mock get_all_files to verify it's NOT called for either folder
             with patch.object(stage3.cache, 'get_all_files') as mock_get_all:
-                # Call _find_cross_folder_duplicates
-                stage3._find_cross_folder_duplicates()
-                
-                # Should NOT call get_all_files('input') because we have cached version
-                input_calls = [call for call in mock_get_all.call_args_list 
-                              if len(call[0]) > 0 and call[0][0] == 'input']
-                assert len(input_calls) == 0, "Should reuse cached input files, not reload"
+                groups = stage3._find_cross_folder_duplicates()
+
+                assert mock_get_all.call_count == 0, "Candidates should come from SQL, not full loads"
+
+            sizes = [size for size, _ in stage3.cache.iter_cross_folder_size_groups('input', 'output')]
+            assert sizes == [4000]
+            assert len(groups) == 1
+            assert {stage3._cross_folder_files[p].folder for p in groups[0].files} == {'input', 'output'}
             
             stage3.close()
 
@@ -425,6 +460,36 @@ class TestPerformanceImprovements:
             
             cache.close()
 
+    def test_temp_table_join_vs_in_chunks_performance(self):
+        """Compare the TEMP table join with 999-parameter IN chunks on a large lookup."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HashCache(Path(tmpdir))
+            paths = [f'/test/file{i}.mp4' for i in range(20000)]
+            cache.save_batch([{
+                'file_path': path,
+                'folder': 'input',
+                'file_size': 1024,
+                'file_mtime': 1234567890.0,
+                'file_hash': f'hash{i}',
+                'hash_type': 'full'
+            } for i, path in enumerate(paths)])
+
+            timings = {}
+            for name, join_min, max_variables in (('IN (999)', 10 ** 9, 999),
+                                                  ('TEMP join', 0, cache.max_variables)):
+                cache.max_variables = max_variables
+                with patch.object(hash_cache_module, 'PATH_JOIN_MIN', join_min):
+                    start = time.time()
+                    result = cache.get_files_by_paths(paths, 'input')
+                    timings[name] = time.time() - start
+                assert len(result) == 20000
+
+            print(f"\nget_files_by_paths (20k paths):")
+            for name, elapsed in timings.items():
+                print(f"  {name}: {elapsed:.4f}s")
+
+            cache.close()
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])